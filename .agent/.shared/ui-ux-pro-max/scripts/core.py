@@ -5,69 +5,113 @@ UI/UX Pro Max Core - BM25 search engine for UI/UX style guides
 """
 
 import csv
+import hashlib
+import heapq
+import io
+import json
+import os
+import pickle
 import re
+import sqlite3
+import threading
+from array import array
 from pathlib import Path
 from math import log
-from collections import defaultdict
+from bisect import bisect_right
+from collections import OrderedDict, defaultdict, deque
+from itertools import accumulate
+
+np = None  # NumPy, imported by _numpy() the first time a large index is scored
+_NUMPY_MISSING = False
 
 # ============ CONFIGURATION ============
 DATA_DIR = Path(__file__).parent.parent / "data"
 MAX_RESULTS = 3
 
+# Fitted indexes are pickled here, keyed by CSV path and column set, and
+# reused while the CSV fingerprint (size, mtime, content hash) is unchanged.
+CACHE_DIR = Path(os.environ.get("UI_UX_PRO_MAX_CACHE_DIR")
+                 or Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "ui-ux-pro-max")
+INDEX_FORMAT = 6  # bump when the tokenizer or the cached layout changes
+
+# Search results are memoized in an LRU keyed by index fingerprint, so a
+# changed CSV never serves stale hits. UI_UX_PRO_MAX_QUERY_CACHE=disk also
+# keeps them in CACHE_DIR/query-cache.sqlite across processes.
+QUERY_CACHE_SIZE = int(os.environ.get("UI_UX_PRO_MAX_QUERY_CACHE_SIZE", "1024"))  # 0 disables
+QUERY_CACHE_DISK = os.environ.get("UI_UX_PRO_MAX_QUERY_CACHE", "").lower() == "disk"
+
+# The NumPy BM25 backend takes over from this corpus size when NumPy is
+# installed; below it the per-call overhead outweighs the vectorization.
+NUMPY_MIN_DOCS = 2000
+
+# "search_weights" are BM25F field weights: a term found in a short, curated
+# column (name, keywords) counts more than one found in long prose. Columns
+# left out weigh 1.0; each column is length-normalized on its own.
 CSV_CONFIG = {
     "style": {
         "file": "styles.csv",
         "search_cols": ["Style Category", "Keywords", "Best For", "Type"],
+        "search_weights": {"Style Category": 2, "Keywords": 1.5, "Best For": 2.5, "Type": 0.5},
         "output_cols": ["Style Category", "Type", "Keywords", "Primary Colors", "Effects & Animation", "Best For", "Performance", "Accessibility", "Framework Compatibility", "Complexity"]
     },
     "prompt": {
         "file": "prompts.csv",
         "search_cols": ["Style Category", "AI Prompt Keywords (Copy-Paste Ready)", "CSS/Technical Keywords"],
+        "search_weights": {"Style Category": 3, "AI Prompt Keywords (Copy-Paste Ready)": 1.5, "CSS/Technical Keywords": 1},
         "output_cols": ["Style Category", "AI Prompt Keywords (Copy-Paste Ready)", "CSS/Technical Keywords", "Implementation Checklist"]
     },
     "color": {
         "file": "colors.csv",
         "search_cols": ["Product Type", "Keywords", "Notes"],
+        "search_weights": {"Product Type": 3, "Keywords": 2, "Notes": 0.5},
         "output_cols": ["Product Type", "Keywords", "Primary (Hex)", "Secondary (Hex)", "CTA (Hex)", "Background (Hex)", "Text (Hex)", "Border (Hex)", "Notes"]
     },
     "chart": {
         "file": "charts.csv",
         "search_cols": ["Data Type", "Keywords", "Best Chart Type", "Accessibility Notes"],
+        "search_weights": {"Data Type": 3, "Keywords": 2, "Best Chart Type": 1.5, "Accessibility Notes": 0.5},
         "output_cols": ["Data Type", "Keywords", "Best Chart Type", "Secondary Options", "Color Guidance", "Accessibility Notes", "Library Recommendation", "Interactive Level"]
     },
     "landing": {
         "file": "landing.csv",
         "search_cols": ["Pattern Name", "Keywords", "Conversion Optimization", "Section Order"],
+        "search_weights": {"Pattern Name": 3, "Keywords": 2, "Conversion Optimization": 0.5, "Section Order": 0.5},
         "output_cols": ["Pattern Name", "Keywords", "Section Order", "Primary CTA Placement", "Color Strategy", "Conversion Optimization"]
     },
     "product": {
         "file": "products.csv",
         "search_cols": ["Product Type", "Keywords", "Primary Style Recommendation", "Key Considerations"],
+        "search_weights": {"Product Type": 3, "Keywords": 2, "Primary Style Recommendation": 1, "Key Considerations": 0.5},
         "output_cols": ["Product Type", "Keywords", "Primary Style Recommendation", "Secondary Styles", "Landing Page Pattern", "Dashboard Style (if applicable)", "Color Palette Focus"]
     },
     "ux": {
         "file": "ux-guidelines.csv",
         "search_cols": ["Category", "Issue", "Description", "Platform"],
+        "search_weights": {"Category": 1.5, "Issue": 3, "Description": 1, "Platform": 0.5},
         "output_cols": ["Category", "Issue", "Platform", "Description", "Do", "Don't", "Code Example Good", "Code Example Bad", "Severity"]
     },
     "typography": {
         "file": "typography.csv",
         "search_cols": ["Font Pairing Name", "Category", "Mood/Style Keywords", "Best For", "Heading Font", "Body Font"],
+        "search_weights": {"Font Pairing Name": 3, "Category": 1, "Mood/Style Keywords": 2, "Best For": 1.5, "Heading Font": 1, "Body Font": 1},
         "output_cols": ["Font Pairing Name", "Category", "Heading Font", "Body Font", "Mood/Style Keywords", "Best For", "Google Fonts URL", "CSS Import", "Tailwind Config", "Notes"]
     },
     "icons": {
         "file": "icons.csv",
         "search_cols": ["Category", "Icon Name", "Keywords", "Best For"],
+        "search_weights": {"Category": 1.5, "Icon Name": 3, "Keywords": 2, "Best For": 1},
         "output_cols": ["Category", "Icon Name", "Keywords", "Library", "Import Code", "Usage", "Best For", "Style"]
     },
     "react": {
         "file": "react-performance.csv",
         "search_cols": ["Category", "Issue", "Keywords", "Description"],
+        "search_weights": {"Category": 1.5, "Issue": 3, "Keywords": 2, "Description": 1},
         "output_cols": ["Category", "Issue", "Platform", "Description", "Do", "Don't", "Code Example Good", "Code Example Bad", "Severity"]
     },
     "web": {
         "file": "web-interface.csv",
         "search_cols": ["Category", "Issue", "Keywords", "Description"],
+        "search_weights": {"Category": 1.5, "Issue": 3, "Keywords": 2, "Description": 1},
         "output_cols": ["Category", "Issue", "Platform", "Description", "Do", "Don't", "Code Example Good", "Code Example Bad", "Severity"]
     }
 }
@@ -90,6 +134,7 @@ STACK_CONFIG = {
 # Common columns for all stacks
 _STACK_COLS = {
     "search_cols": ["Category", "Guideline", "Description", "Do", "Don't"],
+    "search_weights": {"Category": 1.5, "Guideline": 3, "Description": 1, "Do": 0.5, "Don't": 0.5},
     "output_cols": ["Category", "Guideline", "Description", "Do", "Don't", "Code Good", "Code Bad", "Severity", "Docs URL"]
 }
 
@@ -97,91 +142,590 @@ AVAILABLE_STACKS = list(STACK_CONFIG.keys())
 
 
 # ============ BM25 IMPLEMENTATION ============
+def _numpy():
+    """Import NumPy on first use, so small searches never pay for it; None if missing."""
+    global np, _NUMPY_MISSING
+    if np is None and not _NUMPY_MISSING:
+        try:
+            import numpy
+            np = numpy
+        except ImportError:
+            _NUMPY_MISSING = True
+    return np
+
+
 class BM25:
-    """BM25 ranking algorithm for text search"""
+    """BM25 ranking algorithm for text search.
+
+    fit() builds an inverted index stored as a CSR matrix with one row per
+    term: ``indptr[t]:indptr[t + 1]`` slices ``doc_ids``/``tfs`` into that
+    term's postings. Scoring only visits the postings of the query terms, so
+    query cost grows with the number of matching documents rather than the
+    corpus size. With NumPy available and a corpus of at least
+    NUMPY_MIN_DOCS documents, queries are scored with vectorized operations
+    over the same arrays; both backends return identical rankings.
+    """
 
-    def __init__(self, k1=1.5, b=0.75):
+    def __init__(self, k1=1.5, b=0.75, backend=None):
         self.k1 = k1
         self.b = b
-        self.corpus = []
+        self.backend = backend  # None (auto), "python" or "numpy"
+        self.vocab = {}
+        self.indptr = array("q", [0])
+        self.doc_ids = array("i")
+        self.tfs = array("d")
         self.doc_lengths = []
+        self.doc_norms = array("d")
+        self.field_weights = None
+        self.prenormalized = False  # tfs already length-normalized (BM25F)
         self.avgdl = 0
         self.idf = {}
         self.doc_freqs = defaultdict(int)
         self.N = 0
+        self._np = None
 
     def tokenize(self, text):
         """Tokenize and clean the input text."""
         text = re.sub(r'[^\w\s]', ' ', str(text).lower())
         return [w for w in text.split() if len(w) > 2]
 
-    def fit(self, documents):
-        """Build BM25 index from documents"""
-        self.corpus = [self.tokenize(doc) for doc in documents]
-        self.N = len(self.corpus)
+    def fit(self, documents, field_weights=None):
+        """Build BM25 index from documents.
+
+        With ``field_weights`` every document is a sequence of field texts,
+        one per weight, and the index is BM25F: each field's term frequency
+        is normalized by that field's length relative to its corpus average,
+        weighted, and summed into one pseudo-frequency per term. That sum is
+        what the postings store, so scoring costs the same as plain BM25.
+        """
+        if field_weights:
+            self.field_weights = list(field_weights)
+            self.prenormalized = True
+            fields = [[self.tokenize(text) for text in doc] for doc in documents]
+            avg_lengths = [sum(len(doc[f]) for doc in fields) / len(fields) if fields else 0
+                           for f in range(len(self.field_weights))]
+        else:
+            fields = [[self.tokenize(doc)] for doc in documents]
+
+        postings = defaultdict(list)
+        for doc_id, doc in enumerate(fields):
+            self.doc_lengths.append(sum(len(tokens) for tokens in doc))
+            term_freqs = defaultdict(int)
+            for f, tokens in enumerate(doc):
+                if not self.field_weights:
+                    weight = 1
+                elif not tokens:
+                    continue
+                else:
+                    weight = self.field_weights[f] / (1 - self.b + self.b * len(tokens) / avg_lengths[f])
+                for word in tokens:
+                    term_freqs[word] += weight
+            for word, tf in term_freqs.items():
+                postings[word].append((doc_id, tf))
+        self.N = len(self.doc_lengths)
+        self._index(postings)
+
+    def _index(self, postings):
+        """Lay out {term: [(doc_id, tf), ...]} as CSR and compute idf and norms."""
         if self.N == 0:
             return
-        self.doc_lengths = [len(doc) for doc in self.corpus]
         self.avgdl = sum(self.doc_lengths) / self.N
 
-        for doc in self.corpus:
-            seen = set()
-            for word in doc:
-                if word not in seen:
-                    self.doc_freqs[word] += 1
-                    seen.add(word)
-
-        for word, freq in self.doc_freqs.items():
-            self.idf[word] = log((self.N - freq + 0.5) / (freq + 0.5) + 1)
-
-    def score(self, query):
-        """Score all documents against a given query.
-        
-        This function tokenizes the input query and computes a score for each document
-        in the corpus based on term frequency and inverse document frequency. It
-        iterates through the documents, calculates the term frequencies, and applies
-        the scoring formula using the parameters k1 and b. The final scores are sorted
-        in descending order and returned as a list of tuples containing document
-        indices and their scores.
+        for word, plist in postings.items():
+            self.vocab[word] = len(self.vocab)
+            self.doc_ids.extend(doc_id for doc_id, _ in plist)
+            self.tfs.extend(tf for _, tf in plist)
+            self.indptr.append(len(self.doc_ids))
+            self.doc_freqs[word] = len(plist)
+            self.idf[word] = log((self.N - len(plist) + 0.5) / (len(plist) + 0.5) + 1)
+        self._compute_norms()
+
+    @classmethod
+    def merge(cls, parts):
+        """Concatenate fitted indexes into one, renumbering documents in order.
+
+        Term frequencies are kept as they are (BM25F ones stay normalized
+        against their own corpus's field lengths); idf and, for plain BM25,
+        the length normalization are recomputed over the combined corpus.
+        """
+        if len({part.prenormalized for part in parts}) > 1:
+            raise ValueError("cannot merge BM25 and BM25F indexes")
+        merged = cls(parts[0].k1, parts[0].b) if parts else cls()
+        merged.prenormalized = bool(parts) and parts[0].prenormalized
+        postings = defaultdict(list)
+        for part in parts:
+            offset = merged.N
+            for word, term in part.vocab.items():
+                lo, hi = part.indptr[term], part.indptr[term + 1]
+                postings[word].extend(zip((doc_id + offset for doc_id in part.doc_ids[lo:hi]), part.tfs[lo:hi]))
+            merged.doc_lengths.extend(part.doc_lengths)
+            merged.N += part.N
+        merged._index(postings)
+        return merged
+
+    def _compute_norms(self):
+        # Length normalization is fixed per document, so compute it once;
+        # BM25F already normalized each field at index time.
+        if self.prenormalized:
+            self.doc_norms = array("d", [self.k1]) * self.N
+        else:
+            self.doc_norms = array("d", (self.k1 * (1 - self.b + self.b * n / self.avgdl) for n in self.doc_lengths))
+        self._np = None
+
+    def _use_numpy(self):
+        if self.backend == "numpy" and _numpy() is None:
+            raise RuntimeError("BM25 backend 'numpy' requested but NumPy is not installed")
+        if self.backend is None:
+            return self.N >= NUMPY_MIN_DOCS and _numpy() is not None
+        return self.backend == "numpy"
+
+    def score(self, query, top_k=None):
+        """Score the documents matching a query.
+
+        Scores are accumulated over the postings of each query token (repeated
+        tokens count again), so documents sharing no term with the query are
+        never visited and are left out of the result. Returns (doc_id, score)
+        tuples by descending score, ties in document order; with ``top_k``
+        only the best ``top_k`` are selected.
         """
-        query_tokens = self.tokenize(query)
-        scores = []
+        if self._use_numpy():
+            return self._score_numpy(query, top_k)
+
+        scores = {}
+        k1_plus_1 = self.k1 + 1
+        indptr, doc_ids, tfs, norms = self.indptr, self.doc_ids, self.tfs, self.doc_norms
+        for token in self.tokenize(query):
+            term = self.vocab.get(token)
+            if term is None:
+                continue
+            idf = self.idf[token]
+            lo, hi = indptr[term], indptr[term + 1]
+            for doc_id, tf in zip(doc_ids[lo:hi], tfs[lo:hi]):
+                scores[doc_id] = scores.get(doc_id, 0) + idf * (tf * k1_plus_1) / (tf + norms[doc_id])
+
+        if top_k is None:
+            return sorted(scores.items(), key=lambda x: (-x[1], x[0]))
+        return heapq.nlargest(top_k, scores.items(), key=lambda x: (x[1], -x[0]))
+
+    def score_many(self, queries, top_k=None):
+        """Score several queries against the same index; one score() result per query."""
+        return [self.score(query, top_k) for query in queries]
+
+    def _numpy_arrays(self):
+        """Zero-copy NumPy views of the CSR arrays, built on first use."""
+        if self._np is None:
+            self._np = (np.frombuffer(self.indptr, dtype=np.int64), np.frombuffer(self.doc_ids, dtype=np.intc),
+                        np.frombuffer(self.tfs, dtype=np.float64), np.frombuffer(self.doc_norms, dtype=np.float64))
+        return self._np
+
+    def _score_numpy(self, query, top_k):
+        """Vectorized score(): gather the query terms' CSR rows, weight them and
+        sum per document with one bincount."""
+        indptr, doc_ids, tfs, norms = self._numpy_arrays()
+        k1_plus_1 = self.k1 + 1
+        docs, contribs = [], []
+        for token in self.tokenize(query):
+            term = self.vocab.get(token)
+            if term is None:
+                continue
+            lo, hi = indptr[term], indptr[term + 1]
+            term_docs, tf = doc_ids[lo:hi], tfs[lo:hi]
+            docs.append(term_docs)
+            contribs.append(self.idf[token] * (tf * k1_plus_1) / (tf + norms[term_docs]))
+        if not docs:
+            return []
+        # bincount adds each document's contributions in token order, as the Python backend does
+        scores = np.bincount(np.concatenate(docs), weights=np.concatenate(contribs), minlength=self.N)
+        return self._top_k(scores, top_k)
+
+    @staticmethod
+    def _top_k(scores, top_k):
+        candidates = np.flatnonzero(scores > 0)
+        if top_k is not None and len(candidates) > top_k:
+            if top_k <= 0:
+                return []
+            # argpartition finds the k-th best score; keep every candidate
+            # tied with it so ties still resolve in document order
+            cand_scores = scores[candidates]
+            kth = cand_scores[np.argpartition(-cand_scores, top_k - 1)[top_k - 1]]
+            candidates = candidates[cand_scores >= kth]
+        order = np.lexsort((candidates, -scores[candidates]))
+        if top_k is not None:
+            order = order[:top_k]
+        return [(int(doc_id), float(scores[doc_id])) for doc_id in candidates[order]]
+
+    def state(self):
+        """Return the fitted index as plain data for the on-disk cache."""
+        return {"k1": self.k1, "b": self.b, "field_weights": self.field_weights,
+                "prenormalized": self.prenormalized, "vocab": self.vocab,
+                "indptr": self.indptr, "doc_ids": self.doc_ids, "tfs": self.tfs, "doc_lengths": self.doc_lengths,
+                "avgdl": self.avgdl, "idf": self.idf, "N": self.N}
+
+    @classmethod
+    def from_state(cls, state):
+        """Rebuild a fitted BM25 from state()."""
+        bm25 = cls(state["k1"], state["b"])
+        for name in ("field_weights", "prenormalized", "vocab", "indptr", "doc_ids", "tfs", "doc_lengths", "avgdl", "idf", "N"):
+            setattr(bm25, name, state[name])
+        if bm25.N:
+            bm25._compute_norms()
+        indptr = bm25.indptr
+        bm25.doc_freqs = defaultdict(int, {word: indptr[t + 1] - indptr[t] for word, t in bm25.vocab.items()})
+        return bm25
+
+
+# ============ INDEX CACHE ============
+class _CsvIndex:
+    """A fitted BM25 index over one CSV file plus where each of its rows starts.
+
+    Rows are not kept in memory: ``rows()`` seeks to the byte offset of each
+    requested record and parses only that record, returning its output
+    columns. Callers must have checked the stat (see _get_index) first.
+    """
 
-        for idx, doc in enumerate(self.corpus):
-            score = 0
-            doc_len = self.doc_lengths[idx]
-            term_freqs = defaultdict(int)
-            for word in doc:
-                term_freqs[word] += 1
+    def __init__(self, bm25, filepath, offsets, columns, stat, digest):
+        self.bm25 = bm25
+        self.filepath = filepath
+        self.offsets = offsets  # array('q') of record start offsets, one per document
+        self.columns = columns  # [(output column, position in the header), ...]
+        self.stat = stat        # (size, mtime_ns) checked on every lookup
+        self.digest = digest    # sha1 of the file, decides when only the stat changed
 
-            for token in query_tokens:
-                if token in self.idf:
-                    tf = term_freqs[token]
-                    idf = self.idf[token]
-                    numerator = tf * (self.k1 + 1)
-                    denominator = tf + self.k1 * (1 - self.b + self.b * doc_len / self.avgdl)
-                    score += idf * numerator / denominator
+    @property
+    def fingerprint(self):
+        return self.stat + (self.digest,)
 
-            scores.append((idx, score))
+    def rows(self, doc_ids):
+        """Materialize the output columns of the given documents, in order."""
+        if not doc_ids:
+            return []
+        rows = []
+        with open(self.filepath, "rb") as f:
+            for doc_id in doc_ids:
+                f.seek(self.offsets[doc_id])
+                record = next(csv.reader(line.decode("utf-8") for line in iter(f.readline, b"")))
+                # Short records read as None, like csv.DictReader's restval
+                rows.append({col: record[i] if i < len(record) else None for col, i in self.columns})
+        return rows
 
-        return sorted(scores, key=lambda x: x[1], reverse=True)
 
+_INDEXES = {}  # (path, search_cols, output_cols, weights) -> _CsvIndex
 
-# ============ SEARCH FUNCTIONS ============
-def _load_csv(filepath):
-    """Load a CSV file and return a list of dictionaries."""
-    with open(filepath, 'r', encoding='utf-8') as f:
-        return list(csv.DictReader(f))
 
+def _file_stat(filepath):
+    st = filepath.stat()
+    return st.st_size, st.st_mtime_ns
+
+
+def _field_weights(search_cols, weights):
+    """Per-column BM25F weights aligned with search_cols, or None for plain BM25."""
+    return tuple(float(weights.get(col, 1.0)) for col in search_cols) if weights else None
+
+
+def _index_key(filepath, search_cols, output_cols, weights=None):
+    return str(filepath), tuple(search_cols), tuple(output_cols), _field_weights(search_cols, weights)
+
+
+def _cache_file(filepath, search_cols, output_cols, weights=None):
+    key = json.dumps([str(Path(filepath).resolve()), list(search_cols), list(output_cols),
+                      _field_weights(search_cols, weights), INDEX_FORMAT])
+    return CACHE_DIR / f"{Path(filepath).stem}-{hashlib.sha1(key.encode()).hexdigest()[:16]}.pickle"
+
+
+def _read_records(raw):
+    """Parse CSV bytes into (header, [(byte offset, record), ...]).
+
+    csv.reader is fed one line at a time, so after each record the consumed
+    byte count is where the next one starts, even when quoted fields span
+    lines. Blank lines are skipped, as csv.DictReader does.
+    """
+    consumed = 0
+
+    def lines():
+        nonlocal consumed
+        for line in io.BytesIO(raw):
+            consumed += len(line)
+            yield line.decode("utf-8")
+
+    reader = csv.reader(lines())
+    header = next(reader, [])
+    records = []
+    start = consumed
+    for record in reader:
+        if record:
+            records.append((start, record))
+        start = consumed
+    return header, records
+
+
+def _build_index(filepath, search_cols, output_cols, weights=None):
+    """Parse and index a CSV, hashing the same bytes that were parsed."""
+    stat = _file_stat(filepath)
+    raw = filepath.read_bytes()
+    header, records = _read_records(raw)
+    positions = {col: i for i, col in enumerate(header)}  # last duplicate wins, as in DictReader
+    data = [{col: record[positions[col]] if positions[col] < len(record) else None
+             for col in search_cols if col in positions} for _, record in records]
+    bm25 = BM25()
+    field_weights = _field_weights(search_cols, weights)
+    if field_weights:
+        bm25.fit([[row.get(col) or "" for col in search_cols] for row in data], field_weights)
+    else:
+        bm25.fit([" ".join(str(row.get(col, "")) for col in search_cols) for row in data])
+    offsets = array("q", (offset for offset, _ in records))
+    columns = [(col, positions[col]) for col in output_cols if col in positions]
+    return _CsvIndex(bm25, filepath, offsets, columns, stat, hashlib.sha1(raw).hexdigest())
+
+
+def _read_cached_index(cache_file, filepath, stat):
+    """Load a pickled index if it still matches the CSV, else None."""
+    try:
+        with open(cache_file, "rb") as f:
+            cached = pickle.load(f)
+        if cached["format"] != INDEX_FORMAT:
+            return None
+        index = _CsvIndex(BM25.from_state(cached["bm25"]), filepath, cached["offsets"], cached["columns"],
+                          tuple(cached["stat"]), cached["digest"])
+    except (OSError, EOFError, KeyError, TypeError, ValueError, pickle.UnpicklingError):
+        return None
+    if index.stat == stat:
+        return index
+    # Touched but possibly identical (checkout, copy): compare contents before rebuilding
+    if hashlib.sha1(filepath.read_bytes()).hexdigest() != index.digest:
+        return None
+    index.stat = stat
+    _write_cached_index(cache_file, index)
+    return index
+
+
+def _write_cached_index(cache_file, index):
+    """Atomically pickle an index; the cache is best-effort, so failures are ignored."""
+    payload = {"format": INDEX_FORMAT, "stat": index.stat, "digest": index.digest,
+               "bm25": index.bm25.state(), "offsets": index.offsets, "columns": index.columns}
+    tmp = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.tmp")
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp, "wb") as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cache_file)
+    except OSError:
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+
+
+def _get_index(filepath, search_cols, output_cols, weights=None):
+    """Return the index for a CSV, rebuilding it only when the file has changed.
+
+    Indexes are memoized in-process and persisted under CACHE_DIR, so later
+    calls and later processes skip CSV parsing and tokenization. Only the
+    file's size and mtime are checked while they are unchanged.
+    """
+    key = _index_key(filepath, search_cols, output_cols, weights)
+    stat = _file_stat(filepath)
+    index = _INDEXES.get(key)
+    if index is not None and index.stat == stat:
+        return index
+
+    cache_file = _cache_file(filepath, search_cols, output_cols, weights)
+    index = _read_cached_index(cache_file, filepath, stat)
+    if index is None:
+        index = _build_index(filepath, search_cols, output_cols, weights)
+        _write_cached_index(cache_file, index)
+    _INDEXES[key] = index
+    return index
+
+
+class _UnifiedIndex:
+    """One BM25 index over every CSV_CONFIG domain; documents keep their domain."""
+
+    def __init__(self, domains, parts, key):
+        self.domains = domains
+        self.parts = parts      # per-domain _CsvIndex, in domain order
+        self.key = key
+        self.bm25 = BM25.merge([part.bm25 for part in parts])
+        self.starts = list(accumulate(part.bm25.N for part in parts[:-1]))
+        self.starts.insert(0, 0)
+
+    def top_by_domain(self, query, max_results):
+        """Score the query once and split the ranking per domain.
+
+        Returns {domain: [(row index in that domain's CSV, score), ...]} with
+        at most ``max_results`` entries each, for the domains that matched.
+        """
+        ranked = defaultdict(list)
+        for doc_id, score in self.bm25.score(query):
+            part = bisect_right(self.starts, doc_id) - 1
+            hits = ranked[self.domains[part]]
+            if len(hits) < max_results:
+                hits.append((doc_id - self.starts[part], score))
+        return dict(ranked)
+
+
+_UNIFIED = None
+
+
+def _get_unified_index():
+    """Return the cross-domain index, re-merging it when any domain index changed.
+
+    It is built by concatenating the postings of the cached per-domain
+    indexes, so no CSV is re-read or re-tokenized for it. Term frequencies
+    keep their per-domain BM25F normalization; idf is computed over all
+    domains together.
+    """
+    global _UNIFIED
+    domains, parts = [], []
+    for domain, config in CSV_CONFIG.items():
+        filepath = DATA_DIR / config["file"]
+        if filepath.exists():
+            domains.append(domain)
+            parts.append(_get_index(filepath, config["search_cols"], config["output_cols"], config.get("search_weights")))
+    key = tuple(part.fingerprint for part in parts)
+    if _UNIFIED is None or _UNIFIED.key != key or _UNIFIED.domains != domains:
+        _UNIFIED = _UnifiedIndex(domains, parts, key)
+    return _UNIFIED
+
+
+# ============ QUERY CACHE ============
+class _QueryCache:
+    """Bounded LRU of search results with hit/miss counters.
+
+    Keys include the fingerprint of the index they were computed from, so
+    editing a CSV invalidates its entries without any bookkeeping: they are
+    never looked up again and age out. With ``path`` the cache is backed by
+    a SQLite file shared by every process; the same size bound applies, but
+    is only enforced every ``trim_every`` puts, so the file may briefly hold
+    up to that many extra rows.
+    """
+
+    trim_every = 64
+
+    def __init__(self, maxsize, path=None):
+        self.maxsize = maxsize
+        self.path = path
+        self.hits = self.misses = self.disk_hits = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._disk_puts = 0
+
+    def _disk(self):
+        if self._db is None and self.path is not None:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._db = sqlite3.connect(str(self.path), timeout=1, check_same_thread=False)
+                self._db.execute("CREATE TABLE IF NOT EXISTS results"
+                                 " (key TEXT PRIMARY KEY, value TEXT NOT NULL, used REAL NOT NULL)")
+            except sqlite3.Error:
+                self.path = None  # best-effort, like the index cache
+                self._db = None
+        return self._db
+
+    @staticmethod
+    def _disk_key(key):
+        return hashlib.sha1(json.dumps(key).encode()).hexdigest()
+
+    def get(self, key):
+        """Cached value for ``key``, or None."""
+        if self.maxsize <= 0:
+            return None
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            value = self._disk_get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, value)
+            return value
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._remember(key, value)
+            db = self._disk()
+            if db is None:
+                return
+            try:
+                with db:
+                    db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, julianday('now'))",
+                               (self._disk_key(key), json.dumps(value, ensure_ascii=False)))
+                    if self._disk_puts % self.trim_every == 0:
+                        self._trim(db)
+                self._disk_puts += 1
+            except sqlite3.Error:
+                pass
+
+    def _trim(self, db):
+        """Drop the least recently used rows beyond maxsize, if there are any."""
+        (count,) = db.execute("SELECT COUNT(*) FROM results").fetchone()
+        if count > self.maxsize:
+            db.execute("DELETE FROM results WHERE key IN"
+                       " (SELECT key FROM results ORDER BY used, rowid LIMIT ?)", (count - self.maxsize,))
+
+    def _remember(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def _disk_get(self, key):
+        db = self._disk()
+        if db is None:
+            return None
+        try:
+            with db:
+                disk_key = self._disk_key(key)
+                row = db.execute("SELECT value FROM results WHERE key = ?", (disk_key,)).fetchone()
+                if row is not None:
+                    db.execute("UPDATE results SET used = julianday('now') WHERE key = ?", (disk_key,))
+        except sqlite3.Error:
+            return None
+        return json.loads(row[0]) if row else None
+
+    def info(self):
+        return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses,
+                "size": len(self._entries), "maxsize": self.maxsize,
+                "disk": str(self.path) if self.path is not None else None}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.disk_hits = 0
+            if self._disk() is not None:
+                try:
+                    with self._db:
+                        self._db.execute("DELETE FROM results")
+                except sqlite3.Error:
+                    pass
+
+
+_QUERY_CACHE = _QueryCache(QUERY_CACHE_SIZE, CACHE_DIR / "query-cache.sqlite" if QUERY_CACHE_DISK else None)
+
+
+def query_cache_info():
+    """Hit/miss counters and size of the search result cache."""
+    return _QUERY_CACHE.info()
+
+
+def clear_query_cache():
+    _QUERY_CACHE.clear()
 
-def _search_csv(filepath, search_cols, output_cols, query, max_results):
+
+# ============ SEARCH FUNCTIONS ============
+def _search_csv(filepath, search_cols, output_cols, query, max_results, weights=None):
     """Core search function using BM25.
     
     This function performs a search on a CSV file specified by the  `filepath`,
     utilizing the BM25 algorithm to rank results based  on the provided `query`. It
-    first loads the CSV data and constructs  documents from the specified
-    `search_cols`. After fitting the BM25  model to these documents, it retrieves
-    and ranks the results,  returning the top entries that meet the score criteria.
+    fetches the cached index for the file (built from the specified `search_cols`
+    on first use or after the file changes), ranks its documents, and returns
+    the top entries that meet the score criteria.
     
     Args:
         filepath: The path to the CSV file to be searched.
@@ -189,80 +733,253 @@ def _search_csv(filepath, search_cols, output_cols, query, max_results):
         output_cols: The columns to include in the output results.
         query: The search query to be used for ranking.
         max_results: The maximum number of results to return.
+        weights: Optional BM25F weights by column name (see CSV_CONFIG).
     """
     if not filepath.exists():
         return []
+    return _search_csv_many(filepath, search_cols, output_cols, [(query, max_results)], weights)[0]
 
-    data = _load_csv(filepath)
 
-    # Build documents from search columns
-    documents = [" ".join(str(row.get(col, "")) for col in search_cols) for row in data]
+def _search_csv_many(filepath, search_cols, output_cols, queries, weights=None):
+    """Run several (query, max_results) searches against one CSV index.
 
-    # BM25 search
-    bm25 = BM25()
-    bm25.fit(documents)
-    ranked = bm25.score(query)
+    The index is fetched once; queries answered by the result cache are
+    skipped and the rest are scored in one score_many() call. The result
+    lists come back in input order.
+    """
+    index = _get_index(filepath, search_cols, output_cols, weights)
+    index_key = _index_key(filepath, search_cols, output_cols, weights)
+    results = [None] * len(queries)
+    misses = []
+    for pos, (query, max_results) in enumerate(queries):
+        key = ("csv", index_key, index.fingerprint, tuple(index.bm25.tokenize(query)), max_results)
+        results[pos] = _QUERY_CACHE.get(key)
+        if results[pos] is None:
+            misses.append((pos, key, query, max_results))
+
+    if misses:
+        top_k = max(max_results for _, _, _, max_results in misses)
+        ranked_lists = index.bm25.score_many([query for _, _, query, _ in misses], top_k=top_k)
+        for (pos, key, _, max_results), ranked in zip(misses, ranked_lists):
+            # Get top results with score > 0
+            results[pos] = index.rows([idx for idx, score in ranked[:max_results] if score > 0])
+            _QUERY_CACHE.put(key, results[pos])
+
+    # Callers own their rows; the cached ones must stay untouched
+    return [[dict(row) for row in rows] for rows in results]
+
+
+DOMAIN_KEYWORDS = {
+    "color": ["color", "palette", "hex", "#", "rgb"],
+    "chart": ["chart", "graph", "visualization", "trend", "bar", "pie", "scatter", "heatmap", "funnel"],
+    "landing": ["landing", "page", "cta", "conversion", "hero", "testimonial", "pricing", "section"],
+    "product": ["saas", "ecommerce", "e-commerce", "fintech", "healthcare", "gaming", "portfolio", "crypto", "dashboard"],
+    "prompt": ["prompt", "css", "implementation", "variable", "checklist", "tailwind"],
+    "style": ["style", "design", "ui", "minimalism", "glassmorphism", "neumorphism", "brutalism", "dark mode", "flat", "aurora"],
+    "ux": ["ux", "usability", "accessibility", "wcag", "touch", "scroll", "animation", "keyboard", "navigation", "mobile"],
+    "typography": ["font", "typography", "heading", "serif", "sans"],
+    "icons": ["icon", "icons", "lucide", "heroicons", "symbol", "glyph", "pictogram", "svg icon"],
+    "react": ["react", "next.js", "nextjs", "suspense", "memo", "usecallback", "useeffect", "rerender", "bundle", "waterfall", "barrel", "dynamic import", "rsc", "server component"],
+    "web": ["aria", "focus", "outline", "semantic", "virtualize", "autocomplete", "form", "input type", "preconnect"]
+}
 
-    # Get top results with score > 0
-    results = []
-    for idx, score in ranked[:max_results]:
-        if score > 0:
-            row = data[idx]
-            results.append({col: row.get(col, "") for col in output_cols if col in row})
 
-    return results
+class _KeywordAutomaton:
+    """Aho-Corasick automaton matching every domain keyword in one pass.
+
+    A keyword only counts as a whole word: an edge that is a word character
+    must not touch another word character, except that a plural "s" or "es"
+    may follow. So "bar" matches "bar" and "bars" but not "sidebar", while
+    "#" matches inside "#fff".
+    """
+
+    def __init__(self, domain_keywords):
+        self.keywords = []      # keyword id -> (keyword, domains)
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]         # state -> keyword ids ending there (incl. via fail links)
+        by_keyword = defaultdict(list)
+        for domain, keywords in domain_keywords.items():
+            for keyword in keywords:
+                by_keyword[keyword.lower()].append(domain)
+        for keyword, domains in by_keyword.items():
+            state = 0
+            for ch in keyword:
+                if ch not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                    self.goto[state][ch] = len(self.goto) - 1
+                state = self.goto[state][ch]
+            self.out[state].append(len(self.keywords))
+            self.keywords.append((keyword, domains))
+
+        # Breadth-first fail links; a state's output includes its fail state's
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, child in self.goto[state].items():
+                queue.append(child)
+                if state:
+                    fallback = self.fail[state]
+                    while fallback and ch not in self.goto[fallback]:
+                        fallback = self.fail[fallback]
+                    self.fail[child] = self.goto[fallback].get(ch, 0)
+                self.out[child] = self.out[child] + self.out[self.fail[child]]
+
+    @staticmethod
+    def _is_word(ch):
+        return ch.isalnum() or ch == "_"
+
+    def _bounded(self, text, start, end, keyword):
+        if self._is_word(keyword[0]) and start > 0 and self._is_word(text[start - 1]):
+            return False
+        if not self._is_word(keyword[-1]) or end == len(text) or not self._is_word(text[end]):
+            return True
+        for suffix in ("s", "es"):
+            stop = end + len(suffix)
+            if text.startswith(suffix, end) and (stop == len(text) or not self._is_word(text[stop])):
+                return True
+        return False
+
+    def scores(self, text):
+        """Number of distinct keywords of each domain found in ``text``."""
+        text = text.lower()
+        found = set()
+        goto, fail, out = self.goto, self.fail, self.out
+        state = 0
+        for end, ch in enumerate(text, 1):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for keyword_id in out[state]:
+                keyword = self.keywords[keyword_id][0]
+                if keyword_id not in found and self._bounded(text, end - len(keyword), end, keyword):
+                    found.add(keyword_id)
+        scores = defaultdict(int)
+        for keyword_id in found:
+            for domain in self.keywords[keyword_id][1]:
+                scores[domain] += 1
+        return dict(scores)
+
+
+_DOMAIN_MATCHER = _KeywordAutomaton(DOMAIN_KEYWORDS)
 
 
 def detect_domain(query):
     """Auto-detect the most relevant domain from a query.
     
-    This function analyzes the input `query` by converting it to lowercase and
-    scoring it against predefined domain keywords. It utilizes a dictionary  of
-    keywords associated with various domains to calculate scores based on  the
-    presence of these keywords in the query. The domain with the highest  score is
-    returned, or "style" is returned if no relevant keywords are found.
+    This function scores the input `query` against the DOMAIN_KEYWORDS of
+    every domain in a single pass of a precompiled keyword automaton, which
+    counts whole-word keyword matches per domain. The domain with the highest
+    score is returned; if no keyword matches, the domain whose documents score
+    highest for the query (see route_domain) is used, and "style" if nothing
+    matches.
     """
-    query_lower = query.lower()
-
-    domain_keywords = {
-        "color": ["color", "palette", "hex", "#", "rgb"],
-        "chart": ["chart", "graph", "visualization", "trend", "bar", "pie", "scatter", "heatmap", "funnel"],
-        "landing": ["landing", "page", "cta", "conversion", "hero", "testimonial", "pricing", "section"],
-        "product": ["saas", "ecommerce", "e-commerce", "fintech", "healthcare", "gaming", "portfolio", "crypto", "dashboard"],
-        "prompt": ["prompt", "css", "implementation", "variable", "checklist", "tailwind"],
-        "style": ["style", "design", "ui", "minimalism", "glassmorphism", "neumorphism", "brutalism", "dark mode", "flat", "aurora"],
-        "ux": ["ux", "usability", "accessibility", "wcag", "touch", "scroll", "animation", "keyboard", "navigation", "mobile"],
-        "typography": ["font", "typography", "heading", "serif", "sans"],
-        "icons": ["icon", "icons", "lucide", "heroicons", "symbol", "glyph", "pictogram", "svg icon"],
-        "react": ["react", "next.js", "nextjs", "suspense", "memo", "usecallback", "useeffect", "rerender", "bundle", "waterfall", "barrel", "dynamic import", "rsc", "server component"],
-        "web": ["aria", "focus", "outline", "semantic", "virtualize", "autocomplete", "form", "input type", "preconnect"]
-    }
+    scores = _DOMAIN_MATCHER.scores(query)
+    if scores:
+        return max(DOMAIN_KEYWORDS, key=lambda domain: scores.get(domain, 0))
+    return route_domain(query) or "style"
 
-    scores = {domain: sum(1 for kw in keywords if kw in query_lower) for domain, keywords in domain_keywords.items()}
-    best = max(scores, key=scores.get)
-    return best if scores[best] > 0 else "style"
 
+def domain_scores(query, max_results=MAX_RESULTS):
+    """BM25 mass per domain: the sum of each domain's top ``max_results`` scores.
 
-def search(query, domain=None, max_results=MAX_RESULTS):
-    """Main search function with auto-domain detection."""
-    if domain is None:
-        domain = detect_domain(query)
+    Computed in one scoring pass over the unified index; domains without a
+    matching document are left out. Summing only the top scores keeps large
+    CSVs from winning on row count alone.
+    """
+    ranked = _get_unified_index().top_by_domain(query, max_results)
+    return {domain: sum(score for _, score in hits) for domain, hits in ranked.items()}
 
-    config = CSV_CONFIG.get(domain, CSV_CONFIG["style"])
-    filepath = DATA_DIR / config["file"]
 
-    if not filepath.exists():
-        return {"error": f"File not found: {filepath}", "domain": domain}
+def route_domain(query):
+    """The domain with the most BM25 mass for the query, or None if no document matches."""
+    scores = domain_scores(query)
+    return max(scores, key=scores.get) if scores else None
 
-    results = _search_csv(filepath, config["search_cols"], config["output_cols"], query, max_results)
 
-    return {
-        "domain": domain,
-        "query": query,
-        "file": config["file"],
-        "count": len(results),
-        "results": results
-    }
+def search(query, domain=None, max_results=MAX_RESULTS):
+    """Main search function with auto-domain detection ("all" searches every domain)."""
+    return search_many([(query, domain, max_results)])[0]
+
+
+def search_all(query, max_results=MAX_RESULTS):
+    """Search every domain in a single scoring pass over the unified index.
+
+    Returns the top ``max_results`` rows of each domain that matched, as
+    search()-shaped results with the domain's BM25 mass as "score", ordered
+    by that mass. Idf is shared across domains, so per-domain rankings can
+    differ slightly from search(query, domain).
+    """
+    index = _get_unified_index()
+    key = ("all", index.key, tuple(index.bm25.tokenize(query)), max_results)
+    per_domain = _QUERY_CACHE.get(key)
+    if per_domain is None:
+        per_domain = _search_unified(index, query, max_results)
+        _QUERY_CACHE.put(key, per_domain)
+    per_domain = [dict(result, query=query, results=[dict(row) for row in result["results"]]) for result in per_domain]
+    return {"domain": "all", "query": query, "count": len(per_domain), "domains": per_domain}
+
+
+def _search_unified(index, query, max_results):
+    ranked = index.top_by_domain(query, max_results)
+    per_domain = []
+    for domain, hits in sorted(ranked.items(), key=lambda item: -sum(score for _, score in item[1])):
+        part = index.parts[index.domains.index(domain)]
+        per_domain.append({
+            "domain": domain,
+            "query": query,
+            "file": CSV_CONFIG[domain]["file"],
+            "score": round(sum(score for _, score in hits), 4),
+            "count": len(hits),
+            "results": part.rows([idx for idx, _ in hits])
+        })
+    return per_domain
+
+
+def search_many(queries):
+    """Run many domain searches, loading and indexing each CSV only once.
+
+    ``queries`` is a sequence of ``(query, domain, max_results)`` tuples;
+    ``domain`` may be None for auto-detection or "all" (see search_all),
+    and ``max_results`` may be left off. Queries are grouped by domain and each group is scored in one
+    pass over that domain's index. Returns one search() result per query,
+    in input order.
+    """
+    results = [None] * len(queries)
+    groups = defaultdict(list)
+    for pos, item in enumerate(queries):
+        query, domain = item[0], item[1] if len(item) > 1 else None
+        max_results = item[2] if len(item) > 2 else MAX_RESULTS
+        if domain is None:
+            domain = detect_domain(query)
+        groups[domain].append((pos, query, max_results))
+
+    for domain, group in groups.items():
+        if domain == "all":
+            for pos, query, max_results in group:
+                results[pos] = search_all(query, max_results)
+            continue
+        config = CSV_CONFIG.get(domain, CSV_CONFIG["style"])
+        filepath = DATA_DIR / config["file"]
+
+        if not filepath.exists():
+            for pos, _, _ in group:
+                results[pos] = {"error": f"File not found: {filepath}", "domain": domain}
+            continue
+
+        rows = _search_csv_many(filepath, config["search_cols"], config["output_cols"],
+                                [(query, max_results) for _, query, max_results in group], config.get("search_weights"))
+        for (pos, query, _), found in zip(group, rows):
+            results[pos] = {
+                "domain": domain,
+                "query": query,
+                "file": config["file"],
+                "count": len(found),
+                "results": found
+            }
+    return results
 
 
 def search_stack(query, stack, max_results=MAX_RESULTS):
@@ -275,7 +992,8 @@ def search_stack(query, stack, max_results=MAX_RESULTS):
     if not filepath.exists():
         return {"error": f"Stack file not found: {filepath}", "stack": stack}
 
-    results = _search_csv(filepath, _STACK_COLS["search_cols"], _STACK_COLS["output_cols"], query, max_results)
+    results = _search_csv(filepath, _STACK_COLS["search_cols"], _STACK_COLS["output_cols"], query, max_results,
+                          _STACK_COLS["search_weights"])
 
     return {
         "domain": "stack",
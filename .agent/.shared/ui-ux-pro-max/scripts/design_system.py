@@ -18,7 +18,7 @@ import json
 import os
 from datetime import datetime
 from pathlib import Path
-from core import search, DATA_DIR
+from core import search, search_many, DATA_DIR
 
 
 # ============ CONFIGURATION ============
@@ -56,18 +56,18 @@ class DesignSystemGenerator:
         list is provided, it combines the query with the top two priority keywords
         from the list. The results are collected in a dictionary, where each domain
         maps to its corresponding search results based on the specified maximum results
-        in the configuration.
+        in the configuration. All domains are searched in one search_many() batch.
         """
-        results = {}
+        queries = []
         for domain, config in SEARCH_CONFIG.items():
             if domain == "style" and style_priority:
                 # For style, also search with priority keywords
                 priority_query = " ".join(style_priority[:2]) if style_priority else query
                 combined_query = f"{query} {priority_query}"
-                results[domain] = search(combined_query, domain, config["max_results"])
+                queries.append((combined_query, domain, config["max_results"]))
             else:
-                results[domain] = search(query, domain, config["max_results"])
-        return results
+                queries.append((query, domain, config["max_results"]))
+        return dict(zip(SEARCH_CONFIG, search_many(queries)))
 
     def _find_reasoning_rule(self, category: str) -> dict:
         """Find matching reasoning rule for a category.
@@ -1002,16 +1002,16 @@ def _generate_intelligent_overrides(page_name: str, page_query: str, design_syst
             spacing, typography, colors, components, unique components, and
             recommendations.
     """
-    from core import search
-    
     page_lower = page_name.lower()
     query_lower = (page_query or "").lower()
     combined_context = f"{page_lower} {query_lower}"
     
     # Search across multiple domains for page-specific guidance
-    style_search = search(combined_context, "style", max_results=1)
-    ux_search = search(combined_context, "ux", max_results=3)
-    landing_search = search(combined_context, "landing", max_results=1)
+    style_search, ux_search, landing_search = search_many([
+        (combined_context, "style", 1),
+        (combined_context, "ux", 3),
+        (combined_context, "landing", 1),
+    ])
     
     # Extract results from search response
     style_results = style_search.get("results", [])
@@ -5,18 +5,26 @@ UI/UX Pro Max Search - BM25 search engine for UI/UX style guides
 Usage: python search.py "<query>" [--domain <domain>] [--stack <stack>] [--max-results 3]
        python search.py "<query>" --design-system [-p "Project Name"]
        python search.py "<query>" --design-system --persist [-p "Project Name"] [--page "dashboard"]
+       python search.py --batch [--max-results 3] < queries.ndjson
 
-Domains: style, prompt, color, chart, landing, product, ux, typography
+Domains: style, prompt, color, chart, landing, product, ux, typography (all: every domain)
 Stacks: html-tailwind, react, nextjs
 
+Batch mode reads one JSON object per line from stdin, e.g.
+  {"query": "fintech dashboard", "domain": "color", "max_results": 2}
+  {"query": "form validation", "stack": "react"}
+("domain" and "max_results" are optional) and writes one JSON result per
+line, in input order. Each CSV is loaded and indexed once per batch.
+
 Persistence (Master + Overrides pattern):
   --persist    Save design system to design-system/MASTER.md
   --page       Also create a page-specific override file in design-system/pages/
 """
 
 import argparse
-from core import CSV_CONFIG, AVAILABLE_STACKS, MAX_RESULTS, search, search_stack
-from design_system import generate_design_system, persist_design_system
+import json
+import sys
+from core import CSV_CONFIG, AVAILABLE_STACKS, DATA_DIR, MAX_RESULTS, search, search_many, search_stack
 
 
 def format_output(result):
@@ -38,6 +46,9 @@ def format_output(result):
     """
     if "error" in result:
         return f"Error: {result['error']}"
+    if "domains" in result:
+        header = f"## UI Pro Max Search Results (all domains)\n**Query:** {result['query']} | **Domains matched:** {result['count']}\n"
+        return "\n".join([header] + [format_output(domain_result) for domain_result in result["domains"]])
 
     output = []
     if result.get("stack"):
@@ -60,13 +71,77 @@ def format_output(result):
     return "\n".join(output)
 
 
+def _request_error(request, limit):
+    """Why a decoded batch request cannot be run, or None if it is valid."""
+    if not isinstance(request, dict) or "query" not in request:
+        return f"Invalid batch request: {request!r}"
+    if not isinstance(request["query"], str):
+        return f"query must be a string, got {request['query']!r}"
+    # bool is an int subclass, so True would otherwise pass as 1
+    if not isinstance(limit, int) or isinstance(limit, bool) or limit < 1:
+        return f"max_results must be a positive integer, got {limit!r}"
+    for field in ("domain", "stack"):
+        if request.get(field) is not None and not isinstance(request[field], str):
+            return f"{field} must be a string, got {request[field]!r}"
+    return None
+
+
+def run_requests(requests, max_results=MAX_RESULTS):
+    """Answer decoded batch requests; returns one result dict per request.
+
+    Domain queries go through search_many() so each CSV is indexed once;
+    a malformed request (no string query, max_results not a positive int)
+    yields an {"error": ...} result in its place and the rest still run.
+    """
+    results = []
+    domain_jobs = []
+    for request in requests:
+        limit = request.get("max_results", max_results) if isinstance(request, dict) else None
+        error = _request_error(request, limit)
+        if error:
+            results.append({"error": error})
+            continue
+        if request.get("stack"):
+            results.append(search_stack(request["query"], request["stack"], limit))
+        else:
+            domain_jobs.append((len(results), (request["query"], request.get("domain"), limit)))
+            results.append(None)
+
+    for (pos, _), result in zip(domain_jobs, search_many([job for _, job in domain_jobs])):
+        results[pos] = result
+    return results
+
+
+def run_batch(lines, max_results=MAX_RESULTS):
+    """Answer NDJSON search requests; blank lines are skipped and malformed
+    ones yield an {"error": ...} result to keep output aligned with input."""
+    requests = []
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            requests.append(json.loads(line))
+        except ValueError as e:
+            requests.append(f"{line.strip()} ({e})")
+    return run_requests(requests, max_results)
+
+
+def query_server(payload):
+    """Send a request to a running search_server.py; None means search locally."""
+    from search_server import request
+    reply = request(dict(payload, data_dir=str(DATA_DIR)))
+    return reply["result"] if isinstance(reply, dict) and "result" in reply else None
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="UI Pro Max Search")
-    parser.add_argument("query", help="Search query")
-    parser.add_argument("--domain", "-d", choices=list(CSV_CONFIG.keys()), help="Search domain")
+    parser.add_argument("query", nargs="?", help="Search query")
+    parser.add_argument("--domain", "-d", choices=list(CSV_CONFIG.keys()) + ["all"], help="Search domain (all: every domain in one pass)")
     parser.add_argument("--stack", "-s", choices=AVAILABLE_STACKS, help="Stack-specific search (html-tailwind, react, nextjs)")
     parser.add_argument("--max-results", "-n", type=int, default=MAX_RESULTS, help="Max results (default: 3)")
     parser.add_argument("--json", action="store_true", help="Output as JSON")
+    parser.add_argument("--batch", action="store_true", help="Read NDJSON queries from stdin, write NDJSON results")
+    parser.add_argument("--no-server", action="store_true", help="Search in-process even if search_server.py is running")
     # Design system generation
     parser.add_argument("--design-system", "-ds", action="store_true", help="Generate complete design system recommendation")
     parser.add_argument("--project-name", "-p", type=str, default=None, help="Project name for design system output")
@@ -77,17 +152,34 @@ if __name__ == "__main__":
     parser.add_argument("--output-dir", "-o", type=str, default=None, help="Output directory for persisted files (default: current directory)")
 
     args = parser.parse_args()
+    if args.query is None and not args.batch:
+        parser.error("the query argument is required (or use --batch)")
+
+    use_server = not args.no_server
 
+    if args.batch:
+        lines = sys.stdin.readlines()
+        results = query_server({"op": "batch", "lines": lines, "max_results": args.max_results}) if use_server else None
+        if results is None:
+            results = run_batch(lines, args.max_results)
+        for result in results:
+            print(json.dumps(result, ensure_ascii=False))
     # Design system takes priority
-    if args.design_system:
-        result = generate_design_system(
-            args.query, 
-            args.project_name, 
-            args.format,
-            persist=args.persist,
-            page=args.page,
-            output_dir=args.output_dir
-        )
+    elif args.design_system:
+        result = None
+        if use_server and not args.persist:
+            result = query_server({"op": "design_system", "query": args.query,
+                                   "project_name": args.project_name, "format": args.format})
+        if result is None:
+            from design_system import generate_design_system
+            result = generate_design_system(
+                args.query, 
+                args.project_name, 
+                args.format,
+                persist=args.persist,
+                page=args.page,
+                output_dir=args.output_dir
+            )
         print(result)
         
         # Print persistence confirmation
@@ -103,19 +195,17 @@ if __name__ == "__main__":
             print(f"📖 Usage: When building a page, check design-system/{project_slug}/pages/[page].md first.")
             print(f"   If exists, its rules override MASTER.md. Otherwise, use MASTER.md.")
             print("=" * 60)
-    # Stack search
-    elif args.stack:
-        result = search_stack(args.query, args.stack, args.max_results)
-        if args.json:
-            import json
-            print(json.dumps(result, indent=2, ensure_ascii=False))
-        else:
-            print(format_output(result))
-    # Domain search
+    # Stack or domain search
     else:
-        result = search(args.query, args.domain, args.max_results)
+        request = {"op": "search", "query": args.query, "max_results": args.max_results}
+        request.update({"stack": args.stack} if args.stack else {"domain": args.domain})
+        result = query_server(request) if use_server else None
+        if result is None:
+            if args.stack:
+                result = search_stack(args.query, args.stack, args.max_results)
+            else:
+                result = search(args.query, args.domain, args.max_results)
         if args.json:
-            import json
             print(json.dumps(result, indent=2, ensure_ascii=False))
         else:
             print(format_output(result))
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+UI/UX Pro Max Search Server - keeps every search index warm behind a Unix socket
+Usage: python search_server.py [--socket PATH]     # serve in the foreground
+       python search_server.py --ping              # check a running server
+       python search_server.py --stop              # shut a running server down
+
+Agent workflows call search.py many times in a row; each call otherwise pays
+interpreter startup, CSV parsing and index building. The server loads every
+CSV_CONFIG and STACK_CONFIG index once and answers newline-delimited JSON
+requests. Indexes are looked up through core's fingerprinted cache on every
+request, so an edited CSV is re-indexed on the next query that touches it.
+
+Requests (one JSON object per line, one JSON reply per line):
+  {"op": "search", "query": "...", "domain": "color", "max_results": 3}
+  {"op": "search", "query": "...", "stack": "react"}
+  {"op": "batch", "lines": ["<search.py --batch NDJSON line>", ...]}
+  {"op": "design_system", "query": "...", "project_name": "...", "format": "ascii"}
+  {"op": "ping"} / {"op": "stop"}
+Replies are {"result": ...} or, when the server cannot answer, {"error": ...}.
+Every request may carry "data_dir"; a server indexing a different data
+directory answers with an error so the client falls back to a local search.
+
+search.py uses a running server automatically (see --no-server).
+"""
+
+import argparse
+import json
+import os
+import socket
+import socketserver
+import stat
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+SOCKET_ENV = "UI_UX_PRO_MAX_SOCKET"
+CLIENT_TIMEOUT = 10.0  # seconds; a slower server is treated as unavailable
+
+
+def socket_path():
+    """Socket location: $UI_UX_PRO_MAX_SOCKET, else per-user in the runtime or temp dir."""
+    if os.environ.get(SOCKET_ENV):
+        return Path(os.environ[SOCKET_ENV])
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return Path(runtime_dir) / "ui-ux-pro-max.sock"
+    return Path(tempfile.gettempdir()) / f"ui-ux-pro-max-{os.getuid()}.sock"
+
+
+def _own_socket(path):
+    """True if ``path`` is a socket owned by this user (symlinks are not followed).
+
+    The default path in the temp dir is predictable, so anything else there
+    may have been planted by another local user and must not be trusted.
+    """
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    return stat.S_ISSOCK(st.st_mode) and st.st_uid == os.getuid()
+
+
+# ============ CLIENT ============
+def request(payload, path=None, timeout=CLIENT_TIMEOUT):
+    """Send one request to a running server and return its reply.
+
+    Returns None when no server is listening, the socket is not this user's
+    own, or it does not answer in time, so callers can fall back to
+    searching locally.
+    """
+    path = path or socket_path()
+    if not hasattr(socket, "AF_UNIX") or not _own_socket(path):
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(str(path))
+            sock.sendall(json.dumps(payload).encode("utf-8") + b"\n")
+            with sock.makefile("rb") as reader:
+                line = reader.readline()
+        return json.loads(line) if line else None
+    except (OSError, ValueError):
+        return None
+
+
+# ============ SERVER ============
+def handle(payload):
+    """Answer one decoded request with {"result": ...} or {"error": ...}."""
+    from core import DATA_DIR, MAX_RESULTS, _INDEXES, query_cache_info
+    from search import run_batch, run_requests
+
+    op = payload.get("op", "search")
+    if payload.get("data_dir") not in (None, str(DATA_DIR)):
+        return {"error": f"Server indexes {DATA_DIR}, not {payload['data_dir']}"}
+    if op == "ping":
+        return {"result": {"pid": os.getpid(), "data_dir": str(DATA_DIR), "indexes": len(_INDEXES),
+                           "query_cache": query_cache_info()}}
+    if op == "search":
+        return {"result": run_requests([payload])[0]}
+    if op == "batch":
+        return {"result": run_batch(payload.get("lines", []), payload.get("max_results", MAX_RESULTS))}
+    if op == "design_system":
+        from design_system import generate_design_system
+        return {"result": generate_design_system(payload["query"], payload.get("project_name"),
+                                                 payload.get("format", "ascii"))}
+    return {"error": f"Unknown op: {op}"}
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                payload = json.loads(line)
+                if payload.get("op") == "stop":
+                    reply = {"result": "stopping"}
+                    threading.Thread(target=self.server.shutdown, daemon=True).start()
+                else:
+                    reply = handle(payload)
+            except Exception as e:  # one bad request must not take the server down
+                reply = {"error": f"{type(e).__name__}: {e}"}
+            self.wfile.write(json.dumps(reply, ensure_ascii=False).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+class SearchServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def warm():
+    """Build or load every domain, stack and the cross-domain index; returns how
+    many CSV indexes were loaded."""
+    from core import CSV_CONFIG, DATA_DIR, STACK_CONFIG, _STACK_COLS, _get_index, _get_unified_index
+
+    specs = [(c["file"], c) for c in CSV_CONFIG.values()] + [(c["file"], _STACK_COLS) for c in STACK_CONFIG.values()]
+    loaded = 0
+    for file, config in specs:
+        if (DATA_DIR / file).exists():
+            _get_index(DATA_DIR / file, config["search_cols"], config["output_cols"], config.get("search_weights"))
+            loaded += 1
+    _get_unified_index()
+    return loaded
+
+
+def serve(path):
+    """Serve until stopped; refuses to replace a live server's socket or
+    anything at ``path`` that is not a socket owned by this user."""
+    if os.path.lexists(path):
+        if not _own_socket(path):
+            sys.exit(f"{path} exists and is not a socket owned by this user; remove it or pass --socket")
+        if request({"op": "ping"}, path, timeout=1) is not None:
+            sys.exit(f"A search server is already listening on {path}")
+        path.unlink()  # stale socket from a server that died
+    print(f"Warmed {warm()} indexes", flush=True)
+    old_umask = os.umask(0o177)  # socket is private to this user
+    try:
+        server = SearchServer(str(path), _Handler)
+    finally:
+        os.umask(old_umask)
+    print(f"Listening on {path}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="UI Pro Max warm search server")
+    parser.add_argument("--socket", type=Path, default=None, help=f"Socket path (default: ${SOCKET_ENV} or per-user runtime dir)")
+    parser.add_argument("--ping", action="store_true", help="Report whether a server is running")
+    parser.add_argument("--stop", action="store_true", help="Stop a running server")
+    args = parser.parse_args()
+
+    path = args.socket or socket_path()
+    if args.ping or args.stop:
+        reply = request({"op": "stop" if args.stop else "ping"}, path)
+        print(json.dumps(reply.get("result")) if reply else f"No search server on {path}")
+        sys.exit(0 if reply else 1)
+    if not hasattr(socket, "AF_UNIX"):
+        sys.exit("Unix domain sockets are not available on this platform")
+    serve(path)
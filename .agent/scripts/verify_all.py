@@ -82,6 +82,7 @@ VERIFICATION_SUITE = [
         "category": "Data Layer",
         "checks": [
             ("Schema Validation", ".agent/skills/database-design/scripts/schema_validator.py", False),
+            ("Query Plans", ".agent/skills/database-design/scripts/query_plan_advisor.py", False),
         ]
     },
     
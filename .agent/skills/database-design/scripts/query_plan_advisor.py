@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+Query Plan Advisor - EXPLAIN QUERY PLAN checks for SQLite/Turso schemas
+Loads a .sql schema into an in-memory SQLite, fills it with synthetic rows,
+and plans every SQL string literal found in the project's JS/TS sources.
+
+Usage:
+    python query_plan_advisor.py <project_path> [--schema turso-schema.sql] [--scale 1]
+    python query_plan_advisor.py . --save-baseline .agent/query-plan-baseline.json
+    python query_plan_advisor.py . --baseline .agent/query-plan-baseline.json   # exit 1 on new findings
+
+Checks:
+    - Full table scans (SCAN <table> without an index)
+    - Temp B-trees for ORDER BY / GROUP BY / DISTINCT
+    - Automatic (transient) indexes the planner builds per query
+    - Index lookups that still hit the table (covering index candidates)
+    - Index count on tables the code inserts into (write amplification)
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Fix Windows console encoding
+try:
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+except:
+    pass
+
+
+DEFAULT_SCHEMAS = ["turso-schema.sql", "schema.sql", "db/schema.sql"]
+DEFAULT_SOURCES = ["gateway", "scripts", "app", "lib"]
+SOURCE_EXTS = {".js", ".mjs", ".cjs", ".ts"}
+SKIP_DIRS = {"node_modules", ".next", ".git", "dist", "build"}
+# High-volume tables get this many times the base row count
+TABLE_WEIGHTS = {"agent_metrics": 50, "alerts": 5, "api_rate_limits": 5, "scaling_events": 2}
+# Tables smaller than this are not worth flagging for full scans
+MIN_ROWS_TO_FLAG = 500
+
+JS_STRING = re.compile(r"`(?:\\.|[^`\\])*`|'(?:\\.|[^'\\\n])*'|\"(?:\\.|[^\"\\\n])*\"", re.DOTALL)
+SQL_START = re.compile(r"^\s*(SELECT|INSERT|UPDATE|DELETE|WITH|REPLACE)\b", re.IGNORECASE)
+INTERPOLATION = re.compile(r"\$\{[^}]*\}")
+PARAM = re.compile(r"'(?:[^']|'')*'|\?\d*|[:@$][A-Za-z_]\w*")
+
+
+# ============ EXTRACTION ============
+def find_schema(project_path: Path, schema: str = None) -> Path:
+    """Return the schema file to load, or None."""
+    candidates = [schema] if schema else DEFAULT_SCHEMAS
+    for name in candidates:
+        path = (project_path / name) if not Path(name).is_absolute() else Path(name)
+        if path.exists():
+            return path
+    return None
+
+
+def iter_sources(project_path: Path, roots: list):
+    for root in roots:
+        base = project_path / root
+        if base.is_file():
+            yield base
+            continue
+        for path in sorted(base.rglob("*")):
+            if path.suffix in SOURCE_EXTS and ".test." not in path.name \
+                    and not SKIP_DIRS.intersection(path.relative_to(project_path).parts):
+                yield path
+
+
+def extract_queries(project_path: Path, roots: list) -> list:
+    """Find SQL string literals; return [{"sql", "locations", "dynamic"}] deduplicated by SQL text."""
+    queries = {}
+    for path in iter_sources(project_path, roots):
+        try:
+            text = path.read_text(encoding="utf-8", errors="ignore")
+        except OSError:
+            continue
+        for m in JS_STRING.finditer(text):
+            body = m.group(0)[1:-1]
+            if not SQL_START.match(body) or not re.search(r"\b(FROM|INTO|SET)\b", body, re.IGNORECASE):
+                continue
+            dynamic = m.group(0)[0] == "`" and bool(INTERPOLATION.search(body))
+            sql = " ".join(INTERPOLATION.sub("?", body).split())
+            loc = f"{path.relative_to(project_path).as_posix()}:{text.count(chr(10), 0, m.start()) + 1}"
+            entry = queries.setdefault(sql, {"sql": sql, "locations": [], "dynamic": dynamic})
+            entry["locations"].append(loc)
+    return list(queries.values())
+
+
+# ============ SYNTHETIC DATA ============
+def table_info(db) -> dict:
+    """{table: {"columns": [(name, type, default)], "fks": {col: ref_table}, "indexes": {name: [cols]}, "unique": {name}}}"""
+    tables = {}
+    for (name,) in db.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"):
+        cols = [(r[1], (r[2] or "").upper(), r[4]) for r in db.execute(f"PRAGMA table_info('{name}')")]
+        fks = {r[3]: r[2] for r in db.execute(f"PRAGMA foreign_key_list('{name}')")}
+        index_list = list(db.execute(f"PRAGMA index_list('{name}')"))
+        indexes = {r[1]: [c[2] for c in db.execute(f"PRAGMA index_info('{r[1]}')")] for r in index_list}
+        unique = {r[1] for r in index_list if r[2]}
+        tables[name] = {"columns": cols, "fks": fks, "indexes": indexes, "unique": unique}
+    return tables
+
+
+def populate(db, tables: dict, scale: float, seed: int = 7) -> dict:
+    """Insert skewed synthetic rows into every table, then ANALYZE. Returns row counts."""
+    rng = random.Random(seed)
+    counts = {t: max(10, int(1000 * scale * TABLE_WEIGHTS.get(t, 1))) for t in tables}
+    now = datetime(2026, 1, 1)
+    # Owners: a few users own most rows, like a real multi-tenant fleet
+    users = [f"user-{i}" for i in range(max(3, int(50 * scale)))]
+
+    def value(table, col, ctype, default, i):
+        if col == "id" or (col == "key" and ctype == "TEXT"):
+            return f"{table}-{i}"
+        if col in tables[table]["fks"]:
+            ref = tables[table]["fks"][col]
+            return f"{ref}-{int(rng.paretovariate(1.2)) % counts.get(ref, 1)}"
+        if col == "user_id":
+            return users[int(rng.paretovariate(1.5)) % len(users)]
+        if col.endswith("_id"):
+            return f"{col}-{rng.randrange(max(1, counts[table] // 20))}"
+        if col.endswith("_at") or col.startswith("last_"):
+            return (now - timedelta(seconds=rng.randrange(30 * 86400))).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+        if "INT" in ctype:
+            return rng.randint(0, 1) if default in ("0", "1") else rng.randint(0, 100)
+        if "REAL" in ctype:
+            return rng.random() * 100
+        return f"{col}-{rng.randrange(8)}"
+
+    db.execute("PRAGMA foreign_keys = OFF")
+    for table, info in tables.items():
+        cols = info["columns"]
+        sql = f"INSERT OR IGNORE INTO {table} ({', '.join(c[0] for c in cols)}) VALUES ({', '.join('?' * len(cols))})"
+        db.executemany(sql, ([value(table, c, t, d, i) for c, t, d in cols] for i in range(counts[table])))
+    db.commit()
+    db.execute("ANALYZE")
+    return counts
+
+
+# ============ PLANNING ============
+def bindings(sql: str):
+    """Placeholder values for every parameter in ``sql`` (NULLs; plans do not depend on them)."""
+    named = {}
+    positional = 0
+    for m in PARAM.finditer(sql):
+        tok = m.group(0)
+        if tok.startswith("'"):
+            continue
+        if tok.startswith("?"):
+            positional = max(positional + 1, int(tok[1:]) if tok[1:] else 0)
+        else:
+            named[tok[1:]] = None
+    if named and positional:
+        return None
+    return named if named else [None] * positional
+
+
+def plan(db, sql: str) -> list:
+    """Return EXPLAIN QUERY PLAN detail strings, or raise sqlite3.Error."""
+    params = bindings(sql)
+    if params is None:
+        raise sqlite3.Error("mixes named and positional parameters")
+    return [row[3] for row in db.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def suggest_index(sql: str, table: str, columns: set) -> str:
+    """CREATE INDEX for the WHERE columns of ``sql``: equality first, then one range, then ORDER BY."""
+    where = re.search(r"\bWHERE\b(.*?)(\bGROUP\b|\bORDER\b|\bLIMIT\b|$)", sql, re.IGNORECASE | re.DOTALL)
+    if not where:
+        return None
+    eq, rng = [], []
+    for m in re.finditer(r"(?:\w+\.)?(\w+)\s*(<=|>=|<|>|=|\bIN\b|\bIS\b|\bBETWEEN\b)", where.group(1), re.IGNORECASE):
+        col, op = m.group(1), m.group(2).upper()
+        if col in columns and col not in eq and col not in rng:
+            (rng if op in ("<", ">", "<=", ">=", "BETWEEN") else eq).append(col)
+    cols = eq + rng[:1]
+    order = re.search(r"\bORDER BY\s+(?:\w+\.)?(\w+)", sql, re.IGNORECASE)
+    if order and order.group(1) in columns and not rng and order.group(1) not in cols:
+        cols.append(order.group(1))
+    if not cols:
+        return None
+    return f"CREATE INDEX idx_{table}_{'_'.join(cols)} ON {table} ({', '.join(cols)})"
+
+
+def analyze_query(query: dict, details: list, tables: dict, counts: dict) -> list:
+    """Turn plan lines into findings: [{"severity", "kind", "table", "message", "suggestion"}]."""
+    findings = []
+    sql = query["sql"]
+    for d in details:
+        m = re.match(r"(SCAN|SEARCH) (\w+)(?: AS \w+)?(.*)", d)
+        table = m.group(2) if m else None
+        if m and table in tables:
+            columns = {c[0] for c in tables[table]["columns"]}
+            rows = counts.get(table, 0)
+            rest = m.group(3)
+            if m.group(1) == "SCAN" and "INDEX" not in rest:
+                if rows >= MIN_ROWS_TO_FLAG:
+                    suggestion = suggest_index(sql, table, columns)
+                    findings.append({
+                        "severity": "HIGH" if suggestion else "MEDIUM", "kind": "full_scan", "table": table,
+                        "message": f"Full scan of {table} (~{rows:,} rows)", "suggestion": suggestion})
+            elif "AUTOMATIC" in rest:
+                findings.append({
+                    "severity": "HIGH", "kind": "automatic_index", "table": table,
+                    "message": f"SQLite builds a transient index on {table} for every execution",
+                    "suggestion": suggest_index(sql, table, columns)})
+            elif "USING INDEX" in rest and "COVERING" not in rest and sql.upper().startswith("SELECT"):
+                idx = re.search(r"USING INDEX (\w+)", rest).group(1)
+                if idx in tables[table]["unique"]:
+                    continue  # a unique lookup reads at most one row; covering it gains nothing
+                idx_cols = tables[table]["indexes"].get(idx, [])
+                if re.search(r"SELECT\s+(\w+\.)?\*", sql, re.IGNORECASE):
+                    needed = None
+                else:
+                    needed = [c for c in columns if re.search(rf"\b{c}\b", sql) and c not in idx_cols]
+                if rows >= MIN_ROWS_TO_FLAG and needed:
+                    findings.append({
+                        "severity": "LOW", "kind": "covering_index", "table": table,
+                        "message": f"{idx} finds rows but each match still reads {table} for {', '.join(needed)}",
+                        "suggestion": f"CREATE INDEX {idx}_covering ON {table} ({', '.join(idx_cols + needed)})"})
+                elif rows >= MIN_ROWS_TO_FLAG and needed is None and table in TABLE_WEIGHTS:
+                    findings.append({
+                        "severity": "LOW", "kind": "covering_index", "table": table,
+                        "message": f"SELECT * on hot table {table} can never use a covering index",
+                        "suggestion": "Select only the columns the caller needs"})
+        for kind in ("ORDER BY", "GROUP BY", "DISTINCT"):
+            if f"USE TEMP B-TREE FOR {kind}" in d or (kind != "DISTINCT" and f"USE TEMP B-TREE FOR RIGHT PART OF {kind}" in d):
+                touched = [t for t in tables if re.search(rf"\b{t}\b", sql)]
+                big = any(counts.get(t, 0) >= MIN_ROWS_TO_FLAG for t in touched)
+                findings.append({
+                    "severity": "MEDIUM" if big else "LOW", "kind": "temp_btree", "table": ",".join(touched),
+                    "message": f"Sorts in a temp B-tree for {kind}",
+                    "suggestion": f"Extend an index so it also delivers rows in {kind} order"})
+    return findings
+
+
+def write_amplification(queries: list, tables: dict) -> list:
+    """INFO findings for tables the code inserts into that carry 3+ indexes."""
+    findings = []
+    for table in tables:
+        if not any(re.match(rf"(INSERT|REPLACE)\b.*\bINTO\s+{table}\b", q["sql"], re.IGNORECASE) for q in queries):
+            continue
+        indexes = list(tables[table]["indexes"])
+        if len(indexes) >= 3:
+            findings.append({
+                "severity": "INFO", "kind": "write_amplification", "table": table,
+                "message": f"Each INSERT into {table} updates {len(indexes) + 1} B-trees ({', '.join(indexes)})",
+                "suggestion": "Drop indexes no query plan uses"})
+    return findings
+
+
+def finding_key(query: dict, f: dict) -> str:
+    digest = hashlib.sha1(query["sql"].encode()).hexdigest()[:12]
+    return f"{f['kind']}:{f['table']}:{digest}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN QUERY PLAN advisor for SQLite/Turso schemas")
+    parser.add_argument("project_path", nargs="?", default=".")
+    parser.add_argument("--schema", help="Schema .sql file (default: turso-schema.sql)")
+    parser.add_argument("--sources", nargs="*", default=DEFAULT_SOURCES, help="Directories/files to scan for SQL")
+    parser.add_argument("--scale", type=float, default=1.0, help="Synthetic data scale (1 = 1k rows per table, 50k agent_metrics)")
+    parser.add_argument("--baseline", help="Fail (exit 1) on findings not present in this baseline")
+    parser.add_argument("--save-baseline", help="Write current findings to a baseline file")
+    parser.add_argument("--strict", action="store_true", help="Fail on any HIGH finding")
+    args = parser.parse_args()
+
+    project_path = Path(args.project_path).resolve()
+
+    print(f"\n{'='*60}")
+    print(f"[QUERY PLAN ADVISOR] SQLite Query Plan Analysis")
+    print(f"{'='*60}")
+    print(f"Project: {project_path}")
+    print(f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print("-"*60)
+
+    schema = find_schema(project_path, args.schema)
+    if not schema:
+        print(json.dumps({"script": "query_plan_advisor", "project": str(project_path), "queries_checked": 0,
+                          "issues_found": 0, "passed": True, "message": "No SQL schema file found"}, indent=2))
+        sys.exit(0)
+
+    db = sqlite3.connect(":memory:")
+    db.executescript(schema.read_text(encoding="utf-8"))
+    tables = table_info(db)
+    counts = populate(db, tables, args.scale)
+    print(f"Schema: {schema.name} ({len(tables)} tables, {sum(counts.values()):,} synthetic rows)")
+
+    queries = extract_queries(project_path, args.sources)
+    print(f"Found {len(queries)} distinct SQL statements")
+
+    results, skipped = [], []
+    for q in queries:
+        if re.search(r"\bsqlite_(master|schema)\b", q["sql"]):
+            continue  # introspection queries, not application traffic
+        try:
+            details = plan(db, q["sql"])
+        except sqlite3.Error as e:
+            skipped.append({"sql": q["sql"][:120], "locations": q["locations"],
+                            "reason": "dynamic SQL" if q["dynamic"] else str(e)})
+            continue
+        findings = analyze_query(q, details, tables, counts)
+        if findings:
+            results.append({"sql": q["sql"], "locations": q["locations"], "plan": details,
+                            "findings": [{**f, "key": finding_key(q, f)} for f in findings]})
+    amplification = write_amplification(queries, tables)
+
+    print("\n" + "="*60)
+    print("QUERY PLAN FINDINGS")
+    print("="*60)
+    order = {"HIGH": 0, "MEDIUM": 1, "LOW": 2, "INFO": 3}
+    results.sort(key=lambda r: min(order[f["severity"]] for f in r["findings"]))
+    for r in results:
+        print(f"\n{r['sql'][:140]}")
+        print(f"  at {', '.join(r['locations'][:3])}{' ...' if len(r['locations']) > 3 else ''}")
+        for f in r["findings"]:
+            print(f"  [{f['severity']}] {f['message']}")
+            if f["suggestion"]:
+                print(f"         -> {f['suggestion']}")
+    for f in amplification:
+        print(f"\n[{f['severity']}] {f['message']}")
+    if not results and not amplification:
+        print("No query plan issues found!")
+    if skipped:
+        print(f"\nSkipped {len(skipped)} statements that could not be planned (dynamic SQL or unknown tables)")
+
+    all_keys = sorted({f["key"] for r in results for f in r["findings"]})
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(json.dumps({"findings": all_keys}, indent=2) + "\n")
+        print(f"\nBaseline saved to {args.save_baseline}")
+
+    new_keys = []
+    if args.baseline:
+        known = set(json.loads(Path(args.baseline).read_text()).get("findings", []))
+        new_keys = [k for k in all_keys if k not in known]
+        for r in results:
+            for f in r["findings"]:
+                if f["key"] in new_keys:
+                    print(f"NEW {f['severity']} {f['kind']} on {f['table']}: {r['locations'][0]}")
+
+    high = sum(1 for r in results for f in r["findings"] if f["severity"] == "HIGH")
+    passed = not new_keys and not (args.strict and high)
+    output = {
+        "script": "query_plan_advisor",
+        "project": str(project_path),
+        "schema": schema.name,
+        "queries_checked": len(queries) - len(skipped),
+        "queries_skipped": len(skipped),
+        "issues_found": sum(len(r["findings"]) for r in results),
+        "high": high,
+        "new_since_baseline": new_keys,
+        "passed": passed,
+        "issues": results,
+        "write_amplification": amplification,
+        "skipped": skipped,
+    }
+    print("\n" + json.dumps(output, indent=2))
+
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
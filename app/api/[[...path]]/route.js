@@ -16,12 +16,16 @@ import {
   POLICY_EXEC,
 } from '@/lib/policies';
 import { RATE_LIMIT_CONFIG } from '@/lib/rate-limits';
+import { getAgentDirectives } from '@/lib/agent-config';
 import { MODEL_PRICING } from '@/lib/pricing';
 import { processSmartAlerts } from '@/lib/alerts';
 import { promises as fs } from 'fs';
 import path from 'path';
 import Stripe from 'stripe';
 
+// OS-specific builds of install-agent.py generated by scripts/gen_install_agent.py
+const INSTALL_AGENT_PY_TARGETS = ['linux', 'darwin', 'windows'];
+
 /**
  * Reads a script file and replaces placeholders with specified values.
  */
@@ -587,7 +591,12 @@ export async function GET(request, context) {
         }
       }
 
-      const pyLines = await getScript('install-agent.py', {
+      // Per-OS builds drop the other platforms' collectors (see scripts/gen_install_agent.py)
+      const targetOs = searchParams.get('os');
+      const pyScript = INSTALL_AGENT_PY_TARGETS.includes(targetOs)
+        ? `install-agent.${targetOs}.py`
+        : 'install-agent.py';
+      const pyLines = await getScript(pyScript, {
         AGENT_ID: agentId,
         BASE_URL: baseUrl,
         AGENT_SECRET: agentSecret,
@@ -1407,6 +1416,9 @@ export async function POST(request, context) {
         costPerTask = MODEL_PRICING[agent.model] || 0.01;
         tasksCount += 1;
         errorsCount = body.status === 'error' ? errorsCount + 1 : errorsCount;
+        // Agents tailing logs report matched error lines since their last beat
+        const logErrors = Number(body.metrics.errors_count);
+        if (Number.isInteger(logErrors) && logErrors > 0) errorsCount += logErrors;
         const totalCost = parseFloat((tasksCount * costPerTask).toFixed(4));
 
         update.metrics_json = {
@@ -1497,10 +1509,14 @@ export async function POST(request, context) {
         ).catch((e) => console.error('Alert processing error:', e));
       }
 
+      // Fleet-wide config directives, only sent until the agent acknowledges the version
+      const config = await getAgentDirectives(tier || 'free', body.config_version);
+
       return json({
         message: 'Heartbeat received',
         status: update.status,
         policy, // Real-time policy syncing
+        ...(config && { config }),
       });
     }
 
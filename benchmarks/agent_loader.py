@@ -0,0 +1,30 @@
+"""
+Shared loader for clawtrace-agent.py in the benchmark scripts
+
+The agent's file name has a hyphen, so it cannot be imported by name. Every
+benchmark gets the same module object through load_agent(), which registers
+it in sys.modules: importing two benchmark modules no longer executes the
+agent twice (and leaves two sets of its module-level state).
+"""
+
+import importlib.util
+import sys
+from pathlib import Path
+
+AGENT_PATH = Path(__file__).resolve().parent.parent / "clawtrace-agent.py"
+MODULE_NAME = "clawtrace_agent"
+
+
+def load_agent():
+    """Return the clawtrace-agent.py module, executing it on first use only."""
+    module = sys.modules.get(MODULE_NAME)
+    if module is None:
+        spec = importlib.util.spec_from_file_location(MODULE_NAME, AGENT_PATH)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[MODULE_NAME] = module
+        try:
+            spec.loader.exec_module(module)
+        except BaseException:
+            del sys.modules[MODULE_NAME]
+            raise
+    return module
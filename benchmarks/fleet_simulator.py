@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+ClawTrace Fleet Simulator - capacity test an ingest endpoint with virtual agents
+
+Runs thousands of virtual agents on asyncio in one process. Each one performs
+the real handshake and heartbeat protocol, using the payload and signing
+code from clawtrace-agent.py.
+
+Usage:
+    python3 benchmarks/fleet_simulator.py --url http://localhost:3000 --agents 2000 --interval 10 --duration 120
+    python3 benchmarks/fleet_simulator.py --agents-file agents.json --error-rate 0.05 --json
+
+agents.json is a list of {"agent_id": ..., "secret": ...}. Without it, agents
+are named <prefix>-<n> and all sign with --secret, which the stand-in server
+(benchmarks/ingest_server.py) accepts by default. Raise the open-file limit
+(ulimit -n) for large fleets.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import ssl
+import sys
+import time
+from collections import Counter, defaultdict
+from urllib.parse import urlsplit
+
+from agent_loader import load_agent
+
+agent = load_agent()
+
+
+# ============ MINIMAL ASYNC HTTP CLIENT ============
+def decode_chunked(data):
+    """Join the chunks of a ``Transfer-Encoding: chunked`` body (trailers are ignored)."""
+    out, pos = [], 0
+    while True:
+        line_end = data.index(b"\r\n", pos)
+        size = int(data[pos:line_end].split(b";", 1)[0], 16)  # chunk extensions are allowed
+        if size == 0:
+            return b"".join(out)
+        start = line_end + 2
+        out.append(data[start:start + size])
+        pos = start + size + 2
+
+
+def parse_response(raw):
+    """Split a raw HTTP/1.1 response into (status, headers, body).
+
+    The body is delimited by chunked encoding, Content-Length or the end of
+    the connection, in that order of precedence (RFC 9112 section 6.3).
+    """
+    header_blob, _, payload = raw.partition(b"\r\n\r\n")
+    lines = header_blob.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ", 2)[1])
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        payload = decode_chunked(payload)
+    elif "content-length" in headers:
+        payload = payload[:int(headers["content-length"])]
+    return status, headers, payload
+
+
+class HttpTarget:
+    """Parsed base URL plus a one-shot HTTP/1.1 POST over asyncio streams.
+
+    Each request uses its own connection with ``Connection: close``, like the
+    real agent's urllib calls, so the server sees the same connection churn.
+    """
+
+    def __init__(self, base_url, timeout=10):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.tls = parts.scheme == "https"
+        self.port = parts.port or (443 if self.tls else 80)
+        self.prefix = parts.path.rstrip("/")
+        self.timeout = timeout
+        self.ssl_ctx = ssl.create_default_context() if self.tls else None
+
+    async def post(self, path, body, headers=None, abort=False):
+        """POST ``body`` and return (status, parsed JSON or None).
+
+        With ``abort`` the connection is dropped after sending the headers,
+        which simulates an agent dying mid-request.
+        """
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, ssl=self.ssl_ctx), self.timeout)
+        try:
+            head = [f"POST {self.prefix}{path} HTTP/1.1", f"Host: {self.host}",
+                    "Content-Type: application/json", f"Content-Length: {len(body)}", "Connection: close"]
+            head += [f"{k}: {v}" for k, v in (headers or {}).items()]
+            writer.write(("\r\n".join(head) + "\r\n\r\n").encode())
+            if abort:
+                return 0, None
+            writer.write(body)
+            await writer.drain()
+            raw = await asyncio.wait_for(reader.read(), self.timeout)
+        finally:
+            writer.close()
+
+        status, _, payload = parse_response(raw)
+        try:
+            return status, json.loads(payload or b"null")
+        except ValueError:
+            return status, None
+
+
+# ============ SIMULATION ============
+class Stats:
+    """Latency samples and outcome counters per endpoint."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.codes = defaultdict(Counter)
+        self.errors = Counter()
+
+    def record(self, endpoint, status, seconds):
+        self.latencies[endpoint].append(seconds)
+        self.codes[endpoint][status] += 1
+
+    def report(self, elapsed):
+        """Summarize as a dict: request rate, latency percentiles (ms) and counts."""
+        out = {"elapsed_s": round(elapsed, 2), "endpoints": {}, "errors": dict(self.errors)}
+        total = 0
+        for endpoint, samples in self.latencies.items():
+            samples.sort()
+            n = len(samples)
+            total += n
+            pct = lambda p: round(samples[min(n - 1, int(p / 100 * n))] * 1000, 2)
+            out["endpoints"][endpoint] = {
+                "requests": n,
+                "rps": round(n / elapsed, 1),
+                "p50_ms": pct(50), "p90_ms": pct(90), "p99_ms": pct(99), "max_ms": round(samples[-1] * 1000, 2),
+                "status": {str(k): v for k, v in sorted(self.codes[endpoint].items())},
+            }
+        out["total_requests"] = total
+        out["total_rps"] = round(total / elapsed, 1)
+        return out
+
+
+def synthetic_metrics(state, payload_bytes):
+    """Random-walk CPU/memory so payloads look like a real, slowly drifting host."""
+    state["cpu"] = min(100, max(0, state["cpu"] + random.randint(-5, 5)))
+    state["mem"] = min(100, max(0, state["mem"] + random.randint(-2, 2)))
+    metrics = {"cpu_usage": state["cpu"], "memory_usage": state["mem"],
+               "uptime_hours": state["uptime"], "latency_ms": random.randint(1, 40)}
+    if payload_bytes:
+        metrics["padding"] = "x" * payload_bytes
+    return metrics
+
+
+async def run_agent(target, creds, args, stats, stop_at, inflight):
+    """Lifecycle of one virtual agent: handshake, then beat until ``stop_at``."""
+    agent_id, secret = creds
+    state = {"cpu": random.randint(1, 30), "mem": random.randint(20, 60), "uptime": random.randint(0, 2000)}
+    token = None
+    await asyncio.sleep(random.uniform(0, args.ramp))
+
+    async def call(endpoint, path, body, headers=None):
+        abort = random.random() < args.abort_rate
+        async with inflight:
+            t0 = time.perf_counter()
+            try:
+                status, res = await target.post(path, json.dumps(body).encode(), headers, abort)
+            except (OSError, asyncio.TimeoutError, ValueError, IndexError) as e:
+                stats.errors[type(e).__name__] += 1
+                return None, None
+            if abort:
+                stats.errors["injected_abort"] += 1
+                return None, None
+            stats.record(endpoint, status, time.perf_counter() - t0)
+            return status, res
+
+    while time.monotonic() < stop_at:
+        if token is None:
+            key = secret if random.random() >= args.bad_signature_rate else secret + "-wrong"
+            status, res = await call("handshake", "/api/agents/handshake", agent.build_handshake(agent_id, key))
+            if status == 200 and res:
+                token = res.get("token")
+            else:
+                await asyncio.sleep(args.interval)
+                continue
+
+        status_str = "error" if random.random() < args.error_rate else "healthy"
+        body = agent.build_payload(agent_id, status_str, synthetic_metrics(state, args.payload_bytes))
+        status, _ = await call("heartbeat", "/api/heartbeat", body, {"Authorization": f"Bearer {token}"})
+        if status == 401:
+            token = None
+            continue
+        await asyncio.sleep(args.interval * random.uniform(1 - args.jitter, 1 + args.jitter))
+
+
+def load_credentials(args):
+    if args.agents_file:
+        with open(args.agents_file) as f:
+            return [(a["agent_id"], a["secret"]) for a in json.load(f)][:args.agents]
+    return [(f"{args.prefix}-{i:06d}", args.secret) for i in range(args.agents)]
+
+
+async def simulate(args):
+    target = HttpTarget(args.url, args.timeout)
+    stats = Stats()
+    inflight = asyncio.Semaphore(args.max_inflight)
+    start = time.monotonic()
+    stop_at = start + args.duration
+    await asyncio.gather(*(run_agent(target, c, args, stats, stop_at, inflight) for c in load_credentials(args)))
+    return stats.report(time.monotonic() - start)
+
+
+def format_report(report):
+    lines = ["## Fleet Simulation",
+             f"Elapsed: {report['elapsed_s']}s | Requests: {report['total_requests']} | Rate: {report['total_rps']} req/s", ""]
+    lines.append(f"{'endpoint':<12}{'reqs':>8}{'req/s':>9}{'p50ms':>9}{'p90ms':>9}{'p99ms':>9}{'maxms':>9}  status")
+    for name, e in report["endpoints"].items():
+        codes = " ".join(f"{k}:{v}" for k, v in e["status"].items())
+        lines.append(f"{name:<12}{e['requests']:>8}{e['rps']:>9}{e['p50_ms']:>9}{e['p90_ms']:>9}{e['p99_ms']:>9}{e['max_ms']:>9}  {codes}")
+    if report["errors"]:
+        lines.append("")
+        lines.append("Errors: " + ", ".join(f"{k}={v}" for k, v in report["errors"].items()))
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ClawTrace fleet load simulator")
+    parser.add_argument("--url", default="http://localhost:3000", help="Ingest base URL")
+    parser.add_argument("--agents", "-n", type=int, default=100, help="Number of virtual agents")
+    parser.add_argument("--agents-file", default=None, help="JSON list of {agent_id, secret}")
+    parser.add_argument("--prefix", default="sim-agent", help="Agent id prefix when no --agents-file")
+    parser.add_argument("--secret", default="sim-secret", help="Shared secret when no --agents-file")
+    parser.add_argument("--interval", type=float, default=10, help="Seconds between beats per agent")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Interval jitter as a fraction (0.1 = +/-10%%)")
+    parser.add_argument("--duration", type=float, default=60, help="Test duration in seconds")
+    parser.add_argument("--ramp", type=float, default=None, help="Spread agent start over N seconds (default: interval)")
+    parser.add_argument("--payload-bytes", type=int, default=0, help="Extra padding bytes per heartbeat")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of beats reporting status=error")
+    parser.add_argument("--bad-signature-rate", type=float, default=0.0, help="Fraction of handshakes signed with a wrong secret")
+    parser.add_argument("--abort-rate", type=float, default=0.0, help="Fraction of requests dropped mid-send")
+    parser.add_argument("--max-inflight", type=int, default=1000, help="Cap on concurrent open requests")
+    parser.add_argument("--timeout", type=float, default=10, help="Per-request timeout in seconds")
+    parser.add_argument("--json", action="store_true", help="Output as JSON")
+    args = parser.parse_args()
+    if args.ramp is None:
+        args.ramp = args.interval
+
+    try:
+        report = asyncio.run(simulate(args))
+    except KeyboardInterrupt:
+        sys.exit(130)
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
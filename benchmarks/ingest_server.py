@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+ClawTrace Stand-in Ingest Server - local, dependency-free double of the agent API
+
+Implements the agent-facing protocol of app/api/[[...path]]/route.js without
+Next.js, Supabase or Turso, so agent throughput, retry and spool benchmarks are
+reproducible on a laptop without network access:
+
+    POST /api/agents/handshake   HMAC-SHA256(agent_id + timestamp) with a 5 minute
+                                 replay window (or legacy plaintext agent_secret);
+                                 returns an HS256 JWT session token
+    POST /api/heartbeat          Bearer token must match body.agent_id
+    POST /api/heartbeat/batch    {"agent_id": ..., "beats": [{status, metrics, ts}, ...]}
+
+Request bodies may be gzip-compressed (Content-Encoding: gzip). The batch
+route and compression are not in the real app yet. They define the shape
+that batching and spooling agents are benchmarked against.
+
+Every complete request is recorded. GET /__requests returns the records as
+JSON (?since=<seq> for incremental reads) and DELETE /__requests clears them.
+Uploads cut off before Content-Length bytes arrive (fleet_simulator.py
+--abort-rate) are not recorded; they only increment ``server.aborted``.
+
+Usage:
+    python3 benchmarks/ingest_server.py --port 3999 --secret sim-secret
+    python3 benchmarks/ingest_server.py --latency-ms 50 --error-rate 0.01 --rate-limit-rate 0.05
+
+In-process use:
+    server = IngestServer(port=0, secret="s").start()
+    ...  # point CLAWTRACE_SAAS_URL at server.url
+    server.requests; server.stop()
+"""
+
+import argparse
+import base64
+import gzip
+import hashlib
+import hmac
+import json
+import random
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+REPLAY_WINDOW_S = 300
+TOKEN_TTL_S = 86400
+DEFAULT_POLICY = {"label": "DEVELOPER", "heartbeat_interval": 300}
+
+
+# ============ TOKENS ============
+def _b64url(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64url_decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def create_token(key, claims, ttl=TOKEN_TTL_S):
+    """Sign an HS256 JWT, like createAgentToken() in the real route."""
+    now = int(time.time())
+    header = _b64url(json.dumps({"alg": "HS256"}).encode())
+    body = _b64url(json.dumps({**claims, "iat": now, "exp": now + ttl}).encode())
+    sig = hmac.new(key, f"{header}.{body}".encode(), hashlib.sha256).digest()
+    return f"{header}.{body}.{_b64url(sig)}"
+
+
+def verify_token(key, token):
+    """Return the claims of a valid, unexpired token, else None."""
+    try:
+        header, body, sig = token.split(".")
+        expected = hmac.new(key, f"{header}.{body}".encode(), hashlib.sha256).digest()
+        if not hmac.compare_digest(expected, _b64url_decode(sig)):
+            return None
+        claims = json.loads(_b64url_decode(body))
+        return claims if claims.get("exp", 0) > time.time() else None
+    except (ValueError, TypeError):
+        return None
+
+
+# ============ SERVER ============
+class IngestServer:
+    """Stand-in server with fault injection and a bounded request log.
+
+    Args:
+        secrets: {agent_id: secret}; agents not listed use ``secret``.
+        secret: Shared fallback secret (None rejects unknown agents with 404).
+        latency_ms / latency_jitter_ms: Added delay before every response.
+        error_rate / unauthorized_rate / rate_limit_rate: Fractions of
+            requests answered with 500, 401 (heartbeats only) and 429.
+        token_ttl: Session token lifetime, shorten it to exercise re-handshakes.
+        config: Optional directives returned as ``config`` in heartbeat
+            responses until the agent echoes their version.
+    """
+
+    def __init__(self, host="127.0.0.1", port=3999, secrets=None, secret="sim-secret",
+                 latency_ms=0, latency_jitter_ms=0, error_rate=0.0, unauthorized_rate=0.0,
+                 rate_limit_rate=0.0, token_ttl=TOKEN_TTL_S, config=None, record_limit=100000):
+        self.secrets = secrets or {}
+        self.secret = secret
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.error_rate = error_rate
+        self.unauthorized_rate = unauthorized_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.token_ttl = token_ttl
+        self.config = config
+        self.jwt_key = random.randbytes(32)
+        self.requests = deque(maxlen=record_limit)
+        self._seq = 0
+        self.aborted = 0  # uploads dropped before their full body arrived
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serve from a daemon thread and return self."""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def record(self, path, status, agent_id, body, headers):
+        with self._lock:
+            self._seq += 1
+            self.requests.append({"seq": self._seq, "ts": time.time(), "path": path, "status": status,
+                                  "agent_id": agent_id, "content_encoding": headers.get("Content-Encoding"),
+                                  "body": body})
+
+    # ---------- protocol ----------
+    def handshake(self, body):
+        agent_id = body.get("agent_id")
+        secret = self.secrets.get(agent_id, self.secret)
+        if not agent_id or secret is None:
+            return 404, {"error": "Agent not found"}
+        if body.get("signature"):
+            try:
+                timestamp = int(body.get("timestamp"))
+            except (TypeError, ValueError):
+                timestamp = None
+            if timestamp is None or abs(time.time() - timestamp) > REPLAY_WINDOW_S:
+                return 401, {"error": "Signature expired or invalid timestamp"}
+            expected = hmac.new(secret.encode(), (agent_id + str(body["timestamp"])).encode(), hashlib.sha256).hexdigest()
+            if not hmac.compare_digest(expected, str(body["signature"])):
+                return 401, {"error": "Invalid signature"}
+        elif body.get("agent_secret") != secret:
+            return 401, {"error": "Invalid agent secret"}
+        token = create_token(self.jwt_key, {"agent_id": agent_id, "tier": "enterprise"}, self.token_ttl)
+        return 200, {"token": token, "expires_in": self.token_ttl, "gateway_url": None, "policy": DEFAULT_POLICY}
+
+    def heartbeat(self, body, headers, beats=None):
+        auth = headers.get("Authorization", "")
+        claims = verify_token(self.jwt_key, auth[7:]) if auth.startswith("Bearer ") else None
+        if not claims or claims.get("agent_id") != body.get("agent_id"):
+            return 401, {"error": "Invalid or expired session"}
+        if random.random() < self.unauthorized_rate:
+            return 401, {"error": "Invalid or expired session"}
+        res = {"message": "Heartbeat received", "status": body.get("status", "healthy"), "policy": DEFAULT_POLICY}
+        if beats is not None:
+            res = {"message": "Batch received", "accepted": len(beats), "policy": DEFAULT_POLICY}
+        if self.config and self.config.get("version") != body.get("config_version"):
+            res["config"] = self.config
+        return 200, res
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _send(self, status, payload, extra_headers=None):
+                data = json.dumps(payload).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(data)))
+                    for k, v in (extra_headers or {}).items():
+                        self.send_header(k, v)
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True  # the client hung up; nothing left to answer
+
+            def _abort(self):
+                self.close_connection = True
+                with server._lock:
+                    server.aborted += 1
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                if url.path != "/__requests":
+                    return self._send(404, {"error": "Not found"})
+                since = int(parse_qs(url.query).get("since", ["0"])[0])
+                with server._lock:
+                    records = [r for r in server.requests if r["seq"] > since]
+                self._send(200, {"requests": records})
+
+            def do_DELETE(self):
+                if urlsplit(self.path).path != "/__requests":
+                    return self._send(404, {"error": "Not found"})
+                with server._lock:
+                    server.requests.clear()
+                self._send(200, {"cleared": True})
+
+            def do_POST(self):
+                path = urlsplit(self.path).path
+                try:
+                    length = int(self.headers.get("Content-Length") or 0)
+                except ValueError:
+                    self.close_connection = True
+                    return self._send(400, {"error": "Invalid Content-Length"})
+                try:
+                    raw = self.rfile.read(length)
+                except ConnectionResetError:
+                    return self._abort()
+                if len(raw) < length:
+                    return self._abort()  # client dropped mid-upload: not a real request
+                if server.latency_ms or server.latency_jitter_ms:
+                    time.sleep((server.latency_ms + random.uniform(0, server.latency_jitter_ms)) / 1000)
+                try:
+                    if self.headers.get("Content-Encoding") == "gzip":
+                        raw = gzip.decompress(raw)
+                    body = json.loads(raw or b"{}")
+                except (OSError, ValueError):
+                    server.record(path, 400, None, None, self.headers)
+                    return self._send(400, {"error": "Invalid payload"})
+                agent_id = body.get("agent_id") if isinstance(body, dict) else None
+
+                extra = None
+                if random.random() < server.error_rate:
+                    status, res = 500, {"error": "Internal server error"}
+                elif random.random() < server.rate_limit_rate:
+                    kind = "handshake" if path.endswith("handshake") else "heartbeat"
+                    status, res, extra = 429, {"error": "Too many requests", "type": kind, "retry_after": 1}, {"Retry-After": "1"}
+                elif path == "/api/agents/handshake":
+                    status, res = server.handshake(body)
+                elif path == "/api/heartbeat":
+                    status, res = server.heartbeat(body, self.headers)
+                elif path == "/api/heartbeat/batch":
+                    beats = body.get("beats")
+                    if not isinstance(beats, list):
+                        status, res = 400, {"error": "beats must be a list"}
+                    else:
+                        status, res = server.heartbeat(body, self.headers, beats)
+                else:
+                    status, res = 404, {"error": "Not found"}
+                server.record(path, status, agent_id, body, self.headers)
+                self._send(status, res, extra)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ClawTrace stand-in ingest server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3999)
+    parser.add_argument("--secret", default="sim-secret", help="Shared secret for agents not in --agents-file")
+    parser.add_argument("--agents-file", default=None, help="JSON list of {agent_id, secret}")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Fixed delay added to every response")
+    parser.add_argument("--latency-jitter-ms", type=float, default=0, help="Extra uniform random delay")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered 500")
+    parser.add_argument("--unauthorized-rate", type=float, default=0.0, help="Fraction of heartbeats answered 401")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered 429")
+    parser.add_argument("--token-ttl", type=int, default=TOKEN_TTL_S, help="Session token lifetime in seconds")
+    parser.add_argument("--config", default=None, help="JSON config directives to push in heartbeat responses")
+    args = parser.parse_args()
+
+    secrets = {}
+    if args.agents_file:
+        with open(args.agents_file) as f:
+            secrets = {a["agent_id"]: a["secret"] for a in json.load(f)}
+    server = IngestServer(args.host, args.port, secrets, args.secret, args.latency_ms, args.latency_jitter_ms,
+                          args.error_rate, args.unauthorized_rate, args.rate_limit_rate, args.token_ttl,
+                          json.loads(args.config) if args.config else None)
+    print(f"Stand-in ingest server on {server.url} (Ctrl+C to stop)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+ClawTrace Agent Startup Budget - cold start time and resident memory gates
+
+Runs `<target> selftest --startup` repeatedly in fresh interpreters and
+reports the median wall time above a bare `python3 -c pass`. That difference
+is the agent's own startup cost. It then runs one full `selftest` (a
+complete sample) to measure peak RSS.
+
+The number of modules loaded at startup is the primary gate: it does not
+depend on machine speed, and a new eager import (urllib.request alone adds
+about 30 modules) is what actually regresses cold start. The wall-time budget
+is a coarse backstop with headroom for slow runners; medians have been
+measured anywhere from 29ms to 54ms for the .py on different machines.
+
+Usage:
+    python3 benchmarks/startup_budget.py                              # source agent
+    python3 benchmarks/startup_budget.py dist/clawtrace-agent.pyz --max-modules 80 --max-rss-kb 24000
+
+Exits 1 when any target exceeds a budget.
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def wall_ms(cmd, runs, env=None):
+    """Median wall-clock milliseconds of ``cmd`` over ``runs`` fresh processes."""
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, env=env)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def selftest(target, *flags):
+    out = subprocess.run([sys.executable, str(target), "selftest", *flags], check=True, capture_output=True, text=True)
+    return json.loads(out.stdout)
+
+
+def measure(target, runs, bare_ms):
+    startup = selftest(target, "--startup")
+    full = selftest(target)
+    return {
+        "target": str(target),
+        "startup_ms": round(wall_ms([sys.executable, str(target), "selftest", "--startup"], runs) - bare_ms, 1),
+        "startup_modules": startup["modules"],
+        "startup_rss_kb": startup["agent_stats"].get("max_rss_kb"),
+        "sample_rss_kb": full["agent_stats"].get("max_rss_kb"),
+        "sample_modules": full["modules"],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check agent cold start and RSS budgets")
+    parser.add_argument("targets", nargs="*", default=[str(ROOT / "clawtrace-agent.py")], help="Agent .py or .pyz files")
+    parser.add_argument("--runs", type=int, default=15, help="Cold starts per target (median is used)")
+    parser.add_argument("--max-modules", type=int, default=80, help="Budget for modules loaded by selftest --startup")
+    parser.add_argument("--max-startup-ms", type=float, default=120, help="Budget for startup above bare python3")
+    parser.add_argument("--max-rss-kb", type=int, default=25000, help="Budget for peak RSS after one sample")
+    parser.add_argument("--json", action="store_true", help="Output as JSON")
+    args = parser.parse_args()
+
+    bare_ms = wall_ms([sys.executable, "-c", "pass"], args.runs)
+    results = [measure(t, args.runs, bare_ms) for t in args.targets]
+    failures = [(r["target"], what) for r in results for what, over in (
+        (f"{r['startup_modules']} startup modules > {args.max_modules}", r["startup_modules"] > args.max_modules),
+        (f"startup {r['startup_ms']}ms > {args.max_startup_ms}ms", r["startup_ms"] > args.max_startup_ms),
+        (f"RSS {r['sample_rss_kb']}KB > {args.max_rss_kb}KB", (r["sample_rss_kb"] or 0) > args.max_rss_kb),
+    ) if over]
+
+    if args.json:
+        print(json.dumps({"bare_python_ms": round(bare_ms, 1), "results": results}, indent=2))
+    else:
+        print(f"bare python3: {bare_ms:.1f}ms")
+        print(f"{'target':<40}{'startup ms':>12}{'modules':>9}{'start RSS KB':>14}{'sample RSS KB':>15}")
+        for r in results:
+            print(f"{Path(r['target']).name:<40}{r['startup_ms']:>12}{r['startup_modules']:>9}"
+                  f"{r['startup_rss_kb'] or '-':>14}{r['sample_rss_kb'] or '-':>15}")
+    for target, what in failures:
+        print(f"BUDGET EXCEEDED {target}: {what}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+ClawTrace Turso Query Benchmark - synthetic fleet data and query latency
+
+Builds a local SQLite file with the turso-schema.sql tables at production-like
+scale. By default that is 2M agent_metrics rows, 5k agents, 1k fleets and 200
+users. Tenant size and per-agent beat rate follow skewed distributions, so a
+few users own most of the fleet and a few agents send most of the beats. The
+harness then times the query shapes the app and gateway actually run:
+
+    dashboard   turso-adapter getAgents/getFleets/getMetrics/getStats
+    heartbeat   per-beat agent lookup in the heartbeat route
+    gateway     agent cache refresh, plus the batched
+                UPDATE agents + INSERT INTO agent_metrics flush
+                (gateway/server.js), timed per batch size
+    cron        stale-agent check and the 30-day agent_metrics retention
+                DELETE (rolled back, so the dataset stays fixed)
+
+Only SQLite engine time is measured, with no network or libSQL server
+overhead, so the numbers are for comparing schema and index changes, not
+for predicting end-to-end latency.
+
+Usage:
+    python3 benchmarks/turso_query_bench.py                                  # generate (once) + run
+    python3 benchmarks/turso_query_bench.py --metrics-rows 200000 --agents 1000 --db /tmp/small.db
+    python3 benchmarks/turso_query_bench.py --save-baseline benchmarks/baselines/turso-queries.json
+    python3 benchmarks/turso_query_bench.py --apply add-indexes.sql --compare benchmarks/baselines/turso-queries.json
+
+--apply runs extra DDL (e.g. CREATE INDEX) on a copy of the generated file, so
+before/after numbers come from the same data. The generated file is reused
+while its generation parameters match (--regenerate forces a rebuild).
+"""
+
+import argparse
+import json
+import random
+import sqlite3
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+SCHEMA = ROOT / "turso-schema.sql"
+DEFAULT_DB = Path(__file__).resolve().parent / ".data" / "turso-bench.db"
+STATUSES = (("healthy", 70), ("idle", 15), ("busy", 8), ("error", 4), ("offline", 3))
+MODELS = ("gpt-4o", "gpt-4o-mini", "claude-3-5-sonnet", "claude-3-haiku", "llama-3-70b")
+DAY = 86400
+
+
+# ============ SYNTHETIC DATA ============
+def _uuid(rng):
+    h = f"{rng.getrandbits(128):032x}"
+    return f"{h[:8]}-{h[8:12]}-4{h[13:16]}-{h[16:20]}-{h[20:]}"
+
+
+def _iso(ts):
+    return time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime(ts))
+
+
+def _zipf_weights(n, s):
+    return [1 / (i + 1) ** s for i in range(n)]
+
+
+def generate(db, params, now, log=print):
+    """Fill an empty schema with skewed synthetic rows; returns per-table row counts."""
+    rng = random.Random(params["seed"])
+    users = [_uuid(rng) for _ in range(params["users"])]
+    user_w = _zipf_weights(len(users), 1.1)  # a few tenants own most fleets and agents
+
+    fleets = []
+    for _ in range(params["fleets"]):
+        fleets.append((_uuid(rng), rng.choices(users, user_w)[0], f"fleet-{len(fleets)}",
+                       int(rng.random() < 0.3), _iso(now - rng.uniform(0, 180 * DAY))))
+    db.executemany("INSERT INTO fleets (id, user_id, name, scaling_enabled, created_at) VALUES (?, ?, ?, ?, ?)", fleets)
+    fleets_by_user = {}
+    for f in fleets:
+        fleets_by_user.setdefault(f[1], []).append(f[0])
+
+    statuses, status_w = zip(*STATUSES)
+    agents = []
+    for i in range(params["agents"]):
+        user = rng.choices(users, user_w)[0]
+        fleet = rng.choice(fleets_by_user[user]) if user in fleets_by_user and rng.random() < 0.9 else None
+        status = rng.choices(statuses, status_w)[0]
+        last = now - (rng.expovariate(1 / 30) if status != "offline" else rng.uniform(600, 7 * DAY))
+        metrics = {"cpu_usage": rng.randint(1, 90), "memory_usage": rng.randint(10, 90),
+                   "tasks_completed": rng.randint(0, 50000), "cost_usd": round(rng.uniform(0, 500), 4)}
+        agents.append((_uuid(rng), user, fleet, f"agent-{i}", status, rng.choice(MODELS), json.dumps(metrics),
+                       _uuid(rng), _iso(last), _iso(last), _iso(now - rng.uniform(0, 90 * DAY))))
+    db.executemany("INSERT INTO agents (id, user_id, fleet_id, name, status, model, metrics_json, agent_secret, "
+                   "last_heartbeat, updated_at, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", agents)
+
+    # Beat volume per agent is heavy-tailed: busy agents on short intervals dominate
+    agent_ids = [(a[0], a[1]) for a in agents]
+    beat_w = [rng.paretovariate(1.3) for _ in agent_ids]
+    total, chunk = params["metrics_rows"], 50000
+    span = params["days"] * DAY
+    start = now - span
+    sql = ("INSERT INTO agent_metrics (id, agent_id, user_id, cpu_usage, memory_usage, latency_ms, uptime_hours, "
+           "errors_count, tasks_completed, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)")
+    for done in range(0, total, chunk):
+        n = min(chunk, total - done)
+        picks = rng.choices(agent_ids, beat_w, k=n)
+        rows = []
+        for k, (agent_id, user_id) in enumerate(picks):
+            ts = start + span * (done + k) / total  # rows arrive in time order, like real beats
+            rows.append((_uuid(rng), agent_id, user_id, rng.randint(0, 100), rng.randint(5, 95),
+                         int(rng.lognormvariate(3, 0.8)), rng.randint(0, 2000), int(rng.random() < 0.02),
+                         rng.randint(0, 5000), _iso(ts)))
+        db.executemany(sql, rows)
+        if done // chunk % 10 == 9:
+            log(f"  agent_metrics: {done + n:,}/{total:,}")
+
+    alerts = []
+    for _ in range(params["alerts"]):
+        agent_id, user_id = rng.choices(agent_ids, beat_w)[0]
+        created = now - rng.uniform(0, span)
+        resolved = int(rng.random() < 0.8)
+        alerts.append((_uuid(rng), user_id, agent_id, rng.choice(("cpu", "memory", "offline", "error")),
+                       "Alert", "{}", resolved, _iso(created + 600) if resolved else None, _iso(created)))
+    db.executemany("INSERT INTO alerts (id, user_id, agent_id, type, title, metadata, resolved, resolved_at, created_at) "
+                   "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", alerts)
+
+    channels = [(_uuid(rng), u, "email", "email") for u in users]
+    db.executemany("INSERT INTO alert_channels (id, user_id, name, type) VALUES (?, ?, ?, ?)", channels)
+    channel_of = {c[1]: c[0] for c in channels}
+    db.executemany("INSERT INTO alert_configs (id, user_id, agent_id, channel_id) VALUES (?, ?, ?, ?)",
+                   [(_uuid(rng), u, a, channel_of[u]) for a, u in rng.sample(agent_ids, len(agent_ids) // 4)])
+    db.executemany("INSERT INTO custom_policies (id, user_id, name, heartbeat_interval) VALUES (?, ?, ?, ?)",
+                   [(_uuid(rng), u, f"policy-{i}", rng.choice((60, 300, 600))) for i, u in enumerate(users)])
+    db.commit()
+    return {t: db.execute(f"SELECT count(*) FROM {t}").fetchone()[0]
+            for t in ("fleets", "agents", "agent_metrics", "alerts", "alert_configs")}
+
+
+def open_dataset(path, params, regenerate=False, analyze=False, log=print):
+    """Open the benchmark DB, (re)generating it when missing or built with other parameters.
+
+    Returns (connection, now) where ``now`` is the epoch the data was generated
+    around, so relative query parameters ("last 5 minutes") stay meaningful.
+    """
+    path = Path(path)
+    if path.exists() and not regenerate:
+        db = sqlite3.connect(path)
+        try:
+            meta = dict(db.execute("SELECT key, value FROM _bench_meta"))
+            if json.loads(meta["params"]) == params:
+                return db, int(meta["now"])
+        except (sqlite3.Error, KeyError, ValueError):
+            pass
+        db.close()
+    for suffix in ("", "-wal", "-shm"):
+        Path(f"{path}{suffix}").unlink(missing_ok=True)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    log(f"Generating {path} ({params['metrics_rows']:,} agent_metrics rows, {params['agents']:,} agents)...")
+    t0 = time.perf_counter()
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=OFF")
+    db.executescript(SCHEMA.read_text())
+    now = int(time.time())
+    counts = generate(db, params, now, log)
+    db.execute("CREATE TABLE _bench_meta (key TEXT PRIMARY KEY, value TEXT)")
+    db.executemany("INSERT INTO _bench_meta VALUES (?, ?)", (("params", json.dumps(params)), ("now", str(now))))
+    db.commit()
+    if analyze:
+        db.execute("ANALYZE")
+    log(f"Generated in {time.perf_counter() - t0:.1f}s: " + ", ".join(f"{t}={n:,}" for t, n in counts.items()))
+    return db, now
+
+
+# ============ QUERY SHAPES ============
+class Sampler:
+    """Draws realistic parameters: hot tenants and hot agents are picked more often."""
+
+    def __init__(self, db, now, seed=11):
+        self.rng = random.Random(seed)
+        self.now = now
+        owners = db.execute("SELECT user_id, count(*) FROM agents GROUP BY user_id").fetchall()
+        self.users, self.user_w = zip(*owners)
+        self.agents = [r[0] for r in db.execute("SELECT id FROM agents")]
+        self.fleets = [r[0] for r in db.execute("SELECT id FROM fleets")]
+
+    def user(self):
+        return self.rng.choices(self.users, self.user_w)[0]
+
+    def agent(self):
+        return self.rng.choice(self.agents)
+
+    def iso_ago(self, seconds):
+        return _iso(self.now - seconds)
+
+
+def query_shapes():
+    """[(name, source, sql, params_fn)] mirroring the SQL in the app and gateway."""
+    return [
+        ("dashboard.agents_page", "lib/turso-adapter.js getAgents",
+         "SELECT * FROM agents WHERE user_id = ? ORDER BY created_at DESC LIMIT ? OFFSET ?",
+         lambda s: (s.user(), 50, 0)),
+        ("dashboard.fleets", "lib/turso-adapter.js getFleets",
+         "SELECT * FROM fleets WHERE user_id = ?", lambda s: (s.user(),)),
+        ("dashboard.agent_metrics", "lib/turso-adapter.js getMetrics",
+         "SELECT * FROM agent_metrics WHERE agent_id = ? ORDER BY created_at DESC LIMIT 50", lambda s: (s.agent(),)),
+        ("dashboard.agent_stats", "lib/turso-adapter.js getStats",
+         "SELECT count(*) as total_agents, sum(case when status = 'healthy' then 1 else 0 end) as healthy, "
+         "sum(case when status = 'idle' then 1 else 0 end) as idle, sum(case when status = 'error' then 1 else 0 end) as error, "
+         "sum(case when status = 'offline' then 1 else 0 end) as offline, "
+         "sum(cast(json_extract(metrics_json, '$.cost_usd') as real)) as total_cost, "
+         "sum(cast(json_extract(metrics_json, '$.tasks_completed') as integer)) as total_tasks FROM agents WHERE user_id = ?",
+         lambda s: (s.user(),)),
+        ("dashboard.fleet_count", "lib/turso-adapter.js getStats",
+         "SELECT count(*) as total_fleets FROM fleets WHERE user_id = ?", lambda s: (s.user(),)),
+        ("dashboard.unresolved_alerts", "lib/turso-adapter.js getStats",
+         "SELECT count(*) as unresolved_alerts FROM alerts WHERE user_id = ? AND resolved = 0", lambda s: (s.user(),)),
+        ("heartbeat.agent_lookup", "app/api/[[...path]]/route.js heartbeat",
+         "SELECT * FROM agents WHERE id = ? LIMIT 1", lambda s: (s.agent(),)),
+        ("alerts.recent_error_count", "lib/alerts.js",
+         "SELECT count(*) as count FROM alerts WHERE agent_id = ? AND metadata LIKE ? AND created_at > ?",
+         lambda s: (s.agent(), "%cpu%", s.iso_ago(3600))),
+        ("gateway.cache_refresh", "gateway/server.js refreshCache",
+         "SELECT id, user_id, agent_secret FROM agents", lambda s: ()),
+        ("cron.stale_agents", "lib/cron-jobs/check-stale.js",
+         "SELECT id, name FROM agents WHERE status = ? AND last_heartbeat < ?",
+         lambda s: ("healthy", s.iso_ago(300))),
+    ]
+
+
+# Rolled back after every run so the dataset stays identical between runs
+ROLLBACK_SHAPES = [
+    ("cron.metrics_retention", "app/api/cron/cleanup-heartbeats/route.js",
+     "DELETE FROM agent_metrics WHERE created_at < ?", lambda s: (s.iso_ago(30 * DAY - 3600),)),
+]
+
+FLUSH_UPDATE = "UPDATE agents SET status = ?, last_heartbeat = ?, updated_at = ?, metrics_json = ? WHERE id = ?"
+FLUSH_INSERT = ("INSERT INTO agent_metrics (id, agent_id, user_id, cpu_usage, memory_usage, latency_ms, uptime_hours, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ? )")
+
+
+# ============ MEASUREMENT ============
+def summarize(samples_ns):
+    samples = sorted(samples_ns)
+    n = len(samples)
+    pct = lambda p: round(samples[min(n - 1, int(p / 100 * n))] / 1e6, 3)
+    return {"runs": n, "p50_ms": pct(50), "p95_ms": pct(95), "p99_ms": pct(99),
+            "mean_ms": round(statistics.fmean(samples) / 1e6, 3), "max_ms": round(samples[-1] / 1e6, 3)}
+
+
+def time_query(db, sql, params_fn, sampler, iterations, rollback=False):
+    if not rollback:
+        for _ in range(max(3, iterations // 10)):  # warm the page cache before timing
+            db.execute(sql, params_fn(sampler)).fetchall()
+    samples = []
+    for _ in range(iterations):
+        params = params_fn(sampler)
+        if rollback:
+            db.execute("SAVEPOINT bench")
+        t0 = time.perf_counter_ns()
+        db.execute(sql, params).fetchall()
+        samples.append(time.perf_counter_ns() - t0)
+        if rollback:
+            db.execute("ROLLBACK TO bench")
+            db.execute("RELEASE bench")
+    return summarize(samples)
+
+
+def time_flush(db, sampler, batch_size, reps):
+    """Time gateway/server.js's flush: one transaction of batch_size UPDATE + INSERT pairs."""
+    rng = sampler.rng
+    samples = []
+    for _ in range(reps):
+        now = _iso(time.time())
+        agents = rng.sample(sampler.agents, min(batch_size, len(sampler.agents)))
+        t0 = time.perf_counter_ns()
+        db.execute("BEGIN")
+        for agent_id in agents:
+            metrics = {"cpu_usage": rng.randint(0, 100), "memory_usage": rng.randint(0, 100), "latency_ms": rng.randint(1, 200)}
+            db.execute(FLUSH_UPDATE, ("healthy", now, now, json.dumps(metrics), agent_id))
+            db.execute(FLUSH_INSERT, (str(uuid.uuid4()), agent_id, None, metrics["cpu_usage"], metrics["memory_usage"],
+                                      metrics["latency_ms"], 0, now))
+        db.execute("COMMIT")
+        samples.append(time.perf_counter_ns() - t0)
+    res = summarize(samples)
+    res["rows_per_s"] = round(2 * batch_size / (res["p50_ms"] / 1000)) if res["p50_ms"] else None
+    return res
+
+
+def run(db, sampler, iterations, batch_sizes, flush_reps, only=None):
+    results = {}
+    for name, source, sql, params_fn in query_shapes():
+        if not only or name in only:
+            results[name] = {"source": source, **time_query(db, sql, params_fn, sampler, iterations)}
+    for name, source, sql, params_fn in ROLLBACK_SHAPES:
+        if not only or name in only:
+            results[name] = {"source": source, **time_query(db, sql, params_fn, sampler, max(3, iterations // 20), rollback=True)}
+    for size in batch_sizes:
+        name = f"gateway.flush[{size}]"
+        if not only or name in only or "gateway.flush" in only:
+            results[name] = {"source": "gateway/server.js flush", **time_flush(db, sampler, size, flush_reps)}
+    return results
+
+
+def apply_on_copy(db, ddl_path):
+    """Copy the dataset next to itself, apply extra DDL there and return the new connection."""
+    copy_path = f"{db.execute('PRAGMA database_list').fetchone()[2]}.apply"
+    for suffix in ("", "-wal", "-shm"):
+        Path(f"{copy_path}{suffix}").unlink(missing_ok=True)
+    copy = sqlite3.connect(copy_path)
+    db.backup(copy)
+    copy.executescript(Path(ddl_path).read_text())
+    return copy, copy_path
+
+
+def compare(results, baseline, threshold):
+    """Return [(name, old_p50, new_p50)] for shapes whose p50 regressed by more than ``threshold``."""
+    regressions = []
+    for name, res in results.items():
+        old = baseline.get("results", {}).get(name)
+        if old and res["p50_ms"] > old["p50_ms"] * (1 + threshold) and res["p50_ms"] - old["p50_ms"] > 0.05:
+            regressions.append((name, old["p50_ms"], res["p50_ms"]))
+    return regressions
+
+
+def format_results(results, baseline=None):
+    lines = [f"{'query':<32}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'rows/s':>12}"
+             + ("    vs baseline" if baseline else "")]
+    for name, r in results.items():
+        line = f"{name:<32}{r['p50_ms']:>10.3f}{r['p95_ms']:>10.3f}{r['p99_ms']:>10.3f}{r['max_ms']:>10.3f}" \
+               f"{r.get('rows_per_s') or '':>12}"
+        old = (baseline or {}).get("results", {}).get(name)
+        if old and old["p50_ms"]:
+            line += f"    {(r['p50_ms'] / old['p50_ms'] - 1) * 100:+.1f}%"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Synthetic Turso dataset and query latency benchmark")
+    parser.add_argument("--db", default=str(DEFAULT_DB), help="Dataset file (generated when missing)")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--fleets", type=int, default=1000)
+    parser.add_argument("--agents", type=int, default=5000)
+    parser.add_argument("--metrics-rows", type=int, default=2_000_000)
+    parser.add_argument("--alerts", type=int, default=100_000)
+    parser.add_argument("--days", type=int, default=30, help="Time span of agent_metrics rows")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--regenerate", action="store_true", help="Rebuild the dataset even if it matches")
+    parser.add_argument("--analyze", action="store_true", help="Run ANALYZE after generating (Turso does not by default)")
+    parser.add_argument("--apply", metavar="SQL", help="Apply extra DDL to a copy of the dataset before timing")
+    parser.add_argument("--iterations", "-n", type=int, default=200, help="Runs per query shape")
+    parser.add_argument("--batch-sizes", default="1,10,100,1000", help="Gateway flush batch sizes")
+    parser.add_argument("--flush-reps", type=int, default=20, help="Flushes timed per batch size")
+    parser.add_argument("--only", nargs="*", help="Run only these shapes")
+    parser.add_argument("--save-baseline", metavar="PATH", help="Write results to a baseline JSON file")
+    parser.add_argument("--compare", metavar="PATH", help="Fail on p50 regressions against a baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed relative p50 slowdown (default: 0.25)")
+    parser.add_argument("--json", action="store_true", help="Output as JSON")
+    args = parser.parse_args()
+
+    params = {"users": args.users, "fleets": args.fleets, "agents": args.agents, "metrics_rows": args.metrics_rows,
+              "alerts": args.alerts, "days": args.days, "seed": args.seed}
+    log = (lambda msg: print(msg, file=sys.stderr)) if args.json else print
+    db, now = open_dataset(args.db, params, args.regenerate, args.analyze, log)
+
+    copy_path = None
+    if args.apply:
+        db, copy_path = apply_on_copy(db, args.apply)
+        log(f"Applied {args.apply} to {copy_path}")
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.isolation_level = None  # explicit BEGIN/COMMIT in the flush benchmark
+
+    try:
+        sampler = Sampler(db, now)
+        batch_sizes = [int(b) for b in args.batch_sizes.split(",") if b.strip()]
+        results = run(db, sampler, args.iterations, batch_sizes, args.flush_reps, args.only)
+    finally:
+        db.close()
+        if copy_path:
+            for suffix in ("", "-wal", "-shm"):
+                Path(f"{copy_path}{suffix}").unlink(missing_ok=True)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(format_results(results, baseline))
+
+    if args.save_baseline:
+        path = Path(args.save_baseline)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        meta = {"sqlite": sqlite3.sqlite_version, "params": params, "applied": args.apply, "created_at": int(time.time())}
+        path.write_text(json.dumps({"meta": meta, "results": results}, indent=2) + "\n")
+        log(f"\nBaseline saved to {path}")
+
+    if baseline:
+        regressions = compare(results, baseline, args.threshold)
+        for name, old, new in regressions:
+            print(f"REGRESSION {name}: p50 {old:.3f} -> {new:.3f} ms")
+        sys.exit(1 if regressions else 0)
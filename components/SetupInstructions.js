@@ -36,11 +36,12 @@ export default function SetupInstructions({ agentId, agentSecret }) {
   const bashSingle = `curl -X POST ${origin}/api/heartbeat \\\n  -H "Content-Type: application/json" \\\n  -d '{"agent_id":"${agentId}","status":"healthy","metrics":{"cpu_usage":50,"memory_usage":60}}'`;
   const bashDaemon = `curl -sL -H "x-agent-secret: ${agentSecret}" "${origin}/api/install-agent?agent_id=${agentId}" > clawtrace-agent.sh\nchmod +x clawtrace-agent.sh\nnohup ./clawtrace-agent.sh > /var/log/clawtrace-heartbeat.log 2>&1 &`;
 
-  // Python cross-platform
+  // Python cross-platform (the os param selects the build without other platforms' collectors)
+  const pyOs = platform === 'mac' ? 'darwin' : platform;
   const pyOneLiner =
     platform === 'windows'
-      ? `irm "${origin}/api/install-agent-py?agent_id=${agentId}" -Headers @{'x-agent-secret'='${agentSecret}'} -OutFile clawtrace-agent.py; python clawtrace-agent.py`
-      : `curl -sL -H "x-agent-secret: ${agentSecret}" "${origin}/api/install-agent-py?agent_id=${agentId}" -o clawtrace-agent.py && python3 clawtrace-agent.py`;
+      ? `irm "${origin}/api/install-agent-py?agent_id=${agentId}&os=${pyOs}" -Headers @{'x-agent-secret'='${agentSecret}'} -OutFile clawtrace-agent.py; python clawtrace-agent.py`
+      : `curl -sL -H "x-agent-secret: ${agentSecret}" "${origin}/api/install-agent-py?agent_id=${agentId}&os=${pyOs}" -o clawtrace-agent.py && python3 clawtrace-agent.py`;
 
   return (
     <div className="space-y-5">
@@ -0,0 +1,137 @@
+/**
+ * ClawTrace - Server-pushed Agent Configuration
+ *
+ * Fleet-wide directives returned in heartbeat responses so agents can be
+ * re-tuned live (e.g. throttled during an ingest incident) without a redeploy.
+ * Directives live as JSON in the Turso `agent_config` row with key 'fleet'
+ * (see scripts/set-agent-config.js):
+ *
+ *   {"version":"2026-10-19.1","interval":600,"collectors":["cpu","mem"],"sampling_rate":0.5,"batch_size":20}
+ *
+ * Each server instance re-reads the row at most every CONFIG_TTL_MS, which is
+ * shorter than the 10s minimum heartbeat interval, so an edit reaches every
+ * agent on its next beat. Without a row, the AGENT_CONFIG_DIRECTIVES env var
+ * is used as a static default.
+ *
+ * `version` is required; agents echo the applied version back as
+ * `config_version` so the directives are only sent to agents that lack them.
+ */
+
+import { turso } from './turso.js';
+
+export const AGENT_COLLECTORS = ['cpu', 'mem', 'uptime', 'probe', 'logs'];
+export const CONFIG_KEY = 'fleet';
+export const CONFIG_TTL_MS = 5000;
+
+// Same floors as the tier-based heartbeat clamping in the handshake route
+const TIER_MIN_INTERVAL = { free: 300, pro: 60 };
+
+let cachedRaw;
+let cachedDirectives = null;
+let loadedAt = -Infinity;
+let pendingLoad = null;
+
+/**
+ * Parse and validate raw directives, dropping any field that is out of range.
+ *
+ * @param {string|undefined} raw - JSON string of directives.
+ * @returns {object|null} Sanitized directives, or null when unset/invalid.
+ */
+export function parseAgentDirectives(raw) {
+  if (!raw) return null;
+  let input;
+  try {
+    input = JSON.parse(raw);
+  } catch {
+    console.error('[Agent Config] Agent directives are not valid JSON');
+    return null;
+  }
+  if (!input || typeof input !== 'object' || !input.version) return null;
+
+  const directives = { version: String(input.version) };
+  const interval = parseInt(input.interval);
+  if (interval >= 10) directives.interval = interval;
+  if (Array.isArray(input.collectors)) {
+    directives.collectors = input.collectors.filter((c) => AGENT_COLLECTORS.includes(c));
+  }
+  const rate = parseFloat(input.sampling_rate);
+  if (rate > 0 && rate <= 1) directives.sampling_rate = rate;
+  const batchSize = parseInt(input.batch_size);
+  if (batchSize >= 1 && batchSize <= 1000) directives.batch_size = batchSize;
+  return directives;
+}
+
+/**
+ * Load the current fleet directives, re-reading Turso at most every CONFIG_TTL_MS.
+ *
+ * Concurrent callers share one in-flight read. If the read fails, the last
+ * loaded directives stay in effect until the next attempt.
+ *
+ * @param {number} [now] - Current time in ms (for tests).
+ * @returns {Promise<object|null>} Sanitized directives, or null when none are set.
+ */
+export async function loadAgentDirectives(now = Date.now()) {
+  if (now - loadedAt < CONFIG_TTL_MS) return cachedDirectives;
+  if (!pendingLoad) {
+    pendingLoad = turso
+      .execute({ sql: 'SELECT directives FROM agent_config WHERE key = ?', args: [CONFIG_KEY] })
+      .then((res) => res.rows[0]?.directives ?? process.env.AGENT_CONFIG_DIRECTIVES)
+      .catch((e) => {
+        console.error('[Agent Config] Failed to load directives:', e.message);
+        return cachedRaw;
+      })
+      .then((raw) => {
+        if (raw !== cachedRaw) {
+          cachedRaw = raw;
+          cachedDirectives = parseAgentDirectives(raw);
+        }
+        loadedAt = now;
+        return cachedDirectives;
+      })
+      .finally(() => {
+        pendingLoad = null;
+      });
+  }
+  return pendingLoad;
+}
+
+/**
+ * Store new fleet directives. This instance uses them immediately; others
+ * pick them up within CONFIG_TTL_MS.
+ *
+ * @param {object} directives - Directives including a `version`.
+ * @param {number} [now] - Current time in ms (for tests).
+ * @returns {Promise<object>} The sanitized directives that were stored.
+ */
+export async function setAgentDirectives(directives, now = Date.now()) {
+  const raw = JSON.stringify(directives);
+  const parsed = parseAgentDirectives(raw);
+  if (!parsed) throw new Error('Agent directives need a version');
+  await turso.execute({
+    sql: `INSERT INTO agent_config (key, directives, updated_at) VALUES (?, ?, datetime('now'))
+          ON CONFLICT(key) DO UPDATE SET directives = excluded.directives, updated_at = excluded.updated_at`,
+    args: [CONFIG_KEY, raw],
+  });
+  cachedRaw = raw;
+  cachedDirectives = parsed;
+  loadedAt = now;
+  return parsed;
+}
+
+/**
+ * Get the directives an agent should receive in its heartbeat response.
+ *
+ * @param {string} tier - Owner's tier, used to clamp the interval.
+ * @param {string|undefined} appliedVersion - `config_version` reported by the agent.
+ * @param {number} [now] - Current time in ms (for tests).
+ * @returns {Promise<object|null>} Directives to send, or null if the agent is up to date.
+ */
+export async function getAgentDirectives(tier, appliedVersion, now = Date.now()) {
+  const current = await loadAgentDirectives(now);
+  if (!current || current.version === appliedVersion) return null;
+
+  const directives = { ...current };
+  const floor = TIER_MIN_INTERVAL[tier];
+  if (directives.interval && floor && directives.interval < floor) directives.interval = floor;
+  return directives;
+}
@@ -0,0 +1,106 @@
+import { describe, it, expect, mock, beforeEach, afterAll } from 'bun:test';
+
+// The `agent_config` row as stored in Turso; null means no row
+let storedRow = null;
+let failReads = false;
+const mockExecute = mock(async ({ sql, args }) => {
+  if (sql.startsWith('SELECT')) {
+    if (failReads) throw new Error('network down');
+    return { rows: storedRow === null ? [] : [{ directives: storedRow }] };
+  }
+  storedRow = args[1];
+  return { rows: [] };
+});
+
+mock.module('./turso.js', () => ({ turso: { execute: mockExecute } }));
+
+const { parseAgentDirectives, getAgentDirectives, setAgentDirectives, CONFIG_TTL_MS } = await import(
+  './agent-config.js'
+);
+
+describe('lib/agent-config', () => {
+  const original = process.env.AGENT_CONFIG_DIRECTIVES;
+  // Every test starts past the previous test's TTL so the module cache reloads
+  let now = 0;
+
+  beforeEach(() => {
+    delete process.env.AGENT_CONFIG_DIRECTIVES;
+    storedRow = null;
+    failReads = false;
+    mockExecute.mockClear();
+    now += 10 * CONFIG_TTL_MS;
+  });
+
+  afterAll(() => {
+    if (original === undefined) delete process.env.AGENT_CONFIG_DIRECTIVES;
+    else process.env.AGENT_CONFIG_DIRECTIVES = original;
+  });
+
+  it('returns null when directives are unset or invalid', () => {
+    expect(parseAgentDirectives(undefined)).toBeNull();
+    expect(parseAgentDirectives('not json')).toBeNull();
+    expect(parseAgentDirectives('{"interval":60}')).toBeNull(); // missing version
+  });
+
+  it('drops out-of-range fields and unknown collectors', () => {
+    const d = parseAgentDirectives(
+      JSON.stringify({ version: 3, interval: 5, collectors: ['cpu', 'disk'], sampling_rate: 2, batch_size: 20 })
+    );
+    expect(d).toEqual({ version: '3', collectors: ['cpu'], batch_size: 20 });
+  });
+
+  it('skips agents that already applied the current version', async () => {
+    storedRow = JSON.stringify({ version: 'v2', interval: 600 });
+    expect(await getAgentDirectives('pro', 'v1', now)).toEqual({ version: 'v2', interval: 600 });
+    expect(await getAgentDirectives('pro', 'v2', now)).toBeNull();
+  });
+
+  it('clamps the interval to the tier minimum', async () => {
+    storedRow = JSON.stringify({ version: 'v3', interval: 30 });
+    expect((await getAgentDirectives('free', undefined, now)).interval).toBe(300);
+    expect((await getAgentDirectives('pro', undefined, now)).interval).toBe(60);
+    expect((await getAgentDirectives('enterprise', undefined, now)).interval).toBe(30);
+  });
+
+  it('picks up an edited row once the TTL has passed', async () => {
+    storedRow = JSON.stringify({ version: 'v4', sampling_rate: 1 });
+    expect((await getAgentDirectives('pro', undefined, now)).version).toBe('v4');
+
+    storedRow = JSON.stringify({ version: 'v5', sampling_rate: 0.5 });
+    expect((await getAgentDirectives('pro', undefined, now + CONFIG_TTL_MS - 1)).version).toBe('v4');
+    expect(mockExecute).toHaveBeenCalledTimes(1);
+    expect(await getAgentDirectives('pro', undefined, now + CONFIG_TTL_MS)).toEqual({
+      version: 'v5',
+      sampling_rate: 0.5,
+    });
+  });
+
+  it('falls back to AGENT_CONFIG_DIRECTIVES when no row is stored', async () => {
+    process.env.AGENT_CONFIG_DIRECTIVES = JSON.stringify({ version: 'env1', batch_size: 5 });
+    expect(await getAgentDirectives('pro', undefined, now)).toEqual({ version: 'env1', batch_size: 5 });
+  });
+
+  it('keeps the last directives when Turso cannot be read', async () => {
+    storedRow = JSON.stringify({ version: 'v6' });
+    expect((await getAgentDirectives('pro', undefined, now)).version).toBe('v6');
+    failReads = true;
+    expect((await getAgentDirectives('pro', undefined, now + CONFIG_TTL_MS)).version).toBe('v6');
+  });
+
+  it('shares one read between concurrent heartbeats', async () => {
+    storedRow = JSON.stringify({ version: 'v7' });
+    const results = await Promise.all([1, 2, 3].map(() => getAgentDirectives('pro', undefined, now)));
+    expect(results.map((d) => d.version)).toEqual(['v7', 'v7', 'v7']);
+    expect(mockExecute).toHaveBeenCalledTimes(1);
+  });
+
+  it('stores new directives and serves them without waiting for the TTL', async () => {
+    storedRow = JSON.stringify({ version: 'v8' });
+    await getAgentDirectives('pro', undefined, now);
+    await setAgentDirectives({ version: 'v9', interval: 120 }, now);
+    expect(JSON.parse(storedRow)).toEqual({ version: 'v9', interval: 120 });
+    expect(await getAgentDirectives('pro', 'v8', now)).toEqual({ version: 'v9', interval: 120 });
+    expect(mockExecute).toHaveBeenCalledTimes(2); // one read, one write
+    await expect(setAgentDirectives({ interval: 120 }, now)).rejects.toThrow('version');
+  });
+});
@@ -0,0 +1,720 @@
+#!/usr/bin/env python3
+"""ClawTrace Agent - Darwin Heartbeat Agent"""
+# Agent: {{AGENT_ID}}
+# Run: python3 clawtrace-agent.py
+# Generated from clawtrace-agent.py by scripts/gen_install_agent.py. Do not edit.
+import json, time, platform, os, hmac, hashlib, sys
+from collections import deque
+try:
+ import resource
+except ImportError:
+ resource = None
+SAAS_URL = '{{BASE_URL}}'
+AGENT_ID = '{{AGENT_ID}}'
+AGENT_SECRET = '{{AGENT_SECRET}}' or os.environ.get('CLAWTRACE_AGENT_SECRET', '')
+INTERVAL = int('{{INTERVAL}}')
+OS_NAME = platform.system()
+PROC_ROOT = os.environ.get('CLAWTRACE_PROC_ROOT', '/proc')
+AGENT_STATS = os.environ.get('CLAWTRACE_AGENT_STATS', '0') == '1'
+DEBUG_DUMP = os.environ.get('CLAWTRACE_DEBUG_DUMP')
+METRICS_PORT = int(os.environ.get('CLAWTRACE_METRICS_PORT', '0'))
+ADAPTIVE = os.environ.get('CLAWTRACE_ADAPTIVE', '0') == '1'
+SAMPLE_INTERVAL = int(os.environ.get('CLAWTRACE_SAMPLE_INTERVAL', str(min(INTERVAL, 15))))
+MAX_SILENCE = int(os.environ.get('CLAWTRACE_MAX_SILENCE', str(max(INTERVAL, 240))))
+MIN_SPACING = int(os.environ.get('CLAWTRACE_MIN_SPACING', '10'))
+ADAPTIVE_Z = float(os.environ.get('CLAWTRACE_ADAPTIVE_Z', '3'))
+HISTORY_DB = os.environ.get('CLAWTRACE_HISTORY_DB')
+HISTORY_BATCH = int(os.environ.get('CLAWTRACE_HISTORY_BATCH', '10'))
+HISTORY_RAW_HOURS = int(os.environ.get('CLAWTRACE_HISTORY_RAW_HOURS', '6'))
+HISTORY_1M_DAYS = int(os.environ.get('CLAWTRACE_HISTORY_1M_DAYS', '7'))
+HISTORY_1H_DAYS = int(os.environ.get('CLAWTRACE_HISTORY_1H_DAYS', '56'))
+TAIL_FILES = [p for p in os.environ.get('CLAWTRACE_TAIL_FILES', '').split(os.pathsep) if p]
+TAIL_PATTERN = os.environ.get('CLAWTRACE_TAIL_PATTERN', '\\b(ERROR|CRITICAL|FATAL|Traceback)\\b')
+TAIL_STATE = os.environ.get('CLAWTRACE_TAIL_STATE')
+TAIL_READ_SIZE = int(os.environ.get('CLAWTRACE_TAIL_READ_SIZE', str(1 << 20)))
+TAIL_MAX_BYTES = int(os.environ.get('CLAWTRACE_TAIL_MAX_BYTES', str(64 << 20)))
+SESSION_TOKEN = None
+GATEWAY_URL = None
+_last_cpu_stats = None
+_phase_ns = {}
+_beats_sent = 0
+_metrics_bodies = None
+_history = None
+_tail = None
+ALL_COLLECTORS = ('cpu', 'mem', 'uptime', 'probe', 'logs')
+COLLECTORS = set(ALL_COLLECTORS)
+SAMPLING_RATE = 1.0
+CONFIG_VERSION = None
+_rejected_config = None
+_sampling_credit = 0.0
+LOG_LEVELS = {'debug': 10, 'info': 20, 'warn': 30, 'error': 40}
+LOG_LEVEL = LOG_LEVELS.get(os.environ.get('CLAWTRACE_LOG_LEVEL', 'debug' if sys.stdout.isatty() else 'info'), 20)
+LOG_FORMAT = os.environ.get('CLAWTRACE_LOG_FORMAT', 'text')
+LOG_RATE = float(os.environ.get('CLAWTRACE_LOG_RATE', '10'))
+LOG_DUMP = os.environ.get('CLAWTRACE_LOG_DUMP')
+LOG_COLORS = {'heartbeat.sent': '\x1b[92m', 'heartbeat.degraded': '\x1b[91m', 'probe.failed': '\x1b[91m', 'probe.active': '\x1b[96m', 'config.applied': '\x1b[96m'}
+_events = deque(maxlen=int(os.environ.get('CLAWTRACE_LOG_BUFFER', '512')))
+_log_tokens, _log_refilled, _log_suppressed = (LOG_RATE, 0.0, 0)
+_clock = (0, '')
+
+def log(level, event, msg, **fields):
+ global _log_tokens, _log_refilled, _log_suppressed
+ ts = time.time()
+ _events.append((ts, level, event, msg, fields))
+ if LOG_LEVELS[level] < LOG_LEVEL:
+  return
+ if LOG_RATE:
+  _log_tokens = min(LOG_RATE, _log_tokens + (ts - _log_refilled) * LOG_RATE)
+  _log_refilled = ts
+  if _log_tokens < 1:
+   _log_suppressed += 1
+   return
+  _log_tokens -= 1
+  if _log_suppressed:
+   notice = {'count': _log_suppressed}
+   _log_suppressed = 0
+   _events.append((ts, 'warn', 'log.suppressed', '{count} log lines suppressed by rate limit', notice))
+   _emit(ts, 'warn', 'log.suppressed', '{count} log lines suppressed by rate limit', notice)
+ _emit(ts, level, event, msg, fields)
+
+def _emit(ts, level, event, msg, fields):
+ global _clock
+ if LOG_FORMAT == 'json':
+  print(json.dumps({'ts': round(ts, 3), 'level': level, 'event': event, 'msg': msg.format(**fields), **fields}), flush=True)
+  return
+ if int(ts) != _clock[0]:
+  _clock = (int(ts), time.strftime('%H:%M:%S', time.localtime(ts)))
+ color = LOG_COLORS.get(event)
+ print(f'[{_clock[1]}] {color}{msg.format(**fields)}\x1b[0m' if color else f'[{_clock[1]}] {msg.format(**fields)}', flush=True)
+
+def dump_events(signum=None, frame=None):
+ out = open(LOG_DUMP, 'a') if LOG_DUMP else sys.stderr
+ try:
+  for ts, level, event, msg, fields in list(_events):
+   out.write(json.dumps({'ts': round(ts, 3), 'level': level, 'event': event, 'msg': msg.format(**fields), **fields}) + '\n')
+  out.flush()
+ finally:
+  if LOG_DUMP:
+   out.close()
+
+def sign_handshake(agent_id, secret, timestamp):
+ return hmac.new(secret.encode(), (agent_id + timestamp).encode(), hashlib.sha256).hexdigest()
+
+def build_handshake(agent_id, secret, timestamp=None):
+ timestamp = timestamp or str(int(time.time()))
+ return {'agent_id': agent_id, 'timestamp': timestamp, 'signature': sign_handshake(agent_id, secret, timestamp)}
+
+def build_payload(agent_id, status, metrics, stats=None, trigger=None):
+ payload = {'agent_id': agent_id, 'status': status, 'metrics': metrics}
+ if stats:
+  payload['agent_stats'] = stats
+ if trigger:
+  payload['trigger'] = trigger
+ if CONFIG_VERSION:
+  payload['config_version'] = CONFIG_VERSION
+ return payload
+
+def perform_handshake():
+ global SESSION_TOKEN, GATEWAY_URL
+ import urllib.request
+ data = json.dumps(build_handshake(AGENT_ID, AGENT_SECRET)).encode()
+ req = urllib.request.Request(f'{SAAS_URL}/api/agents/handshake', data=data, headers={'Content-Type': 'application/json'}, method='POST')
+ try:
+  with urllib.request.urlopen(req, timeout=10) as resp:
+   res = json.loads(resp.read().decode())
+   SESSION_TOKEN = res.get('token')
+   GATEWAY_URL = res.get('gateway_url')
+   log('info', 'handshake.ok', 'Handshake successful')
+   if GATEWAY_URL:
+    log('info', 'probe.active', 'Probing active: {url}', url=GATEWAY_URL)
+   return True
+ except Exception as e:
+  log('error', 'handshake.failed', 'Handshake failed: {error}', error=str(e))
+  return False
+
+def _cpu_darwin():
+ import subprocess
+ r = subprocess.run(['ps', '-A', '-o', '%cpu'], capture_output=True, text=True)
+ return min(100, int(sum((float(x) for x in r.stdout.strip().split('\n')[1:] if x.strip())) / (os.cpu_count() or 4)))
+
+def _mem_darwin():
+ import subprocess
+ r = subprocess.run(['vm_stat'], capture_output=True, text=True)
+ d = {}
+ for line in r.stdout.split('\n'):
+  if ':' in line:
+   k, v = line.split(':', 1)
+   val = v.strip().rstrip('.')
+   if val.isdigit():
+    d[k.strip()] = int(val)
+ active = d.get('Pages active', 0) + d.get('Pages wired down', 0)
+ total = active + d.get('Pages free', 0) + d.get('Pages speculative', 0)
+ return int(active / max(total, 1) * 100)
+
+def _uptime_darwin():
+ import subprocess, re
+ r = subprocess.run(['sysctl', '-n', 'kern.boottime'], capture_output=True, text=True)
+ m = re.search('sec = (\\d+)', r.stdout)
+ return int((time.time() - int(m.group(1))) / 3600) if m else 0
+_read_cpu = _cpu_darwin
+_read_mem = _mem_darwin
+_read_uptime = _uptime_darwin
+
+def get_cpu():
+ try:
+  return _read_cpu()
+ except:
+  return 0
+
+def get_mem():
+ try:
+  return _read_mem()
+ except:
+  return 0
+
+def get_uptime():
+ try:
+  return _read_uptime()
+ except:
+  return 0
+
+class LogTail:
+
+ def __init__(self, paths, pattern=TAIL_PATTERN, state_path=TAIL_STATE, read_size=TAIL_READ_SIZE, max_bytes=TAIL_MAX_BYTES):
+  import re
+  self.paths = list(paths)
+  self.search = re.compile(pattern.encode()).search
+  self.state_path = state_path
+  self.read_size = read_size
+  self.max_bytes = max_bytes
+  self.files = {}
+  self.saved = {}
+  self.pending = 0
+  self.total = 0
+  if state_path:
+   try:
+    with open(state_path) as f:
+     self.saved = json.load(f)
+   except (OSError, ValueError):
+    pass
+
+ def _open(self, path, st):
+  f = open(path, 'rb')
+  inode, offset = (st.st_ino, st.st_size)
+  saved = self.saved.pop(path, None)
+  if path in self.files:
+   offset = 0
+  elif saved and saved[0] == inode and (saved[1] <= st.st_size):
+   offset = saved[1]
+  f.seek(offset)
+  self.files[path] = [f, inode, offset, b'']
+
+ def _drain(self, entry, limit):
+  f, _, offset, partial = entry
+  count = read = 0
+  while read < limit:
+   chunk = f.read(min(self.read_size, limit - read))
+   if not chunk:
+    break
+   read += len(chunk)
+   lines = (partial + chunk).split(b'\n')
+   partial = lines.pop()
+   for line in lines:
+    if self.search(line):
+     count += 1
+  entry[2], entry[3] = (offset + read, partial)
+  return count
+
+ def poll(self):
+  count = 0
+  for path in self.paths:
+   try:
+    st = os.stat(path)
+   except OSError:
+    continue
+   entry = self.files.get(path)
+   try:
+    if entry and entry[1] != st.st_ino:
+     count += self._drain(entry, self.max_bytes)
+     if entry[3] and self.search(entry[3]):
+      count += 1
+     entry[0].close()
+     log('info', 'tail.rotated', 'Log rotated: {path}', path=path)
+     self._open(path, st)
+    elif entry and st.st_size < entry[2]:
+     entry[0].seek(0)
+     entry[2], entry[3] = (0, b'')
+     log('info', 'tail.truncated', 'Log truncated: {path}', path=path)
+    elif not entry:
+     self._open(path, st)
+    count += self._drain(self.files[path], self.max_bytes)
+   except OSError as e:
+    log('warn', 'tail.failed', 'Cannot read {path}: {error}', path=path, error=str(e))
+  self.pending += count
+  self.total += count
+  if self.state_path:
+   self.save()
+  return count
+
+ def save(self):
+  state = {p: [e[1], e[2] - len(e[3])] for p, e in self.files.items()}
+  tmp = self.state_path + '.tmp'
+  try:
+   with open(tmp, 'w') as f:
+    json.dump(state, f)
+   os.replace(tmp, self.state_path)
+  except OSError as e:
+   log('warn', 'tail.failed', 'Cannot save offsets to {path}: {error}', path=self.state_path, error=str(e))
+
+def get_agent_stats():
+ stats = {'beats': _beats_sent, 'phase_ns': dict(_phase_ns)}
+ if resource:
+  ru = resource.getrusage(resource.RUSAGE_SELF)
+  stats['cpu_user_s'] = round(ru.ru_utime, 3)
+  stats['cpu_sys_s'] = round(ru.ru_stime, 3)
+  stats['max_rss_kb'] = ru.ru_maxrss // 1024 if sys.platform == 'darwin' else ru.ru_maxrss
+ try:
+  with open(f'{PROC_ROOT}/self/statm') as f:
+   stats['rss_kb'] = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+ except:
+  pass
+ return stats
+
+def write_debug_dump(stats):
+ try:
+  tmp = DEBUG_DUMP + '.tmp'
+  with open(tmp, 'w') as f:
+   json.dump({'time': int(time.time()), 'agent_id': AGENT_ID, 'agent_stats': stats}, f, indent=2)
+  os.replace(tmp, DEBUG_DUMP)
+ except Exception as e:
+  log('warn', 'dump.failed', 'Debug dump failed: {error}', error=str(e))
+
+def render_metrics(status, metrics, stats):
+ global _metrics_bodies
+ label = '{agent_id="%s"}' % str(AGENT_ID).replace('\\', '\\\\').replace('"', '\\"')
+ lines, prom_lines = ([], [])
+
+ def sample(name, kind, help_text, value, labels=label):
+  if kind == 'counter':
+   line = f'{name}_total{labels} {value}'
+   lines.extend((f'# HELP {name} {help_text}', f'# TYPE {name} counter', line))
+   prom_lines.extend((f'# HELP {name}_total {help_text}', f'# TYPE {name}_total counter', line))
+   return
+  block = (f'# HELP {name} {help_text}', f'# TYPE {name} {kind}', f'{name}{labels} {value}')
+  lines.extend(block)
+  prom_lines.extend(block)
+ sample('clawtrace_healthy', 'gauge', '1 if the last gateway probe succeeded.', int(status == 'healthy'))
+ if 'cpu_usage' in metrics:
+  sample('clawtrace_cpu_usage_percent', 'gauge', 'Host CPU usage.', metrics['cpu_usage'])
+ if 'memory_usage' in metrics:
+  sample('clawtrace_memory_usage_percent', 'gauge', 'Host memory usage.', metrics['memory_usage'])
+ if 'uptime_hours' in metrics:
+  sample('clawtrace_uptime_hours', 'gauge', 'Host uptime.', metrics['uptime_hours'])
+ if 'latency_ms' in metrics:
+  sample('clawtrace_gateway_latency_ms', 'gauge', 'Gateway probe latency.', metrics['latency_ms'])
+ if _tail:
+  sample('clawtrace_log_error_lines', 'counter', 'Log lines matching CLAWTRACE_TAIL_PATTERN.', _tail.total)
+ sample('clawtrace_agent_beats', 'counter', 'Heartbeats delivered by this agent.', stats['beats'])
+ if 'cpu_user_s' in stats:
+  sample('clawtrace_agent_cpu_seconds', 'counter', 'Agent CPU time (user + system).', round(stats['cpu_user_s'] + stats['cpu_sys_s'], 3))
+ if 'rss_kb' in stats:
+  sample('clawtrace_agent_rss_bytes', 'gauge', 'Agent resident set size.', stats['rss_kb'] * 1024)
+ if stats['phase_ns']:
+  block = ['# HELP clawtrace_agent_phase_seconds Duration of each phase of the last beat.', '# TYPE clawtrace_agent_phase_seconds gauge']
+  for phase, ns in stats['phase_ns'].items():
+   block.append(f'clawtrace_agent_phase_seconds{label[:-1]},phase="{phase}"}} {ns / 1000000000.0:.6f}')
+  lines.extend(block)
+  prom_lines.extend(block)
+ _metrics_bodies = (('\n'.join(lines) + '\n# EOF\n').encode(), ('\n'.join(prom_lines) + '\n').encode())
+
+def start_metrics_server(port):
+ import threading
+ from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ class MetricsHandler(BaseHTTPRequestHandler):
+
+  def do_GET(self):
+   bodies = _metrics_bodies
+   if self.path.split('?')[0] != '/metrics' or bodies is None:
+    self.send_response(404 if bodies else 503)
+    self.end_headers()
+    return
+   if 'application/openmetrics-text' in self.headers.get('Accept', ''):
+    body, ctype = (bodies[0], 'application/openmetrics-text; version=1.0.0; charset=utf-8')
+   else:
+    body, ctype = (bodies[1], 'text/plain; version=0.0.4; charset=utf-8')
+   self.send_response(200)
+   self.send_header('Content-Type', ctype)
+   self.send_header('Content-Length', str(len(body)))
+   self.end_headers()
+   self.wfile.write(body)
+
+  def log_message(self, *args):
+   pass
+ server = ThreadingHTTPServer(('127.0.0.1', port), MetricsHandler)
+ threading.Thread(target=server.serve_forever, daemon=True).start()
+ return server
+
+class MetricHistory:
+ COLS = ('cpu_usage', 'memory_usage', 'latency_ms', 'uptime_hours', 'errors_count', 'tasks_completed')
+ COUNTERS = ('errors_count', 'tasks_completed')
+ TIERS = {'raw': 'agent_metrics', '1m': 'agent_metrics_1m', '1h': 'agent_metrics_1h'}
+
+ def __init__(self, path, batch_size=HISTORY_BATCH, max_buffer_age=300):
+  import sqlite3
+  self.db = sqlite3.connect(path)
+  self.db.execute('PRAGMA journal_mode=WAL')
+  self.db.execute('PRAGMA synchronous=NORMAL')
+  cols = ', '.join((f'{c} INTEGER DEFAULT 0' for c in self.COLS))
+  with self.db:
+   self.db.execute(f'CREATE TABLE IF NOT EXISTS agent_metrics (id TEXT PRIMARY KEY, agent_id TEXT NOT NULL, user_id TEXT, {cols}, created_at TEXT)')
+   self.db.execute('CREATE INDEX IF NOT EXISTS idx_agent_metrics_agent_id_created_at ON agent_metrics (agent_id, created_at)')
+   for tier in ('1m', '1h'):
+    table = self.TIERS[tier]
+    self.db.execute(f'CREATE TABLE IF NOT EXISTS {table} (id TEXT PRIMARY KEY, agent_id TEXT NOT NULL, user_id TEXT, {cols}, samples INTEGER DEFAULT 0, created_at TEXT)')
+    self.db.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_agent_id_created_at ON {table} (agent_id, created_at)')
+  self.batch_size = max(1, batch_size)
+  self.max_buffer_age = max_buffer_age
+  self.buffer = []
+  self.buffered_since = 0
+
+ def record(self, agent_id, metrics, ts=None):
+  ts = ts or time.time()
+  created_at = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(ts))
+  if not self.buffer:
+   self.buffered_since = ts
+  self.buffer.append((f'{agent_id}:{int(ts * 1000)}', agent_id, None, *(int(metrics.get(c, 0)) for c in self.COLS), created_at))
+  if len(self.buffer) >= self.batch_size or ts - self.buffered_since >= self.max_buffer_age:
+   self.flush()
+
+ def flush(self):
+  if not self.buffer:
+   return
+  rows, self.buffer = (self.buffer, [])
+  agent_id, oldest = (rows[0][1], min((r[-1] for r in rows)))
+  cols = ', '.join(self.COLS)
+  now = time.time()
+  with self.db:
+   self.db.executemany(f"INSERT OR REPLACE INTO agent_metrics (id, agent_id, user_id, {cols}, created_at) VALUES ({', '.join('?' * (len(self.COLS) + 4))})", rows)
+   avg = ', '.join((f'SUM({c})' if c in self.COUNTERS else f'CAST(ROUND(AVG({c})) AS INTEGER)' for c in self.COLS))
+   bucket_1m = "substr(created_at, 1, 16) || ':00Z'"
+   self.db.execute(f"INSERT OR REPLACE INTO agent_metrics_1m (id, agent_id, user_id, {cols}, samples, created_at) SELECT agent_id || ':1m:' || {bucket_1m}, agent_id, NULL, {avg}, COUNT(*), {bucket_1m} FROM agent_metrics WHERE agent_id = ? AND created_at >= ? GROUP BY {bucket_1m}", (agent_id, oldest[:16] + ':00Z'))
+   wavg = ', '.join((f'SUM({c})' if c in self.COUNTERS else f'CAST(ROUND(SUM({c} * samples) * 1.0 / SUM(samples)) AS INTEGER)' for c in self.COLS))
+   bucket_1h = "substr(created_at, 1, 13) || ':00:00Z'"
+   self.db.execute(f"INSERT OR REPLACE INTO agent_metrics_1h (id, agent_id, user_id, {cols}, samples, created_at) SELECT agent_id || ':1h:' || {bucket_1h}, agent_id, NULL, {wavg}, SUM(samples), {bucket_1h} FROM agent_metrics_1m WHERE agent_id = ? AND created_at >= ? GROUP BY {bucket_1h}", (agent_id, oldest[:13] + ':00:00Z'))
+   for table, keep in (('agent_metrics', HISTORY_RAW_HOURS * 3600), ('agent_metrics_1m', HISTORY_1M_DAYS * 86400), ('agent_metrics_1h', HISTORY_1H_DAYS * 86400)):
+    cutoff = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(now - keep))
+    self.db.execute(f'DELETE FROM {table} WHERE agent_id = ? AND created_at < ?', (agent_id, cutoff))
+
+ def query(self, tier='raw', since=None, agent_id=None):
+  table = self.TIERS[tier]
+  sql, args = (f'SELECT * FROM {table} WHERE created_at >= ?', [since or ''])
+  if agent_id:
+   sql += ' AND agent_id = ?'
+   args.append(agent_id)
+  cur = self.db.execute(sql + ' ORDER BY created_at', args)
+  names = [d[0] for d in cur.description]
+  return [dict(zip(names, row)) for row in cur]
+
+ def close(self):
+  self.flush()
+  self.db.close()
+
+def selftest(argv):
+ out = {'python': platform.python_version(), 'os': OS_NAME, 'modules': len(sys.modules)}
+ if '--startup' not in argv:
+  t0 = time.perf_counter_ns()
+  out['metrics'] = collect_sample()['metrics']
+  out['collect_ms'] = round((time.perf_counter_ns() - t0) / 1000000.0, 1)
+  out['modules'] = len(sys.modules)
+ out['agent_stats'] = get_agent_stats()
+ print(json.dumps(out))
+ return 0
+
+def history_cli(argv):
+ import argparse
+ parser = argparse.ArgumentParser(prog='clawtrace-agent.py history', description='Query local ClawTrace metric history')
+ parser.add_argument('--db', default=HISTORY_DB, help='History database (default: $CLAWTRACE_HISTORY_DB)')
+ parser.add_argument('--tier', choices=list(MetricHistory.TIERS), default='raw', help='raw samples or 1m/1h rollups')
+ parser.add_argument('--since', default='1h', help='Window such as 30m, 6h, 7d, or an ISO UTC timestamp')
+ parser.add_argument('--agent', default=None, help='Only rows for this agent id')
+ parser.add_argument('--json', action='store_true', help='Output JSON lines')
+ args = parser.parse_args(argv)
+ if not args.db or not os.path.exists(args.db):
+  print(f'Error: history database not found: {args.db}')
+  return 1
+ since = args.since
+ if since[:-1].isdigit() and since[-1] in 'smhd':
+  secs = int(since[:-1]) * {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[since[-1]]
+  since = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(time.time() - secs))
+ history = MetricHistory(args.db)
+ rows = history.query(args.tier, since, args.agent)
+ history.db.close()
+ if args.json:
+  for row in rows:
+   print(json.dumps(row))
+  return 0
+ print(f"{'created_at':<22}{'cpu':>5}{'mem':>5}{'lat_ms':>8}{'up_h':>6}{'errors':>8}" + ('  samples' if args.tier != 'raw' else ''))
+ for row in rows:
+  line = f"{row['created_at']:<22}{row['cpu_usage']:>5}{row['memory_usage']:>5}{row['latency_ms']:>8}{row['uptime_hours']:>6}{row['errors_count']:>8}"
+  print(line + (f"{row['samples']:>9}" if args.tier != 'raw' else ''))
+ print(f'({len(rows)} rows)')
+ return 0
+
+def collect_sample():
+ t0 = time.perf_counter_ns()
+ status = 'healthy'
+ latency = 0
+ if GATEWAY_URL and 'probe' in COLLECTORS:
+  import urllib.request
+  try:
+   start = time.time()
+   urllib.request.urlopen(GATEWAY_URL, timeout=5)
+   latency = int((time.time() - start) * 1000)
+  except:
+   status = 'error'
+ t1 = time.perf_counter_ns()
+ metrics = {}
+ if 'cpu' in COLLECTORS:
+  metrics['cpu_usage'] = get_cpu()
+ if 'mem' in COLLECTORS:
+  metrics['memory_usage'] = get_mem()
+ if 'uptime' in COLLECTORS:
+  metrics['uptime_hours'] = get_uptime()
+ if 'probe' in COLLECTORS:
+  metrics['latency_ms'] = latency
+ if 'logs' in COLLECTORS and _tail:
+  metrics['errors_count'] = _tail.poll()
+ t2 = time.perf_counter_ns()
+ stats = get_agent_stats() if AGENT_STATS or METRICS_PORT else None
+ if METRICS_PORT:
+  render_metrics(status, metrics, stats)
+ if _history:
+  try:
+   _history.record(AGENT_ID, metrics)
+  except Exception as e:
+   log('warn', 'history.failed', 'History write failed: {error}', error=str(e))
+ return {'status': status, 'metrics': metrics, 'stats': stats, 'probe_ns': t1 - t0, 'collect_ns': t2 - t1}
+
+def send_heartbeat(sample=None, trigger=None):
+ global SESSION_TOKEN, _beats_sent
+ if not SESSION_TOKEN:
+  if not perform_handshake():
+   return False
+ import urllib.request, urllib.error
+ sample = sample or collect_sample()
+ status, metrics = (sample['status'], sample['metrics'])
+ cpu, mem, latency = (metrics.get('cpu_usage', 0), metrics.get('memory_usage', 0), metrics.get('latency_ms', 0))
+ if 'errors_count' in metrics:
+  metrics = {**metrics, 'errors_count': _tail.pending}
+ t2 = time.perf_counter_ns()
+ payload = build_payload(AGENT_ID, status, metrics, sample['stats'] if AGENT_STATS else None, trigger)
+ data = json.dumps(payload).encode()
+ t3 = time.perf_counter_ns()
+ headers = {'Content-Type': 'application/json', 'Authorization': f'Bearer {SESSION_TOKEN}'}
+ req = urllib.request.Request(f'{SAAS_URL}/api/heartbeat', data=data, headers=headers, method='POST')
+ try:
+  with urllib.request.urlopen(req, timeout=10) as resp:
+   try:
+    config = json.loads(resp.read() or b'{}').get('config')
+   except ValueError:
+    config = None
+   _beats_sent += 1
+   if 'errors_count' in metrics:
+    _tail.pending -= metrics['errors_count']
+   _phase_ns.update(probe=sample['probe_ns'], collect=sample['collect_ns'], serialize=t3 - t2, upload=time.perf_counter_ns() - t3)
+   if DEBUG_DUMP:
+    write_debug_dump(get_agent_stats())
+   reason = f'  [{trigger}]' if trigger and trigger != 'keepalive' else ''
+   msg = 'Heartbeat sent ({status})  CPU: {cpu}%  MEM: {mem}%  Latency: {latency}ms{reason}'
+   if status == 'error':
+    log('warn', 'probe.failed', 'WARNING: Gateway probe failed ({url})', url=GATEWAY_URL)
+    log('warn', 'heartbeat.degraded', msg, status=status.upper(), cpu=cpu, mem=mem, latency=latency, reason=reason)
+   else:
+    log('info' if reason else 'debug', 'heartbeat.sent', msg, status=status.upper(), cpu=cpu, mem=mem, latency=latency, reason=reason)
+   if config and str(config.get('version') or '') != CONFIG_VERSION:
+    apply_config(config)
+   return True
+ except urllib.error.HTTPError as e:
+  if e.code == 401:
+   log('info', 'session.expired', 'Session expired, retrying...')
+   SESSION_TOKEN = None
+   return send_heartbeat(sample, trigger)
+  else:
+   log('error', 'heartbeat.failed', 'FAIL: {error}', error=str(e), code=e.code)
+ except Exception as e:
+  log('error', 'heartbeat.failed', 'FAIL: {error}', error=str(e))
+ return False
+
+def parse_config(config):
+ parsed = {}
+ try:
+  if config.get('interval') is not None:
+   parsed['interval'] = int(config['interval'])
+   if parsed['interval'] < 10:
+    raise ValueError(f"interval {parsed['interval']} < 10s")
+  if config.get('collectors') is not None:
+   if not isinstance(config['collectors'], list) or not all((isinstance(c, str) for c in config['collectors'])):
+    raise ValueError(f"collectors must be a list of names, got {config['collectors']!r}")
+   parsed['collectors'] = set(config['collectors']) & set(ALL_COLLECTORS)
+  if config.get('sampling_rate') is not None:
+   parsed['sampling_rate'] = float(config['sampling_rate'])
+   if not 0 < parsed['sampling_rate'] <= 1:
+    raise ValueError(f"sampling_rate {parsed['sampling_rate']} not in (0, 1]")
+  if config.get('batch_size') is not None:
+   parsed['batch_size'] = int(config['batch_size'])
+   if parsed['batch_size'] < 1:
+    raise ValueError(f"batch_size {parsed['batch_size']} < 1")
+ except (TypeError, ValueError) as e:
+  raise ValueError(str(e)) from None
+ return parsed
+
+def apply_config(config):
+ global INTERVAL, MAX_SILENCE, COLLECTORS, SAMPLING_RATE, HISTORY_BATCH, CONFIG_VERSION, _rejected_config
+ version = str(config.get('version') or '')
+ try:
+  parsed = parse_config(config)
+ except ValueError as e:
+  if version != _rejected_config:
+   _rejected_config = version
+   log('warn', 'config.rejected', 'Rejected config v{version}, keeping v{current}: {error}', version=version, current=CONFIG_VERSION or '-', error=str(e))
+  return False
+ applied = []
+ if 'interval' in parsed:
+  INTERVAL = parsed['interval']
+  if ADAPTIVE:
+   MAX_SILENCE = INTERVAL
+  applied.append(f'interval={INTERVAL}s')
+ if 'collectors' in parsed:
+  COLLECTORS = parsed['collectors']
+  applied.append('collectors=' + ','.join(sorted(COLLECTORS)))
+ if 'sampling_rate' in parsed:
+  SAMPLING_RATE = parsed['sampling_rate']
+  applied.append(f'sampling_rate={SAMPLING_RATE}')
+ if 'batch_size' in parsed:
+  HISTORY_BATCH = parsed['batch_size']
+  if _history:
+   _history.batch_size = HISTORY_BATCH
+  applied.append(f'batch_size={HISTORY_BATCH}')
+ CONFIG_VERSION = version
+ log('info', 'config.applied', 'Applied config v{version}: {applied}', version=CONFIG_VERSION, applied=' '.join(applied) or 'no changes')
+ return True
+
+def beat_due():
+ global _sampling_credit
+ _sampling_credit += SAMPLING_RATE
+ if _sampling_credit >= 1:
+  _sampling_credit -= 1
+  return True
+ return False
+
+class ChangeDetector:
+ MIN_DELTA = {'cpu_usage': 10, 'memory_usage': 5, 'latency_ms': 100, 'errors_count': 1}
+
+ def __init__(self, alpha=0.2, z_threshold=3.0, warmup=5):
+  self.alpha = alpha
+  self.z_threshold = z_threshold
+  self.warmup = warmup
+  self.n = 0
+  self.mean = {}
+  self.var = {}
+
+ def update(self, metrics):
+  changed = []
+  for key, min_delta in self.MIN_DELTA.items():
+   x = metrics.get(key, 0)
+   if key not in self.mean:
+    self.mean[key], self.var[key] = (float(x), 0.0)
+    continue
+   diff = x - self.mean[key]
+   if self.n >= self.warmup and abs(diff) >= min_delta and (abs(diff) > self.z_threshold * self.var[key] ** 0.5):
+    changed.append(key)
+   incr = self.alpha * diff
+   self.mean[key] += incr
+   self.var[key] = (1 - self.alpha) * (self.var[key] + diff * incr)
+  self.n += 1
+  return changed
+
+def run_adaptive():
+ detector = ChangeDetector(z_threshold=ADAPTIVE_Z)
+ last_sent, last_status = (float('-inf'), None)
+ while True:
+  sample = collect_sample()
+  changed = detector.update(sample['metrics'])
+  now = time.monotonic()
+  if sample['status'] != last_status:
+   trigger = 'status'
+  elif changed:
+   trigger = 'change:' + ','.join(changed)
+  elif now - last_sent >= MAX_SILENCE:
+   trigger = 'keepalive' if beat_due() else None
+   if not trigger:
+    last_sent = now
+  else:
+   trigger = None
+  if trigger and now - last_sent < MIN_SPACING:
+   time.sleep(MIN_SPACING - (now - last_sent))
+   sample = collect_sample()
+   now = time.monotonic()
+  if trigger:
+   last_sent = now
+   if send_heartbeat(sample, trigger):
+    last_status = sample['status']
+  time.sleep(SAMPLE_INTERVAL)
+if __name__ == '__main__':
+ import signal
+ if len(sys.argv) > 1 and sys.argv[1] == 'history':
+  sys.exit(history_cli(sys.argv[2:]))
+ if len(sys.argv) > 1 and sys.argv[1] == 'selftest':
+  sys.exit(selftest(sys.argv[2:]))
+ if not AGENT_ID or not AGENT_SECRET:
+  print('Error: Agent ID and Agent Secret are required.')
+  print('Set CLAWTRACE_AGENT_ID and CLAWTRACE_AGENT_SECRET environment variables.')
+  sys.exit(1)
+ print()
+ print('  ClawTrace Agent')
+ print('  --------------------------------')
+ if not AGENT_ID or not AGENT_SECRET:
+  print('  \x1b[91mError: CLAWTRACE_AGENT_ID and CLAWTRACE_AGENT_SECRET must be set.\x1b[0m')
+  print('  Please set these environment variables and run the agent again.')
+  print()
+  exit(1)
+ print(f'  Agent:    {AGENT_ID}')
+ print(f'  SaaS:     {SAAS_URL}')
+ if ADAPTIVE:
+  print(f'  Interval: adaptive (sample {SAMPLE_INTERVAL}s, keepalive {MAX_SILENCE}s, spacing {MIN_SPACING}s)')
+ else:
+  print(f'  Interval: {INTERVAL}s')
+ print(f'  OS:       {OS_NAME} {platform.machine()}')
+ if AGENT_STATS:
+  print('  Stats:    agent_stats enabled')
+ if DEBUG_DUMP:
+  print(f'  Dump:     {DEBUG_DUMP}')
+ if METRICS_PORT:
+  start_metrics_server(METRICS_PORT)
+  print(f'  Metrics:  http://127.0.0.1:{METRICS_PORT}/metrics')
+ if HISTORY_DB:
+  import atexit
+  _history = MetricHistory(HISTORY_DB)
+  atexit.register(_history.close)
+  print(f'  History:  {HISTORY_DB}')
+ if TAIL_FILES:
+  _tail = LogTail(TAIL_FILES)
+  print(f"  Tailing:  {', '.join(TAIL_FILES)}")
+ if hasattr(signal, 'SIGUSR1'):
+  signal.signal(signal.SIGUSR1, dump_events)
+  print(f"  Events:   kill -USR1 {os.getpid()} dumps the last {_events.maxlen} to {LOG_DUMP or 'stderr'}")
+ print()
+ if perform_handshake():
+  print('Starting heartbeat loop (Ctrl+C to stop)...')
+  print()
+  if ADAPTIVE:
+   run_adaptive()
+  while True:
+   if beat_due():
+    send_heartbeat()
+   else:
+    collect_sample()
+   time.sleep(INTERVAL)
+ else:
+  print('Fatal: Initial handshake failed. Exiting.')
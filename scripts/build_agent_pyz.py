@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Build the ClawTrace agent as a single-file zipapp (.pyz)
+
+The archive contains the canonical clawtrace-agent.py as __main__.py plus
+__main__.pyc precompiled by the building interpreter. The .pyc uses an
+unchecked hash, so zipimport loads it without any source timestamp check.
+On an interpreter with a different bytecode magic, zipimport ignores the
+.pyc and falls back to the source.
+
+The .pyz is a packaging format: one file to copy, with a slightly lower
+peak RSS than the .py (about 14.6MB against 16.3MB here). It is not a
+faster start. Skipping compilation saves time, but Python runs every
+zipapp through runpy, which loads 8 modules the .py does not need (72
+against 64). Measured medians put the two within a few ms of each other,
+in either direction.
+
+Usage:
+    python3 scripts/build_agent_pyz.py                       # -> dist/clawtrace-agent.pyz
+    python3 scripts/build_agent_pyz.py -o /tmp/agent.pyz --compress
+    python3 dist/clawtrace-agent.pyz selftest --startup
+"""
+
+import argparse
+import importlib.util
+import marshal
+import os
+import sys
+import zipfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+AGENT_SOURCE = ROOT / "clawtrace-agent.py"
+DEFAULT_OUTPUT = ROOT / "dist" / "clawtrace-agent.pyz"
+SHEBANG = b"#!/usr/bin/env python3\n"
+
+
+def compile_unchecked_pyc(source, filename):
+    """Return .pyc bytes for ``source`` with PEP 552 unchecked-hash validation."""
+    code = compile(source, filename, "exec", dont_inherit=True, optimize=0)
+    source_hash = importlib.util.source_hash(source)
+    flags = (0b01).to_bytes(4, "little")  # hash-based, check_source = 0
+    return importlib.util.MAGIC_NUMBER + flags + source_hash + marshal.dumps(code)
+
+
+def build(source_path=AGENT_SOURCE, output=DEFAULT_OUTPUT, compress=False):
+    """Write the zipapp and return its size in bytes."""
+    source = Path(source_path).read_bytes()
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    method = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+
+    tmp = output.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        f.write(SHEBANG)
+        with zipfile.ZipFile(f, "w", compression=method) as zf:
+            zf.writestr("__main__.py", source)
+            zf.writestr("__main__.pyc", compile_unchecked_pyc(source, "__main__.py"))
+    os.chmod(tmp, 0o755)
+    os.replace(tmp, output)
+    return output.stat().st_size
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the ClawTrace agent zipapp")
+    parser.add_argument("--source", default=str(AGENT_SOURCE), help="Agent source file")
+    parser.add_argument("--output", "-o", default=str(DEFAULT_OUTPUT), help="Output .pyz path")
+    parser.add_argument("--compress", action="store_true", help="Deflate archive members (smaller, slightly slower start)")
+    args = parser.parse_args()
+
+    size = build(args.source, args.output, args.compress)
+    print(f"Built {args.output} ({size:,} bytes, Python {sys.version_info.major}.{sys.version_info.minor} bytecode)")
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Generate lib/scripts/install-agent*.py from the canonical clawtrace-agent.py
+
+The install route serves these files after replacing the {{AGENT_ID}},
+{{BASE_URL}}, {{AGENT_SECRET}} and {{INTERVAL}} placeholders, so every fix to
+the agent reaches newly installed agents without a hand-maintained copy.
+
+For each target the generator:
+  * injects the placeholders in place of the CLAWTRACE_SAAS_URL, _AGENT_ID,
+    _AGENT_SECRET and _INTERVAL environment lookups (an empty baked secret
+    still falls back to CLAWTRACE_AGENT_SECRET)
+  * for a per-OS target, drops the other platforms' _cpu_/_mem_/_uptime_
+    collectors and binds the remaining ones directly instead of via _for_os
+  * minifies: docstrings and comments are removed, the code is re-emitted
+    from the AST and indented with one space per level
+
+Usage:
+    python3 scripts/gen_install_agent.py            # rewrite lib/scripts/install-agent*.py
+    python3 scripts/gen_install_agent.py --check    # exit 1 if any file is stale (CI)
+"""
+
+import argparse
+import ast
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+AGENT_SOURCE = ROOT / "clawtrace-agent.py"
+OUTPUT_DIR = ROOT / "lib" / "scripts"
+# target -> platform.system() value; None is the generic all-platform script
+TARGETS = {None: None, "linux": "Linux", "darwin": "Darwin", "windows": "Windows"}
+COLLECTOR_PREFIXES = ("_cpu_", "_mem_", "_uptime_")
+PLATFORM_SUFFIXES = {"Linux": "linux", "Darwin": "darwin", "Windows": "windows"}
+
+
+def output_path(target):
+    return OUTPUT_DIR / (f"install-agent.{target}.py" if target else "install-agent.py")
+
+
+def _env_get(name, default=None):
+    """AST for os.environ.get(name[, default])."""
+    args = [ast.Constant(name)] + ([ast.Constant(default)] if default is not None else [])
+    func = ast.Attribute(ast.Attribute(ast.Name("os", ast.Load()), "environ", ast.Load()), "get", ast.Load())
+    return ast.Call(func, args, [])
+
+
+# Values baked in by the install route; the baked secret may be empty when the
+# user prefers to pass it at runtime, so that one keeps its env fallback.
+INJECTED = {
+    "SAAS_URL": lambda: ast.Constant("{{BASE_URL}}"),
+    "AGENT_ID": lambda: ast.Constant("{{AGENT_ID}}"),
+    "AGENT_SECRET": lambda: ast.BoolOp(ast.Or(), [ast.Constant("{{AGENT_SECRET}}"),
+                                                   _env_get("CLAWTRACE_AGENT_SECRET", "")]),
+    "INTERVAL": lambda: ast.Call(ast.Name("int", ast.Load()), [ast.Constant("{{INTERVAL}}")], []),
+}
+
+
+class InstallTransformer(ast.NodeTransformer):
+    """Inject install-time constants and strip code the target never runs."""
+
+    def __init__(self, os_name=None):
+        self.os_name = os_name
+        self.injected = set()
+
+    def visit_Assign(self, node):
+        target = node.targets[0]
+        if isinstance(target, ast.Name) and target.id in INJECTED and target.id not in self.injected:
+            self.injected.add(target.id)
+            node.value = INJECTED[target.id]()
+            return node
+        if self.os_name and isinstance(node.value, ast.Call) and getattr(node.value.func, "id", None) == "_for_os":
+            # _for_os(linux, darwin, windows) -> the one implementation this target needs
+            index = list(PLATFORM_SUFFIXES).index(self.os_name)
+            node.value = node.value.args[index]
+        return self.generic_visit(node)
+
+    def visit_FunctionDef(self, node):
+        if self.os_name:
+            if node.name == "_for_os":
+                return None
+            if node.name.startswith(COLLECTOR_PREFIXES) and not node.name.endswith("_" + PLATFORM_SUFFIXES[self.os_name]):
+                return None
+        return self.generic_visit(node)
+
+
+def strip_docstrings(tree):
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+            body = node.body
+            if body and isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant) \
+                    and isinstance(body[0].value.value, str):
+                node.body = body[1:] or [ast.Pass()]
+    return tree
+
+
+def reindent(code):
+    """Shrink ast.unparse's 4-space indentation to one space per level.
+
+    ast.unparse never emits a literal spanning lines, so every leading run of
+    spaces is indentation.
+    """
+    lines = []
+    for line in code.splitlines():
+        body = line.lstrip(" ")
+        lines.append(" " * ((len(line) - len(body)) // 4) + body)
+    return "\n".join(lines)
+
+
+def generate(target=None, source=None):
+    """Return the install script text for ``target`` (None, linux, darwin or windows)."""
+    source = source if source is not None else AGENT_SOURCE.read_text()
+    tree = ast.parse(source)
+    transformer = InstallTransformer(TARGETS[target])
+    tree = strip_docstrings(transformer.visit(tree))
+    missing = set(INJECTED) - transformer.injected
+    if missing:
+        raise SystemExit(f"clawtrace-agent.py no longer assigns {', '.join(sorted(missing))}")
+    ast.fix_missing_locations(tree)
+    header = [
+        "#!/usr/bin/env python3",
+        f'"""ClawTrace Agent - {"Cross-platform" if not target else TARGETS[target]} Heartbeat Agent"""',
+        "# Agent: {{AGENT_ID}}",
+        "# Run: python3 clawtrace-agent.py",
+        "# Generated from clawtrace-agent.py by scripts/gen_install_agent.py. Do not edit.",
+    ]
+    code = reindent(ast.unparse(tree))
+    if ast.dump(ast.parse(code)) != ast.dump(ast.parse(ast.unparse(tree))):
+        raise SystemExit("re-indented output does not match the transformed agent")
+    return "\n".join(header) + "\n" + code + "\n"
+
+
+if __name__ == "__main__":
+    if sys.version_info < (3, 9):
+        sys.exit("gen_install_agent.py needs Python 3.9+ (ast.unparse)")
+    parser = argparse.ArgumentParser(description="Generate install-agent scripts from clawtrace-agent.py")
+    parser.add_argument("--check", action="store_true", help="Fail if a generated file is out of date")
+    args = parser.parse_args()
+
+    source = AGENT_SOURCE.read_text()
+    stale = []
+    for target in TARGETS:
+        path = output_path(target)
+        text = generate(target, source)
+        if args.check:
+            if not path.exists() or path.read_text() != text:
+                stale.append(path)
+            continue
+        path.write_text(text)
+        print(f"Wrote {path.relative_to(ROOT)} ({len(text.encode()):,} bytes)")
+    for path in stale:
+        print(f"STALE {path.relative_to(ROOT)}: run python3 scripts/gen_install_agent.py")
+    sys.exit(1 if stale else 0)
@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+ClawTrace Metrics Rollup - fleet analytics over agent_metrics exports
+
+Streams agent_metrics rows from a SQLite/libSQL file (turso-schema.sql layout,
+or an agent's local history) or from a CSV export. Rows are read in chunks
+into compact typed columns, so millions of rows fit in tens of megabytes.
+The tool then computes:
+
+    agents    per-agent sample count, mean, percentiles and max of each metric
+    fleet     the same over every row, plus the number of agents
+    buckets   time-bucketed means, fleet-wide ('*') and per agent
+    outliers  agents whose mean is far from the fleet (robust z-score on
+              median/MAD of the per-agent means)
+
+NumPy is used for the heavy lifting when it is installed. The pure-Python
+fallback gives the same numbers (linear-interpolated percentiles, like
+numpy.percentile), only slower. Tables are written as CSV, or as Parquet
+when pyarrow is installed.
+
+Usage:
+    python3 scripts/metrics_rollup.py --db turso-dump.db --out rollup/
+    python3 scripts/metrics_rollup.py --csv agent_metrics.csv --bucket 15m --since 2026-10-01 --format parquet
+    python3 scripts/metrics_rollup.py --db ~/.clawtrace/history.db --table agent_metrics_1m --json
+"""
+
+import argparse
+import calendar
+import csv
+import json
+import math
+import sqlite3
+import sys
+import time
+from array import array
+from pathlib import Path
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+METRICS = ("cpu_usage", "memory_usage", "latency_ms", "errors_count")
+DEFAULT_PERCENTILES = (50, 90, 99)
+BUCKET_UNITS = {"m": 60, "h": 3600, "d": 86400}
+
+
+# ============ INPUT ============
+def read_sqlite(path, table="agent_metrics", since=None, until=None, agent_id=None, chunk_size=100000):
+    """Yield lists of (agent_id, created_at, *METRICS) rows from a SQLite/libSQL file."""
+    db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    cols = ", ".join(f"CAST(COALESCE({c}, 0) AS INTEGER)" for c in METRICS)
+    sql, args = f"SELECT agent_id, created_at, {cols} FROM {table} WHERE created_at >= ?", [since or ""]
+    if until:
+        sql += " AND created_at < ?"
+        args.append(until)
+    if agent_id:
+        sql += " AND agent_id = ?"
+        args.append(agent_id)
+    try:
+        cur = db.execute(sql, args)
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        db.close()
+
+
+def _int(value):
+    try:
+        return int(value)
+    except ValueError:
+        return int(float(value)) if value else 0
+
+
+def read_csv(path, since=None, until=None, agent_id=None, chunk_size=100000):
+    """Yield row chunks like read_sqlite() from a CSV export with a header row."""
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        try:
+            a, t = header.index("agent_id"), header.index("created_at")
+        except ValueError:
+            raise SystemExit(f"{path}: CSV needs agent_id and created_at columns")
+        idx = [header.index(c) if c in header else None for c in METRICS]
+        chunk = []
+        for rec in reader:
+            if not rec:
+                continue
+            ts = rec[t]
+            if (since and ts < since) or (until and ts >= until) or (agent_id and rec[a] != agent_id):
+                continue
+            chunk.append((rec[a], ts, *(_int(rec[i]) if i is not None else 0 for i in idx)))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+# ============ COLUMNAR ACCUMULATION ============
+class Columns:
+    """Typed column buffers for a stream of agent_metrics rows.
+
+    Agent ids are dictionary-encoded and timestamps are kept as epoch minutes.
+    Both ``datetime('now')`` and ISO ``...T...Z`` spellings parse, with one
+    strptime per distinct day.
+    """
+
+    def __init__(self):
+        self.agents = []
+        self.agent_codes = {}
+        self.codes = array("q")
+        self.minutes = array("q")
+        self.values = {m: array("q") for m in METRICS}
+        self._day_cache = {}
+
+    def __len__(self):
+        return len(self.codes)
+
+    def minute(self, created_at):
+        day = self._day_cache.get(created_at[:10])
+        if day is None:
+            day = self._day_cache[created_at[:10]] = calendar.timegm(time.strptime(created_at[:10], "%Y-%m-%d")) // 60
+        return day + int(created_at[11:13]) * 60 + int(created_at[14:16])
+
+    def extend(self, rows):
+        codes, minute, agent_codes = [], self.minute, self.agent_codes
+        for row in rows:
+            code = agent_codes.get(row[0])
+            if code is None:
+                code = agent_codes[row[0]] = len(self.agents)
+                self.agents.append(row[0])
+            codes.append(code)
+        self.codes.extend(codes)
+        self.minutes.extend(minute(row[1]) for row in rows)
+        for i, m in enumerate(METRICS, start=2):
+            self.values[m].extend(row[i] for row in rows)
+
+
+# ============ STATISTICS ============
+def _interp(sorted_vals, lo, n, q):
+    """Linear-interpolated q-th percentile of sorted_vals[lo:lo+n] (numpy's default method)."""
+    pos = lo + q / 100 * (n - 1)
+    i = int(pos)
+    j = min(i + 1, lo + n - 1)
+    return sorted_vals[i] + (sorted_vals[j] - sorted_vals[i]) * (pos - i)
+
+
+def agent_stats(cols, percentiles):
+    """{metric: {"mean": [...], "pN": [...], "max": [...]}} indexed by agent code, plus counts."""
+    n_agents = len(cols.agents)
+    out = {}
+    if np is not None:
+        codes = np.frombuffer(cols.codes, dtype=np.int64)
+        counts = np.bincount(codes, minlength=n_agents)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        for m in METRICS:
+            vals = np.frombuffer(cols.values[m], dtype=np.int64).astype(np.float64)
+            order = np.lexsort((vals, codes))
+            sv = vals[order]
+            stats = {"mean": np.bincount(codes, weights=vals, minlength=n_agents) / counts}
+            for q in percentiles:
+                pos = starts + q / 100 * (counts - 1)
+                i = np.floor(pos).astype(np.int64)
+                j = np.minimum(i + 1, starts + counts - 1)
+                stats[f"p{q}"] = sv[i] + (sv[j] - sv[i]) * (pos - i)
+            stats["max"] = sv[starts + counts - 1].astype(np.int64)
+            out[m] = {k: v.tolist() for k, v in stats.items()}
+        return counts.tolist(), out
+
+    counts = [0] * n_agents
+    for c in cols.codes:
+        counts[c] += 1
+    for m in METRICS:
+        groups = [[] for _ in range(n_agents)]
+        for c, v in zip(cols.codes, cols.values[m]):
+            groups[c].append(v)
+        stats = {"mean": [], **{f"p{q}": [] for q in percentiles}, "max": []}
+        for g in groups:
+            g.sort()
+            stats["mean"].append(sum(g) / len(g))
+            for q in percentiles:
+                stats[f"p{q}"].append(_interp(g, 0, len(g), q))
+            stats["max"].append(g[-1])
+        out[m] = stats
+    return counts, out
+
+
+def fleet_stats(cols, percentiles):
+    """{metric: {"mean", "pN", "max"}} over every row."""
+    out = {}
+    for m in METRICS:
+        if np is not None:
+            vals = np.frombuffer(cols.values[m], dtype=np.int64)
+            stats = {"mean": float(vals.mean()), "max": int(vals.max())}
+            for q, v in zip(percentiles, np.percentile(vals, percentiles)):
+                stats[f"p{q}"] = float(v)
+        else:
+            vals = sorted(cols.values[m])
+            stats = {"mean": sum(vals) / len(vals), "max": vals[-1]}
+            for q in percentiles:
+                stats[f"p{q}"] = _interp(vals, 0, len(vals), q)
+        out[m] = stats
+    return out
+
+
+def bucket_means(cols, bucket_s, per_agent=True):
+    """Time-bucketed means as columns, ordered by (bucket, agent).
+
+    Returns (bucket_start_epochs, agent_codes, samples, {metric: means}); the
+    fleet-wide row of each bucket has agent code -1.
+    """
+    step = bucket_s // 60
+    if np is not None:
+        codes = np.frombuffer(cols.codes, dtype=np.int64)
+        buckets = np.frombuffer(cols.minutes, dtype=np.int64) // step
+        scope = np.full_like(codes, -1)
+        if per_agent:
+            buckets, scope = np.concatenate((buckets, buckets)), np.concatenate((scope, codes))
+        # One int64 key per (bucket, agent) so a 1-D unique does the grouping
+        width = len(cols.agents) + 1
+        keys, inverse, counts = np.unique(buckets * width + scope + 1, return_inverse=True, return_counts=True)
+        means = {}
+        for m in METRICS:
+            vals = np.frombuffer(cols.values[m], dtype=np.int64)
+            if per_agent:
+                vals = np.concatenate((vals, vals))
+            means[m] = (np.bincount(inverse, weights=vals, minlength=len(keys)) / counts).tolist()
+        return ((keys // width * bucket_s).tolist(), (keys % width - 1).tolist(), counts.tolist(), means)
+
+    acc = {}
+    columns = [cols.values[m] for m in METRICS]
+    for idx, (code, minute) in enumerate(zip(cols.codes, cols.minutes)):
+        b = minute // step
+        for key in ((b, -1), (b, code)) if per_agent else ((b, -1),):
+            slot = acc.get(key)
+            if slot is None:
+                slot = acc[key] = [0] * (len(METRICS) + 1)
+            slot[0] += 1
+            for i, column in enumerate(columns, start=1):
+                slot[i] += column[idx]
+    keys = sorted(acc)
+    means = {m: [acc[k][i] / acc[k][0] for k in keys] for i, m in enumerate(METRICS, start=1)}
+    return [b * bucket_s for b, _ in keys], [c for _, c in keys], [acc[k][0] for k in keys], means
+
+
+def find_outliers(agent_means, counts, threshold=3.5, min_samples=10):
+    """Flag agents whose per-metric mean has a modified z-score above ``threshold``.
+
+    Uses 0.6745 * (x - median) / MAD (Iglewicz and Hoaglin), falling back to
+    the mean absolute deviation when more than half the agents share a value.
+    Returns [(agent_code, metric, mean, fleet_median, z)], most extreme first.
+    """
+    eligible = [i for i, n in enumerate(counts) if n >= min_samples]
+    flagged = []
+    for m, means in agent_means.items():
+        xs = sorted(means[i] for i in eligible)
+        if len(xs) < 3:
+            continue
+        median = _interp(xs, 0, len(xs), 50)
+        deviations = sorted(abs(x - median) for x in xs)
+        mad = _interp(deviations, 0, len(deviations), 50)
+        scale = mad / 0.6745 if mad else 1.253314 * sum(deviations) / len(deviations)
+        if not scale:
+            continue
+        for i in eligible:
+            z = (means[i] - median) / scale
+            if abs(z) > threshold:
+                flagged.append((i, m, means[i], median, z))
+    return sorted(flagged, key=lambda f: -abs(f[4]))
+
+
+# ============ OUTPUT ============
+def _iso(epoch):
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(epoch))
+
+
+def _r(x):
+    return round(x, 3) if isinstance(x, float) and math.isfinite(x) else x
+
+
+def build_tables(cols, percentiles, bucket_s, per_agent_buckets, outlier_z, min_samples):
+    """Compute every rollup and return {table_name: {column: [values]}}."""
+    counts, per_agent = agent_stats(cols, percentiles)
+    stat_names = ["mean"] + [f"p{q}" for q in percentiles] + ["max"]
+
+    agents = {"agent_id": cols.agents, "samples": counts}
+    for m in METRICS:
+        for s in stat_names:
+            agents[f"{m}_{s}"] = [_r(v) for v in per_agent[m][s]]
+
+    fleet_rows = fleet_stats(cols, percentiles)
+    fleet = {"metric": list(METRICS), "samples": [len(cols)] * len(METRICS), "agents": [len(cols.agents)] * len(METRICS)}
+    for s in stat_names:
+        fleet[s] = [_r(fleet_rows[m][s]) for m in METRICS]
+
+    starts, codes, samples, means = bucket_means(cols, bucket_s, per_agent_buckets)
+    buckets = {"bucket_start": [_iso(b) for b in starts],
+               "agent_id": [cols.agents[c] if c >= 0 else "*" for c in codes],
+               "samples": samples}
+    for m in METRICS:
+        buckets[f"{m}_mean"] = [_r(v) for v in means[m]]
+
+    flagged = find_outliers({m: per_agent[m]["mean"] for m in METRICS}, counts, outlier_z, min_samples)
+    outliers = {"agent_id": [cols.agents[i] for i, *_ in flagged], "metric": [f[1] for f in flagged],
+                "agent_mean": [_r(f[2]) for f in flagged], "fleet_median": [_r(f[3]) for f in flagged],
+                "robust_z": [round(f[4], 2) for f in flagged]}
+    return {"agents": agents, "fleet": fleet, "buckets": buckets, "outliers": outliers}
+
+
+def write_tables(tables, out_dir, fmt="csv"):
+    """Write each table as <name>.csv or <name>.parquet; return the written paths."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    if fmt == "parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("--format parquet needs pyarrow (pip install pyarrow); use --format csv instead")
+    paths = []
+    for name, columns in tables.items():
+        path = out_dir / f"{name}.{fmt}"
+        if fmt == "parquet":
+            pq.write_table(pa.table(columns), path)
+        else:
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(columns)
+                writer.writerows(zip(*columns.values()))
+        paths.append(path)
+    return paths
+
+
+def parse_bucket(text):
+    try:
+        seconds = int(text[:-1]) * BUCKET_UNITS[text[-1]]
+    except (KeyError, ValueError):
+        raise argparse.ArgumentTypeError(f"bucket must look like 5m, 1h or 1d, not {text!r}")
+    if seconds <= 0:
+        raise argparse.ArgumentTypeError("bucket must be positive")
+    return seconds
+
+
+def format_summary(tables, rows, elapsed, top=10):
+    fleet = tables["fleet"]
+    stat_cols = [c for c in fleet if c not in ("metric", "samples", "agents")]
+    lines = ["## Metrics Rollup",
+             f"Rows: {rows:,} | Agents: {fleet['agents'][0] if fleet['agents'] else 0:,} | "
+             f"Backend: {'numpy' if np is not None else 'python'} | {elapsed:.2f}s", ""]
+    lines.append(f"{'metric':<16}" + "".join(f"{c:>10}" for c in stat_cols))
+    for i, m in enumerate(fleet["metric"]):
+        lines.append(f"{m:<16}" + "".join(f"{fleet[c][i]:>10}" for c in stat_cols))
+    outliers = tables["outliers"]
+    if outliers["agent_id"]:
+        lines += ["", f"Outliers (top {min(top, len(outliers['agent_id']))} of {len(outliers['agent_id'])}):"]
+        for i in range(min(top, len(outliers["agent_id"]))):
+            lines.append(f"  {outliers['agent_id'][i]:<38}{outliers['metric'][i]:<14}mean {outliers['agent_mean'][i]:>9}"
+                         f"  fleet median {outliers['fleet_median'][i]:>9}  z {outliers['robust_z'][i]:>+7}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-agent and fleet rollups over agent_metrics exports")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--db", help="SQLite/libSQL file with an agent_metrics table")
+    source.add_argument("--csv", help="CSV export of agent_metrics (header row required)")
+    parser.add_argument("--table", default="agent_metrics", help="Table to read with --db (default: agent_metrics)")
+    parser.add_argument("--since", help="Only rows with created_at >= this (ISO, e.g. 2026-10-01)")
+    parser.add_argument("--until", help="Only rows with created_at < this")
+    parser.add_argument("--agent", help="Only this agent_id")
+    parser.add_argument("--bucket", type=parse_bucket, default=3600, help="Time bucket: 5m, 1h, 1d (default: 1h)")
+    parser.add_argument("--fleet-buckets-only", action="store_true", help="Skip per-agent time buckets")
+    parser.add_argument("--percentiles", default=",".join(map(str, DEFAULT_PERCENTILES)), help="Comma-separated (default: 50,90,99)")
+    parser.add_argument("--outlier-z", type=float, default=3.5, help="Robust z-score that flags an agent (default: 3.5)")
+    parser.add_argument("--min-samples", type=int, default=10, help="Agents with fewer rows are never outliers")
+    parser.add_argument("--chunk-size", type=int, default=100000, help="Rows read per chunk")
+    parser.add_argument("--out", help="Directory for agents/fleet/buckets/outliers tables")
+    parser.add_argument("--format", choices=("csv", "parquet"), default="csv", help="Table format for --out")
+    parser.add_argument("--json", action="store_true", help="Print fleet and outlier tables as JSON")
+    args = parser.parse_args()
+
+    percentiles = [int(p) for p in args.percentiles.split(",") if p.strip()]
+    if any(not 0 <= p <= 100 for p in percentiles):
+        parser.error("percentiles must be between 0 and 100")
+
+    t0 = time.perf_counter()
+    chunks = (read_sqlite(args.db, args.table, args.since, args.until, args.agent, args.chunk_size) if args.db
+              else read_csv(args.csv, args.since, args.until, args.agent, args.chunk_size))
+    cols = Columns()
+    for chunk in chunks:
+        cols.extend(chunk)
+    if not len(cols):
+        sys.exit("No agent_metrics rows matched")
+
+    tables = build_tables(cols, percentiles, args.bucket, not args.fleet_buckets_only, args.outlier_z, args.min_samples)
+    elapsed = time.perf_counter() - t0
+
+    if args.out:
+        for path in write_tables(tables, args.out, args.format):
+            print(f"Wrote {path}", file=sys.stderr)
+    if args.json:
+        print(json.dumps({"rows": len(cols), "fleet": tables["fleet"], "outliers": tables["outliers"]}, indent=2))
+    else:
+        print(format_summary(tables, len(cols), elapsed))
@@ -0,0 +1,64 @@
+import { createClient } from '@libsql/client';
+import dotenv from 'dotenv';
+
+dotenv.config();
+
+// Usage: node scripts/set-agent-config.js '{"version":"2026-10-19.2","sampling_rate":0.5}'
+//        node scripts/set-agent-config.js --show
+//        node scripts/set-agent-config.js --clear
+// Every heartbeat server picks a change up within lib/agent-config.js CONFIG_TTL_MS.
+
+const url = process.env.TURSO_DATABASE_URL;
+const authToken = process.env.TURSO_AUTH_TOKEN;
+
+if (!url) {
+  console.error('TURSO_DATABASE_URL is not defined');
+  process.exit(1);
+}
+
+const turso = createClient({ url, authToken });
+const arg = process.argv[2];
+
+async function main() {
+  await turso.execute(`
+    CREATE TABLE IF NOT EXISTS agent_config (
+      key TEXT PRIMARY KEY,
+      directives TEXT NOT NULL,
+      updated_at TEXT DEFAULT (datetime('now'))
+    )
+  `);
+
+  if (!arg || arg === '--show') {
+    const res = await turso.execute({ sql: "SELECT directives, updated_at FROM agent_config WHERE key = 'fleet'", args: [] });
+    console.log(res.rows[0] ? `${res.rows[0].directives} (updated ${res.rows[0].updated_at})` : 'No directives set');
+    return;
+  }
+  if (arg === '--clear') {
+    await turso.execute({ sql: "DELETE FROM agent_config WHERE key = 'fleet'", args: [] });
+    console.log('Directives cleared');
+    return;
+  }
+
+  let directives;
+  try {
+    directives = JSON.parse(arg);
+  } catch (e) {
+    console.error('Directives must be a JSON object:', e.message);
+    process.exit(1);
+  }
+  if (!directives || typeof directives !== 'object' || !directives.version) {
+    console.error('Directives need a "version" (agents re-apply only when it changes)');
+    process.exit(1);
+  }
+  await turso.execute({
+    sql: `INSERT INTO agent_config (key, directives, updated_at) VALUES ('fleet', ?, datetime('now'))
+          ON CONFLICT(key) DO UPDATE SET directives = excluded.directives, updated_at = excluded.updated_at`,
+    args: [JSON.stringify(directives)],
+  });
+  console.log(`Directives v${directives.version} stored`);
+}
+
+main().catch((e) => {
+  console.error('Failed:', e.message);
+  process.exit(1);
+});
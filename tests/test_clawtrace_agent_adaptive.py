@@ -0,0 +1,97 @@
+"""Adaptive heartbeat cadence: change detection, MIN_SPACING and MAX_SILENCE."""
+
+import importlib.util
+import unittest
+from pathlib import Path
+from unittest import mock
+
+AGENT = Path(__file__).resolve().parent.parent / "clawtrace-agent.py"
+
+
+def load_agent():
+    spec = importlib.util.spec_from_file_location("clawtrace_agent_under_test", AGENT)
+    agent = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(agent)
+    return agent
+
+
+class ChangeDetectorTest(unittest.TestCase):
+    def setUp(self):
+        self.agent = load_agent()
+
+    def test_fires_on_a_jump_beyond_z_threshold(self):
+        detector = self.agent.ChangeDetector(z_threshold=3.0, warmup=5)
+        for cpu in [20, 22, 19, 21, 20, 22, 18, 21, 20, 19]:
+            self.assertEqual(detector.update({"cpu_usage": cpu, "memory_usage": 40}), [])
+        self.assertEqual(detector.update({"cpu_usage": 70, "memory_usage": 40}), ["cpu_usage"])
+
+    def test_noisy_metric_needs_a_proportionally_larger_jump(self):
+        detector = self.agent.ChangeDetector(z_threshold=3.0, warmup=5)
+        for i in range(30):
+            detector.update({"cpu_usage": 20 if i % 2 else 60})  # std dev around 20
+        self.assertEqual(detector.update({"cpu_usage": 55}), [])  # 15 away: past min_delta, under 3 sigma
+        self.assertEqual(detector.update({"cpu_usage": 100}), ["cpu_usage"])
+
+    def test_min_delta_ignores_tiny_moves_on_flat_metrics(self):
+        detector = self.agent.ChangeDetector(warmup=2)
+        for _ in range(5):
+            detector.update({"cpu_usage": 3})
+        self.assertEqual(detector.update({"cpu_usage": 4}), [])  # infinite z-score, but below MIN_DELTA
+        self.assertEqual(detector.update({"cpu_usage": 20}), ["cpu_usage"])
+
+    def test_no_trigger_during_warmup(self):
+        detector = self.agent.ChangeDetector(warmup=5)
+        detector.update({"cpu_usage": 5})
+        self.assertEqual(detector.update({"cpu_usage": 95}), [])
+
+
+class _Stop(Exception):
+    pass
+
+
+class RunAdaptiveTest(unittest.TestCase):
+    """Drive run_adaptive() on a fake clock, with scripted samples and no network."""
+
+    def setUp(self):
+        self.agent = load_agent()
+        self.agent.SAMPLE_INTERVAL, self.agent.MIN_SPACING, self.agent.MAX_SILENCE = 5, 10, 60
+        self.agent.SAMPLING_RATE = 1.0
+        self.clock = 0.0
+        self.sent = []
+
+    def run_until(self, end, cpu_at):
+        def collect_sample():
+            if self.clock >= end:
+                raise _Stop
+            return {"status": "healthy", "metrics": {"cpu_usage": cpu_at(self.clock), "memory_usage": 40}}
+
+        def send_heartbeat(sample, trigger):
+            self.sent.append((self.clock, trigger))
+            return True
+
+        def sleep(seconds):
+            self.clock += seconds
+
+        with mock.patch.object(self.agent, "collect_sample", collect_sample), \
+                mock.patch.object(self.agent, "send_heartbeat", send_heartbeat), \
+                mock.patch.object(self.agent.time, "monotonic", lambda: self.clock), \
+                mock.patch.object(self.agent.time, "sleep", sleep):
+            with self.assertRaises(_Stop):
+                self.agent.run_adaptive()
+
+    def test_steady_host_only_sends_keepalives_every_max_silence(self):
+        self.run_until(200, lambda t: 20)
+        self.assertEqual(self.sent, [(0, "status"), (60, "keepalive"), (120, "keepalive"), (180, "keepalive")])
+
+    def test_change_right_after_a_beat_waits_for_min_spacing(self):
+        self.run_until(100, lambda t: 90 if t >= 65 else 20)
+        # The jump is seen at t=65, 5s after the keepalive, so it goes out at 70
+        self.assertEqual(self.sent, [(0, "status"), (60, "keepalive"), (70, "change:cpu_usage")])
+
+    def test_change_is_sent_immediately_when_spaced_out(self):
+        self.run_until(60, lambda t: 90 if t >= 40 else 20)
+        self.assertEqual(self.sent, [(0, "status"), (40, "change:cpu_usage")])
+
+
+if __name__ == "__main__":
+    unittest.main()
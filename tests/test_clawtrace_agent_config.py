@@ -0,0 +1,60 @@
+"""Server-pushed config directives are applied all-or-nothing."""
+
+import contextlib
+import importlib.util
+import io
+import unittest
+from pathlib import Path
+
+AGENT = Path(__file__).resolve().parent.parent / "clawtrace-agent.py"
+
+
+def load_agent():
+    spec = importlib.util.spec_from_file_location("clawtrace_agent_under_test", AGENT)
+    agent = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(agent)
+    return agent
+
+
+class ApplyConfigTest(unittest.TestCase):
+    def setUp(self):
+        self.agent = load_agent()
+        self.agent.LOG_RATE = 0
+
+    def apply(self, config):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return self.agent.apply_config(config)
+
+    def state(self):
+        a = self.agent
+        return a.INTERVAL, a.COLLECTORS, a.SAMPLING_RATE, a.HISTORY_BATCH, a.CONFIG_VERSION
+
+    def test_valid_config_is_applied_and_acknowledged(self):
+        self.assertTrue(self.apply({"version": "v1", "interval": 600, "collectors": ["cpu", "bogus"],
+                                    "sampling_rate": 0.5, "batch_size": 20}))
+        self.assertEqual(self.state(), (600, {"cpu"}, 0.5, 20, "v1"))
+
+    def test_invalid_directive_leaves_everything_unchanged(self):
+        self.apply({"version": "v1", "interval": 60})
+        before = self.state()
+        for bad in ({"interval": "soon"}, {"interval": 5}, {"sampling_rate": "half"},
+                    {"sampling_rate": 1.5}, {"collectors": "cpu"}, {"collectors": [{"cpu": 1}]},
+                    {"batch_size": 0}):
+            with self.subTest(bad=bad):
+                # The valid directives come first, so a one-by-one apply would change them
+                config = {"version": "v2", "collectors": ["mem"], "batch_size": 7, "interval": 120, **bad}
+                self.assertFalse(self.apply(config))
+                self.assertEqual(self.state(), before)
+
+    def test_resent_rejected_config_is_logged_once(self):
+        bad = {"version": "v3", "sampling_rate": "abc"}
+        for _ in range(5):  # the server resends it on every beat until acknowledged
+            self.assertFalse(self.apply(bad))
+        self.assertFalse(self.apply({"version": "v4", "interval": 1}))
+        self.assertFalse(self.apply(bad))  # a different bad version in between logs again
+        rejected = [f["version"] for _, _, e, _, f in self.agent._events if e == "config.rejected"]
+        self.assertEqual(rejected, ["v3", "v4", "v3"])
+
+
+if __name__ == "__main__":
+    unittest.main()
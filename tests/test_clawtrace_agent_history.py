@@ -0,0 +1,84 @@
+"""Local metric history: raw samples and the 1m/1h rollup tiers."""
+
+import importlib.util
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+AGENT = Path(__file__).resolve().parent.parent / "clawtrace-agent.py"
+
+
+def load_agent():
+    spec = importlib.util.spec_from_file_location("clawtrace_agent_under_test", AGENT)
+    agent = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(agent)
+    return agent
+
+
+class MetricHistoryTest(unittest.TestCase):
+    def setUp(self):
+        self.agent = load_agent()
+        self._tmp = tempfile.TemporaryDirectory()
+        self.history = self.agent.MetricHistory(str(Path(self._tmp.name) / "history.db"), batch_size=100)
+        # Start of the previous hour: inside every retention window
+        self.hour = (int(time.time()) // 3600 - 1) * 3600
+
+    def tearDown(self):
+        self.history.db.close()
+        self._tmp.cleanup()
+
+    def record(self, offset, **metrics):
+        self.history.record("agent-1", metrics, self.hour + offset)
+
+    def test_minute_rollup_sums_counters_and_averages_gauges(self):
+        # Four 15s samples in one minute, one of them with an error
+        for i, (cpu, errors) in enumerate([(10, 0), (20, 0), (30, 1), (40, 0)]):
+            self.record(i * 15, cpu_usage=cpu, memory_usage=50, errors_count=errors, tasks_completed=2)
+        self.history.flush()
+
+        (minute,) = self.history.query("1m")
+        self.assertEqual(minute["samples"], 4)
+        self.assertEqual(minute["cpu_usage"], 25)
+        self.assertEqual(minute["memory_usage"], 50)
+        self.assertEqual(minute["errors_count"], 1)  # a mean would round this to 0
+        self.assertEqual(minute["tasks_completed"], 8)
+        self.assertEqual(minute["created_at"], time.strftime("%Y-%m-%dT%H:%M:00Z", time.gmtime(self.hour)))
+
+    def test_hour_rollup_weights_gauges_by_sample_count(self):
+        for i in range(4):  # minute 0: four samples at 10% CPU, 1 error each
+            self.record(i * 15, cpu_usage=10, latency_ms=100, errors_count=1, tasks_completed=1)
+        self.record(300, cpu_usage=60, latency_ms=600, errors_count=3, tasks_completed=5)  # minute 5: one sample
+        self.history.flush()
+
+        minutes = self.history.query("1m")
+        self.assertEqual([m["samples"] for m in minutes], [4, 1])
+        (hour,) = self.history.query("1h")
+        self.assertEqual(hour["samples"], 5)
+        self.assertEqual(hour["cpu_usage"], 20)  # (4 * 10 + 60) / 5, not the per-minute mean of 35
+        self.assertEqual(hour["latency_ms"], 200)
+        self.assertEqual(hour["errors_count"], 7)
+        self.assertEqual(hour["tasks_completed"], 9)
+
+    def test_later_flush_refreshes_a_partly_written_bucket(self):
+        self.record(0, cpu_usage=10, errors_count=1)
+        self.history.flush()
+        self.record(30, cpu_usage=30, errors_count=2)
+        self.history.flush()
+
+        (minute,) = self.history.query("1m")
+        self.assertEqual((minute["samples"], minute["cpu_usage"], minute["errors_count"]), (2, 20, 3))
+        (hour,) = self.history.query("1h")
+        self.assertEqual((hour["samples"], hour["errors_count"]), (2, 3))
+        self.assertEqual(len(self.history.query("raw")), 2)
+
+    def test_buffer_flushes_when_the_batch_is_full(self):
+        self.history.batch_size = 3
+        for i in range(3):
+            self.record(i, cpu_usage=i)
+        self.assertEqual(self.history.buffer, [])
+        self.assertEqual(len(self.history.query("raw")), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+"""Rate limiting of the agent's stdout event log."""
+
+import contextlib
+import importlib.util
+import io
+import json
+import unittest
+from pathlib import Path
+from unittest import mock
+
+AGENT = Path(__file__).resolve().parent.parent / "clawtrace-agent.py"
+
+
+def load_agent():
+    spec = importlib.util.spec_from_file_location("clawtrace_agent_under_test", AGENT)
+    agent = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(agent)
+    return agent
+
+
+class LogRateLimitTest(unittest.TestCase):
+    def setUp(self):
+        self.agent = load_agent()
+        self.agent.LOG_RATE = 5.0
+        self.agent.LOG_LEVEL = self.agent.LOG_LEVELS["info"]
+        self.agent.LOG_FORMAT = "json"
+        self.agent._log_tokens = self.agent.LOG_RATE
+        self.now = 1_700_000_000.0
+
+    def flood(self, lines):
+        out = io.StringIO()
+        with mock.patch.object(self.agent.time, "time", lambda: self.now), contextlib.redirect_stdout(out):
+            for i in range(lines):
+                self.agent.log("info", "test.line", "line {i}", i=i)
+        return [json.loads(line) for line in out.getvalue().splitlines()]
+
+    def test_flood_reports_suppressed_count(self):
+        printed = self.flood(100)  # one instant: the 5-line burst passes, 95 are dropped
+        self.assertEqual([e["i"] for e in printed], [0, 1, 2, 3, 4])
+
+        self.now += 0.2  # refills exactly one token
+        printed = self.flood(50)
+        self.assertEqual(printed[0]["event"], "log.suppressed")
+        self.assertEqual(printed[0]["count"], 95)
+        self.assertEqual(printed[1]["event"], "test.line")
+        self.assertEqual(len(printed), 2)
+
+        self.now += 0.2
+        printed = self.flood(1)
+        self.assertEqual([(e["event"], e.get("count")) for e in printed],
+                         [("log.suppressed", 49), ("test.line", None)])
+
+    def test_notice_is_kept_in_event_ring(self):
+        self.flood(10)
+        self.now += 1
+        self.flood(1)
+        notices = [fields for _, _, event, _, fields in self.agent._events if event == "log.suppressed"]
+        self.assertEqual(notices, [{"count": 5}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+"""Log tailing for errors_count: appends, rotation, truncation and saved offsets."""
+
+import importlib.util
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+AGENT = Path(__file__).resolve().parent.parent / "clawtrace-agent.py"
+
+
+def load_agent():
+    spec = importlib.util.spec_from_file_location("clawtrace_agent_under_test", AGENT)
+    agent = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(agent)
+    return agent
+
+
+class LogTailTest(unittest.TestCase):
+    def setUp(self):
+        self.agent = load_agent()
+        self.agent.LOG_LEVEL = 100  # keep tail.rotated/tail.truncated off stdout
+        self._tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self._tmp.name)
+        self.log = self.dir / "app.log"
+        self.state = str(self.dir / "tail-state.json")
+        self.log.write_text("ERROR from before the agent started\n")
+        self.tails = []
+
+    def tearDown(self):
+        for tail in self.tails:
+            for entry in tail.files.values():
+                entry[0].close()
+        self._tmp.cleanup()
+
+    def tail(self, **kwargs):
+        tail = self.agent.LogTail([str(self.log)], pattern="ERROR", state_path=self.state, **kwargs)
+        self.tails.append(tail)
+        return tail
+
+    def append(self, text, path=None):
+        with open(path or self.log, "a") as f:
+            f.write(text)
+
+    def test_counts_only_new_complete_lines(self):
+        tail = self.tail()
+        self.assertEqual(tail.poll(), 0)  # existing content is history, not news
+        self.append("ERROR one\nok\nERROR tw")
+        self.assertEqual(tail.poll(), 1)  # the partial line waits for its newline
+        self.append("o\n")
+        self.assertEqual(tail.poll(), 1)
+        self.assertEqual((tail.pending, tail.total), (2, 2))
+
+    def test_small_read_size_still_sees_lines_across_chunks(self):
+        tail = self.tail(read_size=3)
+        tail.poll()
+        self.append("ERROR a\nfine\nERROR b\n")
+        self.assertEqual(tail.poll(), 2)
+
+    def test_rotation_drains_the_old_file_then_reads_the_new_one(self):
+        tail = self.tail()
+        tail.poll()
+        self.append("ERROR before rotate\n")
+        rotated = self.dir / "app.log.1"
+        os.rename(self.log, rotated)
+        self.append("ERROR late write to the old inode\nERROR partial at close", rotated)  # writer still holds it
+        self.log.write_text("ERROR first in new file\nok\n")
+        self.assertEqual(tail.poll(), 4)  # 2 drained + trailing partial + 1 new
+        self.assertEqual(tail.files[str(self.log)][1], os.stat(self.log).st_ino)
+        self.append("ERROR next\n")
+        self.assertEqual(tail.poll(), 1)
+
+    def test_truncation_restarts_at_the_beginning(self):
+        tail = self.tail()
+        tail.poll()
+        self.append("x" * 200 + "\n")
+        tail.poll()
+        with open(self.log, "w") as f:  # copytruncate, then the app keeps writing
+            f.write("ERROR after truncate\n")
+        self.assertEqual(tail.poll(), 1)
+        self.assertEqual(tail.files[str(self.log)][2], os.path.getsize(self.log))
+
+    def test_saved_offsets_resume_after_restart(self):
+        tail = self.tail()
+        tail.poll()
+        self.append("ERROR seen\nERROR half")
+        self.assertEqual(tail.poll(), 1)
+        saved = json.loads(Path(self.state).read_text())
+        inode, offset = saved[str(self.log)]
+        self.assertEqual(inode, os.stat(self.log).st_ino)
+        self.assertEqual(offset, os.path.getsize(self.log) - len("ERROR half"))  # partial line not committed
+
+        self.append(" done\nERROR while the agent was down\n")
+        restarted = self.tail()
+        self.assertEqual(restarted.poll(), 2)  # the completed partial line and the new one, nothing re-counted
+
+    def test_saved_offset_for_another_inode_is_ignored(self):
+        tail = self.tail()
+        tail.poll()
+        self.log.unlink()
+        self.log.write_text("ERROR old news in a replaced file\n" * 3)
+        restarted = self.tail()
+        self.assertEqual(restarted.poll(), 0)  # unknown file: start at its end
+        self.append("ERROR fresh\n")
+        self.assertEqual(restarted.poll(), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
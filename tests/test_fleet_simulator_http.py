@@ -0,0 +1,53 @@
+"""Response parsing of the fleet simulator's HTTP/1.1 client."""
+
+import asyncio
+import json
+import sys
+import unittest
+from pathlib import Path
+
+BENCHMARKS = Path(__file__).resolve().parent.parent / "benchmarks"
+
+
+class HttpTargetTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        sys.path.insert(0, str(BENCHMARKS))
+        import fleet_simulator
+        cls.sim = fleet_simulator
+
+    @classmethod
+    def tearDownClass(cls):
+        sys.path.remove(str(BENCHMARKS))
+
+    def test_chunked_body_with_extensions_and_trailers(self):
+        raw = (b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\nContent-Type: application/json\r\n\r\n"
+               b"7;ext=1\r\n{\"token\r\n5\r\n\": \"t\r\n2\r\n\"}\r\n0\r\nX-Trailer: 1\r\n\r\n")
+        status, headers, body = self.sim.parse_response(raw)
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body), {"token": "t"})
+
+    def test_content_length_and_close_delimited_bodies(self):
+        self.assertEqual(self.sim.parse_response(b"HTTP/1.1 401 Unauthorized\r\nContent-Length: 2\r\n\r\n{}junk")[2], b"{}")
+        self.assertEqual(self.sim.parse_response(b"HTTP/1.1 200 OK\r\n\r\n[1]")[2], b"[1]")
+
+    def test_post_against_a_chunked_server(self):
+        async def handle(reader, writer):
+            await reader.readuntil(b"\r\n\r\n")
+            body = json.dumps({"token": "abc", "expires_in": 60}).encode()
+            chunks = b"".join(b"%x\r\n%s\r\n" % (len(part), part) for part in (body[:10], body[10:]))
+            writer.write(b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n" + chunks + b"0\r\n\r\n")
+            await writer.drain()
+            writer.close()
+
+        async def run():
+            server = await asyncio.start_server(handle, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                return await self.sim.HttpTarget(f"http://127.0.0.1:{port}").post("/api/agents/handshake", b"{}")
+
+        self.assertEqual(asyncio.run(run()), (200, {"token": "abc", "expires_in": 60}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+"""Batch mode of the ui-ux-pro-max search CLI: malformed lines must not sink the batch."""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+SCRIPTS = Path(__file__).resolve().parent.parent / ".agent" / ".shared" / "ui-ux-pro-max" / "scripts"
+
+
+class RunBatchTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._cache = tempfile.TemporaryDirectory()
+        os.environ["UI_UX_PRO_MAX_CACHE_DIR"] = cls._cache.name
+        sys.path.insert(0, str(SCRIPTS))
+        from search import run_batch
+        cls.run_batch = staticmethod(run_batch)
+
+    @classmethod
+    def tearDownClass(cls):
+        sys.path.remove(str(SCRIPTS))
+        cls._cache.cleanup()
+
+    def test_bad_lines_yield_errors_in_place(self):
+        lines = [
+            '{"query": "fintech", "domain": "color", "max_results": 1}',
+            '{"query": "fintech", "max_results": "2"}',
+            '{"query": "fintech", "max_results": 2.5}',
+            '{"query": 5}',
+            '{"query": "fintech", "max_results": null}',
+            '{"query": "fintech", "max_results": true}',
+            '{"query": "fintech", "max_results": 0}',
+            '{"query": "fintech", "domain": 3}',
+            "not json",
+            "",
+            '{"query": "form validation", "stack": "react", "max_results": 2}',
+        ]
+        results = self.run_batch(lines)
+
+        self.assertEqual(len(results), 10)  # blank line skipped
+        self.assertEqual(results[0]["domain"], "color")
+        self.assertEqual(results[0]["count"], 1)
+        for result in results[1:9]:
+            self.assertEqual(list(result), ["error"])
+        self.assertIn("max_results", results[1]["error"])
+        self.assertIn("query", results[3]["error"])
+        self.assertIn("domain", results[7]["error"])
+        self.assertEqual(results[9]["stack"], "react")
+        self.assertLessEqual(results[9]["count"], 2)
+        json.dumps(results)  # every slot stays serializable for --batch output
+
+
+if __name__ == "__main__":
+    unittest.main()
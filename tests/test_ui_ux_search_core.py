@@ -0,0 +1,246 @@
+"""BM25 scoring in the ui-ux-pro-max search core, checked against plain reference implementations."""
+
+import csv
+import importlib.util
+import os
+import random
+import sys
+import tempfile
+import unittest
+from collections import Counter
+from math import log
+from pathlib import Path
+from unittest import mock
+
+SCRIPTS = Path(__file__).resolve().parent.parent / ".agent" / ".shared" / "ui-ux-pro-max" / "scripts"
+
+WORDS = ["glass", "dark", "minimal", "brutalist", "neon", "pastel", "retro", "flat", "serif", "grid",
+         "motion", "gradient", "dashboard", "fintech", "health", "gaming", "editorial", "playful"]
+
+
+def corpus(n, seed=0):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 12))) for _ in range(n)]
+
+
+class SearchCoreTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._cache = tempfile.TemporaryDirectory()
+        os.environ["UI_UX_PRO_MAX_CACHE_DIR"] = cls._cache.name
+        sys.path.insert(0, str(SCRIPTS))
+        import core
+        cls.core = core
+
+    @classmethod
+    def tearDownClass(cls):
+        sys.path.remove(str(SCRIPTS))
+        cls._cache.cleanup()
+
+    def fit(self, documents, backend="python", **kwargs):
+        bm25 = self.core.BM25(backend=backend)
+        bm25.fit(documents, **kwargs)
+        return bm25
+
+
+class PostingsTest(SearchCoreTest):
+    def reference(self, bm25, documents, query):
+        """Textbook BM25 over every document, the way scoring worked before postings lists."""
+        docs = [Counter(bm25.tokenize(doc)) for doc in documents]
+        lengths = [sum(doc.values()) for doc in docs]
+        avgdl = sum(lengths) / len(docs)
+        scores = []
+        for doc_id, (doc, length) in enumerate(zip(docs, lengths)):
+            score = 0
+            for token in bm25.tokenize(query):
+                df = sum(1 for d in docs if token in d)
+                tf = doc[token]
+                idf = log((len(docs) - df + 0.5) / (df + 0.5) + 1)
+                score += idf * tf * (bm25.k1 + 1) / (tf + bm25.k1 * (1 - bm25.b + bm25.b * length / avgdl))
+            if score > 0:
+                scores.append((doc_id, score))
+        return sorted(scores, key=lambda x: (-x[1], x[0]))
+
+    def test_postings_scores_match_a_full_corpus_scan(self):
+        documents = corpus(300)
+        bm25 = self.fit(documents)
+        for query in ["glass dark", "neon neon retro", "fintech dashboard motion", "unknown words", ""]:
+            with self.subTest(query=query):
+                expected = self.reference(bm25, documents, query)
+                got = bm25.score(query)
+                self.assertEqual([doc_id for doc_id, _ in got], [doc_id for doc_id, _ in expected])
+                for (_, a), (_, b) in zip(got, expected):
+                    self.assertAlmostEqual(a, b, places=9)
+
+    def test_top_k_is_a_prefix_of_the_full_ranking(self):
+        # Few distinct documents, so many scores tie and must resolve in document order
+        bm25 = self.fit(corpus(40, seed=1) * 5)
+        full = bm25.score("glass minimal grid")
+        for k in (1, 3, 7, 50, 1000):
+            with self.subTest(k=k):
+                self.assertEqual(bm25.score("glass minimal grid", top_k=k), full[:k])
+
+
+HAVE_NUMPY = importlib.util.find_spec("numpy") is not None
+
+
+class NumpyBackendTest(SearchCoreTest):
+    QUERIES = ["glass dark", "neon neon retro", "fintech dashboard motion gaming", "serif", "unknown words"]
+
+    @unittest.skipUnless(HAVE_NUMPY, "NumPy is not installed")
+    def test_numpy_and_python_backends_agree(self):
+        documents = corpus(self.core.NUMPY_MIN_DOCS + 500)
+        bm25 = self.fit(documents, backend=None)
+        self.assertTrue(bm25._use_numpy())  # auto picks NumPy at this size
+        python = self.fit(documents, backend="python")
+        for query in self.QUERIES:
+            for k in (None, 1, 10, 25, 10000):
+                with self.subTest(query=query, k=k):
+                    got, expected = bm25.score(query, top_k=k), python.score(query, top_k=k)
+                    self.assertEqual([doc_id for doc_id, _ in got], [doc_id for doc_id, _ in expected])
+                    for (_, a), (_, b) in zip(got, expected):
+                        self.assertAlmostEqual(a, b, places=9)
+
+    @unittest.skipUnless(HAVE_NUMPY, "NumPy is not installed")
+    def test_backends_agree_on_bm25f_and_cached_indexes(self):
+        rng = random.Random(2)
+        documents = [(rng.choice(WORDS), " ".join(rng.choices(WORDS, k=rng.randint(0, 10)))) for _ in range(2500)]
+        python = self.fit(documents, field_weights=(3, 1))
+        numpy = self.core.BM25.from_state(python.state())
+        numpy.backend = "numpy"
+        for query in self.QUERIES:
+            with self.subTest(query=query):
+                got, expected = numpy.score(query, top_k=10), python.score(query, top_k=10)
+                self.assertEqual([doc_id for doc_id, _ in got], [doc_id for doc_id, _ in expected])
+                for (_, a), (_, b) in zip(got, expected):
+                    self.assertAlmostEqual(a, b, places=9)
+
+    @unittest.skipIf(HAVE_NUMPY, "NumPy is installed")
+    def test_without_numpy_auto_falls_back_and_explicit_numpy_fails(self):
+        documents = corpus(self.core.NUMPY_MIN_DOCS)
+        self.assertEqual(self.fit(documents, backend=None).score("glass", top_k=3),
+                         self.fit(documents).score("glass", top_k=3))
+        with self.assertRaises(RuntimeError):
+            self.fit(documents, backend="numpy").score("glass")
+
+
+class FieldWeightsTest(SearchCoreTest):
+    DOCUMENTS = [
+        ("Glassmorphism", "frosted panels with blur and soft borders"),
+        ("Neumorphism", "soft shadows, glass-like glass highlights on glass buttons"),
+        ("Brutalism", "raw grids and heavy type"),
+        ("Minimalism", "whitespace, flat color and clear type"),
+    ]
+
+    def ranking(self, bm25, query):
+        return [doc_id for doc_id, _ in bm25.score(query)]
+
+    def test_weights_move_the_field_that_matches(self):
+        query = "glassmorphism glass"
+        self.assertEqual(self.ranking(self.fit(self.DOCUMENTS, field_weights=(5, 1)), query), [0, 1])
+        self.assertEqual(self.ranking(self.fit(self.DOCUMENTS, field_weights=(1, 5)), query), [1, 0])
+        # The name match beats three description matches only once the name weighs more
+        documents = [("Glass", "frosted panels"), ("Aurora", "glass glass glass gradients")] + self.DOCUMENTS[2:]
+        self.assertEqual(self.ranking(self.fit(documents, field_weights=(1, 1)), "glass"), [1, 0])
+        self.assertEqual(self.ranking(self.fit(documents, field_weights=(4, 1)), "glass"), [0, 1])
+
+    def test_single_field_at_weight_one_is_plain_bm25(self):
+        documents = corpus(200, seed=3)
+        plain, fielded = self.fit(documents), self.fit([(doc,) for doc in documents], field_weights=(1,))
+        for query in ["glass dark", "neon neon retro", "serif grid motion"]:
+            with self.subTest(query=query):
+                got, expected = fielded.score(query), plain.score(query)
+                self.assertEqual([doc_id for doc_id, _ in got], [doc_id for doc_id, _ in expected])
+                for (_, a), (_, b) in zip(got, expected):
+                    self.assertAlmostEqual(a, b, places=9)
+
+    def test_csv_search_weights_reorder_results(self):
+        path = Path(self._cache.name) / "weighted.csv"
+        path.write_text("Name,Notes\nGlass,frosted panels\nAurora,glass glass glass gradients\nGrid,raw type\n")
+        search = lambda weights: [row["Name"] for row in self.core._search_csv(
+            path, ["Name", "Notes"], ["Name"], "glass", 3, weights)]
+        self.assertEqual(search({"Name": 1}), ["Aurora", "Glass"])  # Notes left out weighs 1.0
+        self.assertEqual(search({"Name": 4}), ["Glass", "Aurora"])
+
+
+class LazyRowsTest(SearchCoreTest):
+    def dict_reader_rows(self, path, output_cols):
+        with open(path, newline="", encoding="utf-8") as f:
+            return [{col: row[col] for col in output_cols if col in row} for row in csv.DictReader(f)]
+
+    def assert_rows_match(self, path, search_cols, output_cols):
+        index = self.core._build_index(path, search_cols, output_cols)
+        expected = self.dict_reader_rows(path, output_cols)
+        self.assertEqual(len(index.offsets), len(expected))
+        self.assertEqual(index.rows(list(range(len(expected)))), expected)
+        self.assertEqual(index.rows([2, 0]), [expected[2], expected[0]])  # any order, any subset
+
+    def test_offsets_survive_multiline_quotes_crlf_and_blank_lines(self):
+        path = Path(self._cache.name) / "tricky.csv"
+        path.write_bytes(
+            'Name,Notes,Extra\r\n'
+            '"Glass, frosted","line one\r\nline two\nline ""three""",x\r\n'
+            '\r\n'
+            'Short\r\n'
+            'Café,"ends with a newline\n",y,overflow\r\n'
+            '"Multi\n\nblank","",z\n'
+            'Last,no trailing newline,w'.encode("utf-8"))
+        self.assert_rows_match(path, ["Name", "Notes"], ["Name", "Notes", "Extra", "Missing"])
+
+    def test_shipped_data_matches_dict_reader(self):
+        for domain, config in self.core.CSV_CONFIG.items():
+            with self.subTest(domain=domain):
+                self.assert_rows_match(self.core.DATA_DIR / config["file"], config["search_cols"], config["output_cols"])
+
+    def test_search_returns_the_rows_dict_reader_sees(self):
+        path = Path(self._cache.name) / "search.csv"
+        path.write_text('Name,Notes\nAlpha,"glass\nacross lines"\nBeta,plain\n', newline="")
+        (row,) = self.core._search_csv(path, ["Name", "Notes"], ["Name", "Notes"], "glass", 3)
+        self.assertEqual(row, self.dict_reader_rows(path, ["Name", "Notes"])[0])
+
+
+class QueryCacheTest(SearchCoreTest):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._dir.cleanup)
+        self.db = Path(self._dir.name) / "query-cache.sqlite"
+        self.csv = Path(self._dir.name) / "styles.csv"
+        self.csv.write_text("Name,Notes\nGlass,frosted glass panels\nGrid,raw type\n")
+
+    def disk_cache(self, maxsize=16):
+        cache = self.core._QueryCache(maxsize, self.db)
+        self.addCleanup(lambda: cache._db and cache._db.close())
+        return cache
+
+    def search(self, query="glass"):
+        return [row["Name"] for row in self.core._search_csv(self.csv, ["Name", "Notes"], ["Name"], query, 3)]
+
+    def test_disk_rows_are_trimmed_every_n_puts(self):
+        cache = self.disk_cache(maxsize=3)
+        cache.trim_every = 4
+        rows = lambda: cache._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        counts = []
+        for i in range(10):
+            cache.put(("q", i), [i])
+            counts.append(rows())
+        # Puts 1, 5 and 9 check the size; in between the file may run over by up to trim_every - 1
+        self.assertEqual(counts, [1, 2, 3, 4, 3, 4, 5, 6, 3, 4])
+        self.assertEqual(self.disk_cache(maxsize=3).get(("q", 9)), [9])
+
+    def test_editing_the_csv_misses_the_cache(self):
+        with mock.patch.object(self.core, "_QUERY_CACHE", self.disk_cache()):
+            self.assertEqual(self.search(), ["Glass"])
+            self.assertEqual(self.search(), ["Glass"])
+            self.assertEqual((self.core.query_cache_info()["hits"], self.core.query_cache_info()["misses"]), (1, 1))
+
+        with mock.patch.object(self.core, "_QUERY_CACHE", self.disk_cache()):  # a later process
+            self.assertEqual(self.search(), ["Glass"])
+            self.assertEqual(self.core.query_cache_info()["disk_hits"], 1)
+            self.csv.write_text("Name,Notes\nGlass,frosted glass panels\nGrid,raw type\nAurora,glass glass glass\n")
+            self.assertEqual(self.search(), ["Aurora", "Glass"])
+            info = self.core.query_cache_info()
+            self.assertEqual((info["hits"], info["disk_hits"], info["misses"]), (0, 1, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
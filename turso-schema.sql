@@ -142,3 +142,10 @@ CREATE TABLE IF NOT EXISTS api_rate_limits (
     tokens REAL,
     last_refill TEXT
 );
+
+-- 10. AGENT CONFIG (Server-pushed directives, editable live; see lib/agent-config.js)
+CREATE TABLE IF NOT EXISTS agent_config (
+    key TEXT PRIMARY KEY,
+    directives TEXT NOT NULL, -- JSON, must include "version"
+    updated_at TEXT DEFAULT (datetime('now'))
+);